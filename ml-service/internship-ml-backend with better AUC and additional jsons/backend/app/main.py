@@ -1,8 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from backend.app.routers.student_api import router as student_router
 from backend.app.routers.admin_api import router as admin_router
+from backend.app.services.metrics_service import MetricsMiddleware, render_metrics
 
 app = FastAPI(title="Internship ML Backend")
 
@@ -14,6 +16,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency + in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Routers
 app.include_router(student_router, prefix="/student", tags=["Student"])
 app.include_router(admin_router, prefix="/admin", tags=["Admin"])
@@ -21,3 +26,9 @@ app.include_router(admin_router, prefix="/admin", tags=["Admin"])
 @app.get("/")
 def root():
     return {"message": "ML Backend API is running"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text-format metrics."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,16 +1,32 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import json
+import time
+import asyncio
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Header
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from backend.app.services.data_service import upload_students_csv, upload_internships_csv
-from backend.app.services.train_service import train_all
-from backend.app.services.allocate_service import allocate_all, get_dashboard_data, download_outputs
+from backend.app.services.allocate_service import download_outputs, get_run_metrics
+from backend.app.services.job_service import submit_job, get_job, list_jobs, get_job_events
+from backend.app.services.run_store import list_runs, pin_run
+from backend.app.routers.dashboard_api import router as dashboard_router
 
 router = APIRouter()
 
+# /admin/dashboard, /admin/dashboard/summary, /admin/dashboard/allocations, ...
+router.include_router(dashboard_router, prefix="/dashboard")
+
+# /admin/jobs/{job_id}/events: SQLite poll interval and keep-alive period
+EVENT_POLL_SECONDS = 0.5
+EVENT_KEEPALIVE_SECONDS = 15
+
 
 @router.post("/upload/students")
 def upload_students(file: UploadFile = File(...)):
     try:
-        upload_students_csv(file)
-        return {"message": "students.csv uploaded"}
+        report = upload_students_csv(file)
+        return {"message": "students.csv uploaded", "report": report}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -18,55 +34,152 @@ def upload_students(file: UploadFile = File(...)):
 @router.post("/upload/internships")
 def upload_internships(file: UploadFile = File(...)):
     try:
-        upload_internships_csv(file)
-        return {"message": "internships.csv uploaded"}
+        report = upload_internships_csv(file)
+        return {"message": "internships.csv uploaded", "report": report}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/train")
+@router.post("/train", status_code=202)
 def train():
     """
-    Heavy: trains models (run locally ideally).
+    Heavy: trains models in a background worker.
+    Returns the job immediately; poll GET /admin/jobs/{job_id}.
     """
     try:
-        return train_all()
+        return submit_job("train")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/allocate")
+@router.post("/allocate", status_code=202)
 def allocate():
     """
-    Fast: run allocation using already-trained models.
+    Runs allocation with already-trained models in a background worker.
+    Returns the job immediately; poll GET /admin/jobs/{job_id}.
     """
     try:
-        return allocate_all()
+        return submit_job("allocate")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/dashboard")
-def dashboard():
+@router.get("/jobs")
+def jobs(limit: int = 20, kind: str = None):
     """
-    Returns cached last_results.json contents (dashboard data).
+    Most recent train/allocate jobs, newest first.
     """
     try:
-        return get_dashboard_data()
-    except FileNotFoundError:
-        raise HTTPException(status_code=400, detail="Run /admin/allocate at least once before fetching dashboard data.")
+        return list_jobs(limit=limit, kind=kind)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """
+    Status (queued/running/succeeded/failed), stage progress, timings and result location of a job.
+    """
+    try:
+        return get_job(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request, last_event_id: str = Header(None)):
+    """
+    Server-sent events for a job: status changes, stage start/end and
+    per-round allocator stats (offers, acceptances, rejections, upgrades,
+    seats filled). Reconnects resume after the Last-Event-ID header.
+    The stream closes once the job has finished.
+    """
+    try:
+        after = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Last-Event-ID must be an integer")
+
+    try:
+        events, done = await run_in_threadpool(get_job_events, job_id, after)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+    async def stream(events, done, after):
+        last_sent = time.monotonic()
+        while True:
+            for ev in events:
+                after = ev["id"]
+                yield f"id: {ev['id']}\nevent: {ev['event']}\ndata: {json.dumps(ev['data'])}\n\n"
+                last_sent = time.monotonic()
+
+            if done or await request.is_disconnected():
+                return
+
+            if time.monotonic() - last_sent > EVENT_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+            events, done = await run_in_threadpool(get_job_events, job_id, after)
+
+    return StreamingResponse(
+        stream(events, done, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/runs")
+def runs():
+    """
+    Retained allocation runs (manifest + summary), newest first; "latest" marks the published one.
+    """
+    try:
+        return list_runs()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/runs/{run_id}/pin")
+def pin(run_id: str):
+    """
+    Serve a retained run as the latest (e.g. roll back a bad allocation).
+    """
+    try:
+        pin_run(run_id)
+        return {"message": f"Run {run_id} is now the latest", "run_id": run_id}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/run-metrics")
+def run_metrics():
+    """
+    Per-stage wall/CPU time, row counts and (when sampled) traced memory of the last run.
+    """
+    try:
+        return get_run_metrics()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/download/{fname}")
-def download_file(fname: str):
+def download_file(fname: str, request: Request, run_id: str = None):
     """
     Download outputs by filename (final_allocations.csv, final_fairness_report.json, student_boost_impact.json, etc.)
-    Ensure the file exists in output/ or json_outputs/
+    from the latest published run, or from run_id if given.
+    Supports If-None-Match (304), gzip/zstd via Accept-Encoding and byte ranges.
     """
     try:
-        return download_outputs(fname)
+        return download_outputs(fname, run_id, request.headers)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
     except Exception as e:
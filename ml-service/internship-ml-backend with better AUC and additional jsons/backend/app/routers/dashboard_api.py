@@ -1,27 +1,179 @@
-import os
-import json
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 
-ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-JSON_DIR = os.path.join(ROOT, "json_outputs")
-RESULT_PATH = os.path.join(JSON_DIR, "last_results.json")
+from backend.app.services.allocate_service import dashboard_response
+from backend.app.services.results_store import (
+    get_summary,
+    query_allocations,
+    count_allocations,
+    query_boost_students,
+    DEFAULT_PAGE_SIZE,
+)
+from backend.app.services.olap_cube import query_cube, cube_dimensions
 
+# Mounted by admin_api under /admin/dashboard
 router = APIRouter()
 
+NO_RUN_DETAIL = "Run /admin/allocate at least once before fetching dashboard data."
 
-@router.get("/")
-def get_dashboard_data():
+
+def _not_found(run_id, e):
+    if run_id:
+        return HTTPException(status_code=404, detail=str(e))
+    return HTTPException(status_code=400, detail=NO_RUN_DETAIL)
+
+
+@router.get("")
+def get_dashboard_data(request: Request, run_id: str = None):
     """
     Returns the latest allocation + fairness + boost + round logs as JSON.
 
     Requires that /admin/allocate has been run at least once
-    (so that last_results.json exists).
+    (so that last_results.json exists). Served as-is from disk with
+    ETag / gzip / zstd support; prefer the paginated views below for
+    large cohorts.
+    """
+    try:
+        return dashboard_response(run_id, request.headers)
+    except FileNotFoundError as e:
+        raise _not_found(run_id, e)
+
+
+@router.get("/summary")
+def summary(run_id: str = None, sections: str = None):
+    """
+    Counts, fairness, boost headline numbers and per-round stats —
+    no per-student lists. sections: comma list of fairness,boost,rounds.
+    """
+    try:
+        return get_summary(run_id, sections)
+    except FileNotFoundError as e:
+        raise _not_found(run_id, e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/allocations")
+def allocations(
+    internship_id: str = None,
+    student_id: str = None,
+    reservation: str = None,
+    gender: str = None,
+    rural: int = None,
+    sector: str = None,
+    tier: str = None,
+    location_type: str = None,
+    pref_rank: int = None,
+    boosted: int = None,
+    saved_by_boost: int = None,
+    fields: str = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+    run_id: str = None,
+):
+    """
+    Paginated allocations filtered by internship / student / category.
+    fields: comma list of columns to return (default all).
+    """
+    filters = {
+        "internship_id": internship_id, "student_id": student_id, "reservation": reservation,
+        "gender": gender, "rural": rural, "sector": sector, "tier": tier,
+        "location_type": location_type, "pref_rank": pref_rank, "boosted": boosted,
+        "saved_by_boost": saved_by_boost,
+    }
+    try:
+        return query_allocations(filters, fields=fields, limit=limit, offset=offset, run_id=run_id)
+    except FileNotFoundError as e:
+        raise _not_found(run_id, e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/allocations/counts")
+def allocation_counts(
+    group_by: str = "internship_id",
+    reservation: str = None,
+    gender: str = None,
+    rural: int = None,
+    sector: str = None,
+    tier: str = None,
+    run_id: str = None,
+):
+    """
+    Placed counts per internship_id / reservation / gender / rural / sector / tier / pref_rank / boosted.
+    """
+    filters = {"reservation": reservation, "gender": gender, "rural": rural, "sector": sector, "tier": tier}
+    try:
+        return count_allocations(group_by, filters, run_id=run_id)
+    except FileNotFoundError as e:
+        raise _not_found(run_id, e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/boost/students")
+def boost_students(
+    placed: int = None,
+    saved_by_boost: int = None,
+    min_improvement: float = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    offset: int = 0,
+    run_id: str = None,
+):
     """
-    if not os.path.exists(RESULT_PATH):
-        raise HTTPException(
-            status_code=400,
-            detail="Run /admin/allocate at least once before fetching dashboard data.",
+    Paginated per-student rank_improvement_estimate from the boost report.
+    """
+    try:
+        return query_boost_students(placed, saved_by_boost, min_improvement,
+                                    limit=limit, offset=offset, run_id=run_id)
+    except FileNotFoundError as e:
+        raise _not_found(run_id, e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cube")
+def cube(
+    group_by: str = None,
+    sector: str = None,
+    reservation: str = None,
+    gender: str = None,
+    rural: str = None,
+    pref_rank: str = None,
+    tier: str = None,
+    location_type: str = None,
+    measures: str = None,
+    run_id: str = None,
+):
+    """
+    Roll-up of the run's precomputed OLAP cube: placed / eligible /
+    offers / rejections / boost_sum summed over every dimension not in
+    group_by. Filters are comma lists of members, e.g.
+    ?group_by=sector,gender&reservation=SC,ST&rural=1
+    (unplaced students sit in the "unplaced" member of sector /
+    pref_rank / tier / location_type).
+    """
+    dims = {
+        "sector": sector, "reservation": reservation, "gender": gender, "rural": rural,
+        "pref_rank": pref_rank, "tier": tier, "location_type": location_type,
+    }
+    filters = {k: v.split(",") for k, v in dims.items() if v}
+    try:
+        return query_cube(
+            group_by=group_by.split(",") if group_by else None,
+            filters=filters,
+            measures=measures.split(",") if measures else None,
+            run_id=run_id,
         )
+    except FileNotFoundError as e:
+        raise _not_found(run_id, e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
-    with open(RESULT_PATH, "r") as f:
-        return json.load(f)
+@router.get("/cube/dimensions")
+def cube_members(run_id: str = None):
+    """Members of every cube dimension and the available measures."""
+    try:
+        return cube_dimensions(run_id)
+    except FileNotFoundError as e:
+        raise _not_found(run_id, e)
@@ -1,11 +1,28 @@
-from fastapi import APIRouter, HTTPException
+import json
+import time
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List
 
-from backend.app.services.model_service import predict_score
+from backend.app.services.model_service import (
+    predict_score,
+    parse_batch_body,
+    predict_batch,
+    recommend_for_student,
+    recommend_for_profile,
+)
+from backend.app.services.allocation_index import lookup_allocation
 
 router = APIRouter()
 
+# Largest request body accepted by /predict/batch
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+# NDJSON lines written per streamed chunk
+STREAM_CHUNK_ROWS = 1000
+
 
 class StudentInput(BaseModel):
     skills: str
@@ -25,6 +42,11 @@ class PredictRequest(BaseModel):
     internship: InternshipInput
 
 
+class RecommendRequest(BaseModel):
+    student: StudentInput
+    prefs: List[str] = []
+
+
 @router.post("/predict", response_model=Dict)
 def predict(payload: PredictRequest):
     """
@@ -34,3 +56,102 @@ def predict(payload: PredictRequest):
         return predict_score(payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/predict/batch")
+async def predict_batch_pairs(request: Request):
+    """
+    Score many student-internship pairs in one call.
+
+    Body: JSON array, NDJSON or CSV of pairs, or
+    {"student_ids": [...], "internship_ids": [...]} against the uploaded CSVs.
+    Streams one NDJSON result per pair, in input order.
+    """
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Body exceeds {MAX_BATCH_BYTES} bytes")
+
+    t0 = time.perf_counter()
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {MAX_BATCH_BYTES} bytes")
+
+    try:
+        pairs_df = await run_in_threadpool(parse_batch_body, bytes(body), request.headers.get("content-type"))
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    parse_ms = (time.perf_counter() - t0) * 1000
+
+    try:
+        scored, score_ms = await run_in_threadpool(predict_batch, pairs_df)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {
+        "X-Batch-Size": str(len(scored)),
+        "X-Parse-Time-Ms": f"{parse_ms:.2f}",
+        "X-Score-Time-Ms": f"{score_ms:.2f}",
+    }
+
+    return StreamingResponse(
+        _ndjson_chunks(scored),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+@router.post("/recommendations", response_model=Dict)
+def recommendations_for_profile(payload: RecommendRequest, k: int = 10):
+    """
+    Top-k internships for an ad-hoc student profile (prefs: ordered internship IDs).
+    """
+    try:
+        return recommend_for_profile(dict(payload.student), payload.prefs, k)
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{student_id}/recommendations", response_model=Dict)
+def recommendations(student_id: str, k: int = 10):
+    """
+    Top-k internships for a student in the uploaded students.csv, ranked by final_score.
+    """
+    try:
+        return recommend_for_student(student_id, k)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except (ValueError, FileNotFoundError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{student_id}/allocation", response_model=Dict)
+def allocation(student_id: str):
+    """
+    A student's outcome in the latest published run: internship, pref_rank,
+    round, final_score and boost applied ("allocated": false if not placed).
+    """
+    try:
+        return lookup_allocation(student_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _ndjson_chunks(scored):
+    records = scored.to_dict(orient="records")
+    for start in range(0, len(records), STREAM_CHUNK_ROWS):
+        lines = [
+            json.dumps(rec, default=str)
+            for rec in records[start:start + STREAM_CHUNK_ROWS]
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
@@ -1,25 +1,39 @@
 import os
 import json
-import pandas as pd
 
-from src.models import load_models_and_vectorizer, score_all_pairs
-from src.boost_engine import apply_middle_tier_boost
-from src.ranklist_builder import build_ranklists
+from src.models import load_models_and_vectorizer, model_version, MODEL_MATCH_PATH, MODEL_ACCEPT_PATH
+from src.featurize import VECTORIZER_PATH
+from src.pair_builder import build_pairs
+from src.incremental import (score_pairs_cached, boost_and_rank, entity_hashes,
+                             STUDENT_KEY_COLS, INTERNSHIP_KEY_COLS)
 from src.optionC_allotment import optionC_allotment_simulated_rejection
 from src.fairness_report import build_fairness_report
 from src.boost_report import build_student_boost_report
+from src.analytics_runner import run_reports
+from src.analytics_engine import build_facts
+from src.instrumentation import pipeline_run, stage, last_run
+from src.ingest import dataset_path, load_students, load_internships
+from backend.app.services import run_store
+from backend.app.services.results_store import build_results_db, RESULTS_DB
+from backend.app.services.allocation_index import build_allocation_index
+from backend.app.services.olap_cube import build_cube
+from backend.app.services.download_service import prepare_downloads, serve_file
 
 DATA_DIR = "data"
 OUTPUT_DIR = "output"
 JSON_DIR = "json_outputs"
 MODELS_DIR = "models"
 
-LAST_RESULTS = os.path.join(JSON_DIR, "last_results.json")
-FINAL_ALLOC_CSV = os.path.join(OUTPUT_DIR, "final_allocations.csv")
-FINAL_ALLOC_JSON = os.path.join(JSON_DIR, "final_allocations.json")
-FAIRNESS_JSON = os.path.join(JSON_DIR, "final_fairness_report.json")
-BOOST_JSON = os.path.join(JSON_DIR, "student_boost_impact.json")
-ROUND_LOGS_JSON = os.path.join(JSON_DIR, "sim_rounds.json")
+# Files written into each run workspace (json_outputs/runs/<run_id>/);
+# optionC adds sim_rounds.json and sim_offer_events.json
+LAST_RESULTS = "last_results.json"
+FINAL_ALLOC_CSV = "final_allocations.csv"
+FINAL_ALLOC_JSON = "final_allocations.json"
+FAIRNESS_JSON = "final_fairness_report.json"
+BOOST_JSON = "student_boost_impact.json"
+BOOST_STATS_JSON = "boost_stats.json"
+
+RUN_METRICS_JSON = os.path.join(JSON_DIR, "run_metrics.json")
 
 
 def _ensure_dirs():
@@ -28,149 +42,218 @@ def _ensure_dirs():
             os.makedirs(p, exist_ok=True)
 
 
-def allocate_all():
+def allocate_all(on_stage=None, on_round=None):
     """
     Fast allocation path — uses already-trained models.
+    Outputs go to a fresh json_outputs/runs/<run_id>/ that is published
+    (LATEST flipped) only once complete, so concurrent runs never share files.
+    Per-stage timings go to json_outputs/run_metrics.json and the summary.
+    on_stage: optional progress callback (see src.instrumentation.pipeline_run).
+    on_round: optional per-round allocator observer (see optionC_allotment).
     """
+    with pipeline_run("allocate", out_path=RUN_METRICS_JSON, on_stage=on_stage) as run:
+        result = _allocate_all(on_round, run_id=run.run_id if run is not None else None)
+
+    run_store.gc_runs()
+
+    if run is not None:
+        result["summary"]["wall_s"] = round(run.wall_s, 3)
+        result["summary"]["stage_timings_s"] = run.summary()
+
+    return result
+
+
+def get_run_metrics():
+    """Stage metrics of the last allocate/train run (memory first, then disk)."""
+    record = last_run()
+    if record is not None:
+        return record
+    if not os.path.exists(RUN_METRICS_JSON):
+        raise FileNotFoundError("No run metrics yet. Run /admin/allocate first.")
+    with open(RUN_METRICS_JSON, "r") as f:
+        return json.load(f)
+
+
+def _allocate_all(on_round=None, run_id=None):
     _ensure_dirs()
 
-    students_path = os.path.join(DATA_DIR, "students.csv")
-    internships_path = os.path.join(DATA_DIR, "internships.csv")
+    students_path = dataset_path("students", DATA_DIR)
+    internships_path = dataset_path("internships", DATA_DIR)
 
-    if not os.path.exists(students_path):
-        raise FileNotFoundError("students.csv missing in /data")
-    if not os.path.exists(internships_path):
-        raise FileNotFoundError("internships.csv missing in /data")
+    with stage("load_inputs"):
+        students_df = load_students(DATA_DIR)
+        internships_df = load_internships(DATA_DIR)
 
-    students_df = pd.read_csv(students_path)
-    internships_df = pd.read_csv(internships_path)
+        # Load models + vectorizer
+        model_match, model_accept, vectorizer = load_models_and_vectorizer()
 
-    # Load models + vectorizer
-    model_match, model_accept, vectorizer = load_models_and_vectorizer()
+        inputs_sha = run_store.input_hash([students_path, internships_path,
+                                           MODEL_MATCH_PATH, MODEL_ACCEPT_PATH, VECTORIZER_PATH])
+        run_id, run_dir = run_store.create_run(run_id)
 
     # Build pairs
-    pairs = []
-    for _, s in students_df.iterrows():
-        for _, j in internships_df.iterrows():
-            pairs.append({
-                "student_id": s["student_id"],
-                "internship_id": j["internship_id"],
-                "skills": s.get("skills", ""),
-                "req_skills_job": j.get("req_skills", ""),
-                "gpa": s.get("gpa", 0.0),
-                "stipend_internship": j.get("stipend", 0.0),
-                "reservation": s.get("reservation", "GEN"),
-                "gender": s.get("gender", "M"),
-                "rural": s.get("rural", 0),
-                "pref_1": s.get("pref_1", None),
-                "pref_2": s.get("pref_2", None),
-                "pref_3": s.get("pref_3", None),
-                "pref_4": s.get("pref_4", None),
-                "pref_5": s.get("pref_5", None),
-                "pref_6": s.get("pref_6", None),
-            })
-
-    pairs_df = pd.DataFrame(pairs)
-
-    # Pref rank computation (1-6 else 7)
-    def get_pref_rank(row):
-        iid = row["internship_id"]
-        for r in range(1, 7):
-            if row.get(f"pref_{r}") == iid:
-                return r
-        return 7
-
-    pairs_df["pref_rank"] = pairs_df.apply(get_pref_rank, axis=1)
-
-    # Score pairs
-    scored = score_all_pairs(pairs_df, model_match, model_accept, vectorizer)
-
-    # Boost
-    boosted = apply_middle_tier_boost(scored)
-
-    # Ranklists
-    ranklists = build_ranklists(boosted, internships_df)
+    pairs_df = build_pairs(students_df, internships_df)
+
+    # Score pairs (only pairs of new / changed students and internships)
+    version = model_version()
+    scored, score_stats = score_pairs_cached(
+        pairs_df,
+        entity_hashes(students_df, STUDENT_KEY_COLS),
+        entity_hashes(internships_df, INTERNSHIP_KEY_COLS),
+        model_match, model_accept, vectorizer, version,
+    )
+
+    # Boost + ranklists (only pools whose pairs changed)
+    boosted, boost_stats, ranklists, pool_stats = boost_and_rank(scored, internships_df, version)
+
+    # Pool statistics reused by /student/{id}/recommendations
+    with open(os.path.join(run_dir, BOOST_STATS_JSON), "w") as f:
+        json.dump(boost_stats, f, indent=2)
 
     # Allocation
-    final_df, round_logs = optionC_allotment_simulated_rejection(
+    final_df, round_logs, offer_events = optionC_allotment_simulated_rejection(
         ranklists=ranklists,
         internships_df=internships_df,
-        out_json_dir=JSON_DIR,
+        out_json_dir=run_dir,
         max_rounds=8,
         seed=123,
+        on_round=on_round,
+        return_offer_events=True,
     )
 
-    # Reports
-    fairness_report = build_fairness_report(final_df, students_df, round_logs)
-
-    boost_report = build_student_boost_report(
-        boosted_df=boosted,
-        final_alloc_df=final_df,
-        out_path=BOOST_JSON
-    )
+    # Reports: views over one fact table, run concurrently
+    facts = build_facts(final_df, students_df, internships_df, pairs_df=boosted, offer_events=offer_events)
+    reports = run_reports({
+        "fairness": (build_fairness_report, {
+            "final_alloc_df": final_df, "students_df": students_df, "round_logs": round_logs,
+            "facts": facts,
+        }),
+        "boost": (build_student_boost_report, {
+            "boosted_df": boosted, "final_alloc_df": final_df,
+            "out_path": os.path.join(run_dir, BOOST_JSON), "facts": facts,
+        }),
+    })
+    fairness_report = reports["results"]["fairness"]
+    boost_report = reports["results"]["boost"]
 
     # Save outputs
-    final_df.to_csv(FINAL_ALLOC_CSV, index=False)
-    with open(FINAL_ALLOC_JSON, "w") as f:
-        json.dump(final_df.to_dict(orient="records"), f, indent=2)
-
-    with open(FAIRNESS_JSON, "w") as f:
-        json.dump(fairness_report, f, indent=2)
-
-    with open(ROUND_LOGS_JSON, "w") as f:
-        json.dump(round_logs, f, indent=2)
-
-    with open(BOOST_JSON, "w") as f:
-        json.dump(boost_report, f, indent=2)
-
-    # Combined dashboard
-    results = {
-        "students": len(students_df),
-        "internships": len(internships_df),
-        "allocations_count": len(final_df),
-        "allocations": final_df.to_dict(orient="records"),
-        "fairness": fairness_report,
-        "round_logs": round_logs,
-        "boost_report": boost_report,
-    }
-
-    with open(LAST_RESULTS, "w") as f:
-        json.dump(results, f, indent=2)
+    # (sim_rounds.json and student_boost_impact.json are already written
+    # by the allocator and the boost report)
+    with stage("save_outputs"):
+        final_df.to_csv(os.path.join(run_dir, FINAL_ALLOC_CSV), index=False)
+        with open(os.path.join(run_dir, FINAL_ALLOC_JSON), "w") as f:
+            json.dump(final_df.to_dict(orient="records"), f, indent=2)
+
+        with open(os.path.join(run_dir, FAIRNESS_JSON), "w") as f:
+            json.dump(fairness_report, f, indent=2)
+
+        # Combined dashboard
+        results = {
+            "students": len(students_df),
+            "internships": len(internships_df),
+            "allocations_count": len(final_df),
+            "allocations": final_df.to_dict(orient="records"),
+            "fairness": fairness_report,
+            "round_logs": round_logs,
+            "boost_report": boost_report,
+        }
 
-    return {
-        "message": "Allocation completed successfully",
-        "summary": {
+        with open(os.path.join(run_dir, LAST_RESULTS), "w") as f:
+            json.dump(results, f, indent=2)
+
+    # Indexed copy for the paginated dashboard endpoints
+    with stage("results_index"):
+        build_results_db(
+            os.path.join(run_dir, RESULTS_DB),
+            final_df, students_df, internships_df, round_logs, fairness_report, boost_report,
+        )
+        # Hash index behind GET /student/{id}/allocation
+        build_allocation_index(run_dir, final_df, students_df, offer_events, boosted)
+
+    # Pre-aggregated cube behind /admin/dashboard/cube
+    with stage("olap_cube"):
+        cube_info = build_cube(run_dir, facts)
+
+    with stage("publish"):
+        summary = {
+            "run_id": run_id,
+            "run_dir": run_dir,
             "total_students": len(students_df),
             "total_internships": len(internships_df),
-            "final_allocations": len(final_df)
+            "final_allocations": len(final_df),
+            "pairs_scored": len(scored),
+            **score_stats,
+            **pool_stats,
+            "olap_cube": cube_info,
         }
+        # ETags + gzip/zstd sidecars for /admin/download
+        downloads = prepare_downloads(run_dir)
+        run_store.publish_run(run_id, {"input_hash": inputs_sha, "summary": summary, **downloads})
+
+    return {
+        "message": "Allocation completed successfully",
+        "summary": summary,
     }
 
 
-def get_dashboard_data():
-    if not os.path.exists(LAST_RESULTS):
-        raise FileNotFoundError("No results found. Run /admin/allocate first.")
-    with open(LAST_RESULTS, "r") as f:
-        return json.load(f)
+def dashboard_response(run_id=None, headers=None):
+    """
+    The full last_results.json served from disk without parsing it
+    (the paginated /admin/dashboard/* views are cheaper), with the
+    same ETag / compression handling as downloads.
+    """
+    return _serve(LAST_RESULTS, run_id, headers or {}, media_type="application/json")
 
 
-def download_outputs(fname: str):
+def download_outputs(fname: str, run_id=None, headers=None):
     """
-    Return a file path to be served by FastAPI's FileResponse outside.
-    We keep this simple: check both output/ and json_outputs/.
+    FileResponse for a run output (final_allocations.csv, sim_offer_events.json, ...).
+    Files come from the published run (default: LATEST); `fname` may
+    omit the .json / .csv extension. Honours If-None-Match, Accept-Encoding
+    and Range (see download_service.serve_file).
     """
-    from fastapi.responses import FileResponse
+    for candidate in (fname, f"{fname}.json", f"{fname}.csv"):
+        try:
+            return _serve(candidate, run_id, headers or {}, filename=candidate)
+        except FileNotFoundError:
+            continue
+
+    raise FileNotFoundError()
 
-    # candidate paths
-    candidates = [
-        os.path.join(OUTPUT_DIR, fname),
-        os.path.join(JSON_DIR, fname),
-        os.path.join(JSON_DIR, f"{fname}.json"),
-        os.path.join(OUTPUT_DIR, f"{fname}.csv"),
-    ]
 
-    for p in candidates:
-        if os.path.exists(p):
-            return FileResponse(p, media_type="application/octet-stream", filename=os.path.basename(p))
+def _serve(fname, run_id, headers, media_type="application/octet-stream", filename=None):
+    # resolve LATEST once so the file and its manifest come from the same run
+    resolved = run_id or run_store.latest_run_id()
+    path = _output_path(fname, resolved)
+    if resolved is None:
+        # pre-workspace output: no manifest, no sidecars
+        return serve_file(path, headers, media_type=media_type, filename=filename)
+
+    manifest = run_store.read_manifest(resolved)
+    return serve_file(
+        path, headers,
+        etag=manifest.get("etags", {}).get(fname),
+        encodings=manifest.get("encodings", {}).get(fname, ()),
+        immutable=run_id is not None,
+        media_type=media_type,
+        filename=filename,
+    )
 
-    raise FileNotFoundError()
+
+def _output_path(fname, run_id=None):
+    """
+    Resolves fname in a published run. Until the first run has been
+    published, falls back to the pre-workspace output/ and json_outputs/.
+    """
+    if run_id is not None or run_store.latest_run_id() is not None:
+        return run_store.run_file(fname, run_id)
+
+    if os.path.basename(fname) == fname:
+        for legacy_dir in (JSON_DIR, OUTPUT_DIR):
+            p = os.path.join(legacy_dir, fname)
+            if os.path.isfile(p):
+                return p
+
+    if fname == LAST_RESULTS:
+        raise FileNotFoundError("No results found. Run /admin/allocate first.")
+    raise FileNotFoundError(fname)
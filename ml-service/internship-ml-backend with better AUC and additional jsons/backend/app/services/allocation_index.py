@@ -0,0 +1,174 @@
+import os
+import time
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from backend.app.services import run_store
+
+# Written into each run workspace at publish time:
+#   records — one fixed-width row per student in the cohort
+#   slots   — open-addressing hash table of record positions (-1 = empty)
+INDEX_RECORDS = "allocation_index.npy"
+INDEX_SLOTS = "allocation_index_slots.npy"
+
+# How often a lookup re-checks which run LATEST points at
+INDEX_RECHECK_SECONDS = 1.0
+
+_EMPTY = -1
+
+# "latest" is one (run_id, records, slots) tuple, replaced in a single
+# assignment so a lock-free reader never mixes two runs
+_cache_lock = threading.Lock()
+_cache = {"latest": None, "checked": 0.0}
+
+
+def _hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+# ======================================================================
+# BUILD (at publish time)
+# ======================================================================
+def build_allocation_index(run_dir, final_df, students_df, offer_events, boosted_df):
+    """
+    Per-student outcome (internship, pref_rank, round, final_score,
+    boost_amount) for every student in the cohort, plus a hash table
+    over student_id, saved as .npy files that lookups memory-map.
+    """
+    sids = students_df["student_id"].astype(str).drop_duplicates().reset_index(drop=True)
+    out = pd.DataFrame({"student_id": sids})
+
+    final = final_df[["student_id", "internship_id", "pref_rank"]].astype({"student_id": str, "internship_id": str})
+
+    # Round + score of the accepted offer that produced the final seat
+    accepted = pd.DataFrame([e for e in offer_events if e.get("accepted")],
+                            columns=["round", "student_id", "internship_id", "final_score"])
+    accepted = accepted.astype({"student_id": str, "internship_id": str})
+    accepted = accepted.sort_values("round").drop_duplicates(["student_id", "internship_id"], keep="last")
+    final = final.merge(accepted, on=["student_id", "internship_id"], how="left")
+
+    boost = boosted_df[["student_id", "internship_id", "boost_amount"]].astype({"student_id": str, "internship_id": str})
+    final = final.merge(boost, on=["student_id", "internship_id"], how="left")
+
+    out = out.merge(final, on="student_id", how="left")
+
+    sid_bytes = out["student_id"].str.encode("utf-8").values
+    iid_bytes = out["internship_id"].fillna("").str.encode("utf-8").values
+    records = np.zeros(len(out), dtype=[
+        ("student_id", f"S{max(1, max(map(len, sid_bytes), default=1))}"),
+        ("internship_id", f"S{max(1, max(map(len, iid_bytes), default=1))}"),
+        ("pref_rank", "i1"),
+        ("round", "i2"),
+        ("final_score", "f4"),
+        ("boost_amount", "f4"),
+    ])
+    records["student_id"] = sid_bytes
+    records["internship_id"] = iid_bytes
+    records["pref_rank"] = out["pref_rank"].fillna(0).astype(int).values
+    records["round"] = out["round"].fillna(0).astype(int).values
+    records["final_score"] = out["final_score"].fillna(np.nan).astype(float).values
+    records["boost_amount"] = out["boost_amount"].fillna(0.0).astype(float).values
+
+    slots = _build_slots(np.array([_hash(k) for k in sid_bytes], dtype=np.uint64))
+
+    np.save(os.path.join(run_dir, INDEX_RECORDS), records)
+    np.save(os.path.join(run_dir, INDEX_SLOTS), slots)
+
+
+def _build_slots(hashes):
+    """
+    Linear-probing table at ≤50% load. Inserted in vectorised rounds:
+    each round, the first unplaced key per free slot claims it and the
+    rest move to the next slot.
+    """
+    size = 1 << max(4, int(2 * max(len(hashes), 1) - 1).bit_length())
+    mask = np.uint64(size - 1)
+    slots = np.full(size, _EMPTY, dtype=np.int64)
+
+    pending = np.arange(len(hashes))
+    pos = (hashes & mask).astype(np.int64)
+
+    while len(pending):
+        free = slots[pos] == _EMPTY
+        cand_pos, first = np.unique(pos[free], return_index=True)
+        winners = pending[free][first]
+        slots[cand_pos] = winners
+
+        placed = np.zeros(len(pending), dtype=bool)
+        placed[np.flatnonzero(free)[first]] = True
+        pending = pending[~placed]
+        pos = (pos[~placed] + 1) & (size - 1)
+
+    return slots
+
+
+# ======================================================================
+# LOOKUP
+# ======================================================================
+def _load(run_id=None):
+    """Memory-mapped index of run_id, or of LATEST (re-checked every INDEX_RECHECK_SECONDS)."""
+    if run_id is not None:
+        run_dir = run_store.resolve_run_dir(run_id)
+        return run_id, *_open(run_dir)
+
+    now = time.monotonic()
+    cached = _cache["latest"]
+    if cached is not None and now - _cache["checked"] < INDEX_RECHECK_SECONDS:
+        return cached
+
+    with _cache_lock:
+        latest = run_store.latest_run_id()
+        if latest is None:
+            raise FileNotFoundError("No published allocation yet.")
+        cached = _cache["latest"]
+        if cached is None or cached[0] != latest:
+            cached = (latest, *_open(run_store.resolve_run_dir(latest)))
+            _cache["latest"] = cached
+        _cache["checked"] = now
+        return cached
+
+
+def _open(run_dir):
+    path = os.path.join(run_dir, INDEX_RECORDS)
+    if not os.path.exists(path):
+        raise FileNotFoundError("This run has no allocation index; run /admin/allocate again.")
+    return (np.load(path, mmap_mode="r"),
+            np.load(os.path.join(run_dir, INDEX_SLOTS), mmap_mode="r"))
+
+
+def lookup_allocation(student_id, run_id=None):
+    """
+    Allocation outcome of one student: O(1) hash probe, no DataFrame.
+    Raises KeyError for a student not in the run's cohort.
+    """
+    run_id, records, slots = _load(run_id)
+
+    key = str(student_id).encode("utf-8")
+    mask = len(slots) - 1
+    i = _hash(key) & mask
+    while True:
+        pos = int(slots[i])
+        if pos == _EMPTY:
+            raise KeyError(f"Student '{student_id}' not found")
+        rec = records[pos]
+        if rec["student_id"] == key:
+            break
+        i = (i + 1) & mask
+
+    iid = rec["internship_id"].decode("utf-8")
+    if not iid:
+        return {"student_id": str(student_id), "allocated": False, "run_id": run_id}
+
+    score = float(rec["final_score"])
+    return {
+        "student_id": str(student_id),
+        "allocated": True,
+        "internship_id": iid,
+        "pref_rank": int(rec["pref_rank"]),
+        "round": int(rec["round"]) or None,
+        "final_score": None if np.isnan(score) else round(score, 6),
+        "boost_applied": round(float(rec["boost_amount"]), 6),
+        "run_id": run_id,
+    }
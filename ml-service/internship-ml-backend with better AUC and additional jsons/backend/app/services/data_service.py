@@ -1,5 +1,7 @@
 import os
 
+from src.ingest import ingest_csv
+
 DATA_DIR = "data"
 
 
@@ -10,17 +12,16 @@ def _ensure_data_dir():
 
 def upload_students_csv(file):
     """
-    Save UploadFile to data/students.csv
+    Streams an UploadFile into data/students.csv + the typed
+    data/students.parquet dataset. Returns the validation report
+    (rejected rows with line numbers); raises ValueError if the
+    file is unusable.
     """
     _ensure_data_dir()
-    file_path = os.path.join(DATA_DIR, "students.csv")
-    # file.file is SpooledTemporaryFile (binary). Read bytes and write.
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
+    # file.file is a SpooledTemporaryFile (binary), read in blocks
+    return ingest_csv(file.file, "students", DATA_DIR)
 
 
 def upload_internships_csv(file):
     _ensure_data_dir()
-    file_path = os.path.join(DATA_DIR, "internships.csv")
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
+    return ingest_csv(file.file, "internships", DATA_DIR)
@@ -0,0 +1,150 @@
+import os
+import gzip
+import shutil
+import hashlib
+
+from fastapi.responses import FileResponse, Response
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip sidecars only
+    zstandard = None
+
+# Precompressed sidecars written next to each run file at publish time
+COMPRESSIBLE_EXTS = (".json", ".csv")
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Content-Encoding → sidecar suffix, in order of preference
+SIDECARS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+# ======================================================================
+# PUBLISH: CONTENT HASHES + SIDECARS
+# ======================================================================
+def prepare_downloads(run_dir):
+    """
+    Content-hash ETag for every file in a run directory plus gzip (and,
+    with zstandard installed, zstd) sidecars for JSON/CSV files that
+    shrink. Returns {"files", "etags", "encodings"} for the run manifest.
+    """
+    files = sorted(
+        f for f in os.listdir(run_dir)
+        if os.path.isfile(os.path.join(run_dir, f)) and not f.endswith(tuple(SIDECARS.values()))
+    )
+    etags, encodings = {}, {}
+
+    for fname in files:
+        path = os.path.join(run_dir, fname)
+        etags[fname] = _sha256(path)[:32]
+
+        size = os.path.getsize(path)
+        if not fname.endswith(COMPRESSIBLE_EXTS) or size < MIN_COMPRESS_BYTES:
+            continue
+
+        available = []
+        for encoding, suffix in SIDECARS.items():
+            if encoding == "zstd" and zstandard is None:
+                continue
+            sidecar = path + suffix
+            _compress(path, sidecar, encoding)
+            # keep a sidecar only if it saves at least 10%
+            if os.path.getsize(sidecar) < 0.9 * size:
+                available.append(encoding)
+            else:
+                os.remove(sidecar)
+        if available:
+            encodings[fname] = available
+
+    return {"files": files, "etags": etags, "encodings": encodings}
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _compress(src, dst, encoding):
+    with open(src, "rb") as fin:
+        if encoding == "gzip":
+            # mtime=0 keeps the sidecar bytes a pure function of the content
+            with open(dst, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb",
+                                                       compresslevel=GZIP_LEVEL, mtime=0) as fout:
+                shutil.copyfileobj(fin, fout, 1 << 20)
+        else:
+            with open(dst, "wb") as fout:
+                zstandard.ZstdCompressor(level=ZSTD_LEVEL).copy_stream(fin, fout)
+
+
+# ======================================================================
+# SERVE: CONDITIONAL GET, ENCODING NEGOTIATION, RANGES
+# ======================================================================
+def serve_file(path, headers, etag=None, encodings=(), immutable=False,
+               media_type="application/octet-stream", filename=None):
+    """
+    FileResponse with:
+      - strong content-hash ETag per representation + 304 on If-None-Match
+      - precompressed sidecar picked from Accept-Encoding
+      - byte ranges (identity representation only, handled by Starlette)
+    Without an etag (pre-workspace files) it is a plain FileResponse.
+    """
+    disposition = {"filename": filename} if filename else {}
+    if etag is None:
+        return FileResponse(path, media_type=media_type, **disposition)
+
+    encoding = None
+    if "range" not in headers:
+        encoding = _pick_encoding(headers.get("accept-encoding", ""), encodings)
+
+    tag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+    out_headers = {
+        "ETag": tag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "private, max-age=31536000, immutable" if immutable else "no-cache",
+    }
+
+    if _etag_matches(headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=out_headers)
+
+    if encoding:
+        out_headers["Content-Encoding"] = encoding
+        return FileResponse(path + SIDECARS[encoding], media_type=media_type, headers=out_headers, **disposition)
+
+    return FileResponse(path, media_type=media_type, headers=out_headers, **disposition)
+
+
+def _pick_encoding(accept_encoding, available):
+    """Best available sidecar the client accepts (q > 0), zstd before gzip on ties."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in SIDECARS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in available and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def _etag_matches(if_none_match, tag):
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
@@ -0,0 +1,410 @@
+import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import queue
+import threading
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.models import MODEL_MATCH_PATH, MODEL_ACCEPT_PATH
+from src.featurize import VECTORIZER_PATH
+from src.instrumentation import remember_run, last_run
+from backend.app.services.metrics_service import METRICS
+
+DATA_DIR = "data"
+MODELS_DIR = "models"
+JSON_DIR = "json_outputs"
+
+# Job table shared by the API process and the pool workers
+JOBS_DB = os.path.join(JSON_DIR, "jobs.sqlite")
+
+# Pool size. Allocation runs write to their own run workspaces, but
+# training rewrites models/ in place, so the default of 1 runs jobs
+# strictly one after another.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
+
+# ProcessPoolExecutor(max_tasks_per_child=...) is Python 3.11+
+POOL_RECYCLES_WORKERS = sys.version_info >= (3, 11)
+
+# Files whose content decides whether two requests are "the same job"
+DATASET_INPUTS = [os.path.join(DATA_DIR, f) for f in ("students.csv", "students.parquet",
+                                                      "internships.csv", "internships.parquet")]
+JOB_INPUTS = {
+    "train": DATASET_INPUTS,
+    "allocate": DATASET_INPUTS + [MODEL_MATCH_PATH, MODEL_ACCEPT_PATH, VECTORIZER_PATH],
+}
+
+# Where each kind of job leaves its results (allocate: its run workspace)
+RESULT_LOCATIONS = {
+    "train": MODELS_DIR,
+    "allocate": os.path.join(JSON_DIR, "runs"),
+}
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id        TEXT PRIMARY KEY,
+    kind          TEXT NOT NULL,
+    job_key       TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    params        TEXT,
+    owner_pid     INTEGER,
+    created_at    REAL,
+    started_at    REAL,
+    finished_at   REAL,
+    current_stage TEXT,
+    stages        TEXT,
+    result        TEXT,
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_key_status ON jobs (job_key, status);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at);
+
+-- Progress stream: id doubles as the SSE event id
+CREATE TABLE IF NOT EXISTS job_events (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id     TEXT NOT NULL,
+    event      TEXT NOT NULL,
+    data       TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, id);
+"""
+
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+_lock = threading.Lock()
+_pool = None
+_futures = {}
+_db_ready = False
+
+
+# ======================================================================
+# SQLITE STORE
+# ======================================================================
+def _connect():
+    conn = sqlite3.connect(JOBS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _init_db():
+    """Creates the table and fails jobs left behind by a dead API process."""
+    global _db_ready
+    if _db_ready:
+        return
+
+    os.makedirs(JSON_DIR, exist_ok=True)
+    with _connect() as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+        rows = conn.execute(
+            "SELECT job_id, owner_pid FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+        ).fetchall()
+        for row in rows:
+            if row["owner_pid"] == os.getpid() or _pid_alive(row["owner_pid"]):
+                continue
+            error = "Interrupted: server restarted before the job finished"
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE job_id = ?",
+                (time.time(), error, row["job_id"]),
+            )
+            _add_event(conn, row["job_id"], "status", {"status": "failed", "error": error})
+
+    _db_ready = True
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _add_event(conn, job_id, event, data):
+    conn.execute(
+        "INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+        (job_id, event, json.dumps(data), time.time()),
+    )
+
+
+def _job_record(row):
+    job = dict(row)
+    for col in ("params", "stages", "result"):
+        job[col] = json.loads(job[col]) if job[col] else None
+
+    now = time.time()
+    started, finished = job["started_at"], job["finished_at"]
+    job["timings"] = {
+        "queued_s": round((started or finished or now) - job["created_at"], 3),
+        "run_s": None if started is None else round((finished or now) - started, 3),
+        "stages_s": {s["stage"]: s["wall_s"] for s in job["stages"] or [] if s["wall_s"] is not None},
+    }
+    job["result_location"] = None
+    if job["status"] == "succeeded":
+        summary = (job["result"] or {}).get("summary", {})
+        job["result_location"] = summary.get("run_dir") or RESULT_LOCATIONS.get(job["kind"])
+    del job["owner_pid"], job["job_key"]
+    return job
+
+
+# ======================================================================
+# API SIDE
+# ======================================================================
+def submit_job(kind, params=None):
+    """
+    Queues a train/allocate job and returns its record immediately.
+    A request identical to a queued/running job (same kind, params and
+    input files) returns that job instead, with "coalesced": True.
+    """
+    if kind not in JOB_INPUTS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+
+    params = params or {}
+    key = _job_key(kind, params)
+
+    with _lock:
+        _init_db()
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE job_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (key, *ACTIVE_STATUSES),
+            ).fetchone()
+            if row is not None:
+                return {**_job_record(row), "coalesced": True}
+
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, job_key, status, params, owner_pid, created_at, stages) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, '[]')",
+                (job_id, kind, key, json.dumps(params), os.getpid(), time.time()),
+            )
+            _add_event(conn, job_id, "status", {"status": "queued"})
+
+        future = _get_pool().submit(_run_job, job_id, kind, params)
+        _futures[job_id] = future
+
+    future.add_done_callback(functools.partial(_on_job_done, job_id, kind))
+    return {**get_job(job_id), "coalesced": False}
+
+
+def get_job(job_id):
+    _init_db()
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"Job '{job_id}' not found")
+    return _job_record(row)
+
+
+def list_jobs(limit=20, kind=None):
+    _init_db()
+    query, args = "SELECT * FROM jobs", []
+    if kind:
+        query, args = query + " WHERE kind = ?", [kind]
+    with _connect() as conn:
+        rows = conn.execute(query + " ORDER BY created_at DESC LIMIT ?", (*args, limit)).fetchall()
+    return [_job_record(r) for r in rows]
+
+
+def get_job_events(job_id, after_id=0, limit=500):
+    """
+    Progress events of a job with id > after_id, oldest first, and
+    whether the job has finished. Event kinds: status, stage, round.
+    """
+    _init_db()
+    with _connect() as conn:
+        job = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if job is None:
+            raise KeyError(f"Job '{job_id}' not found")
+        rows = conn.execute(
+            "SELECT id, event, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (job_id, after_id, limit),
+        ).fetchall()
+
+    events = [{"id": r["id"], "event": r["event"], "data": json.loads(r["data"])} for r in rows]
+    # finished only once the final status event has been read too
+    done = job["status"] in TERMINAL_STATUSES and len(rows) < limit
+    return events, done
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: workers never inherit the API's threads/sockets;
+        # one task per child hands a job's memory back to the OS
+        # (before 3.11, _on_job_done retires the idle pool instead)
+        extra = {"max_tasks_per_child": 1} if POOL_RECYCLES_WORKERS else {}
+        _pool = ProcessPoolExecutor(
+            max_workers=JOB_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            **extra,
+        )
+    return _pool
+
+
+def _job_key(kind, params):
+    h = hashlib.sha256()
+    h.update(kind.encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    for path in JOB_INPUTS[kind]:
+        h.update(path.encode())
+        if os.path.exists(path):
+            st = os.stat(path)
+            h.update(f"{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+def _on_job_done(job_id, kind, future):
+    """Runs in the API process once the worker returns (or dies)."""
+    global _pool
+
+    exc = future.exception()
+    with _lock:
+        _futures.pop(job_id, None)
+        if isinstance(exc, BrokenProcessPool) and _pool is not None:
+            # a killed worker (e.g. OOM) breaks the whole pool; start a fresh one next time
+            _pool.shutdown(wait=False)
+            _pool = None
+        elif not POOL_RECYCLES_WORKERS and not _futures and _pool is not None:
+            # no max_tasks_per_child: drop the idle pool so its workers exit
+            _pool.shutdown(wait=False)
+            _pool = None
+
+    if exc is not None:
+        # worker crashed before it could record the failure itself
+        error = f"{type(exc).__name__}: {exc}"
+        with _connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, current_stage = NULL, error = ? WHERE job_id = ?",
+                (time.time(), error, job_id),
+            )
+            _add_event(conn, job_id, "status", {"status": "failed", "error": error})
+        return
+
+    out = future.result()
+    if out is None:
+        return
+
+    # The worker's run record feeds /metrics and /admin/run-metrics here
+    if out.get("run") is not None:
+        remember_run(out["run"])
+
+    if kind == "allocate":
+        METRICS.inc("allocation_runs_total")
+        summary = out["result"]["summary"]
+        METRICS.inc("pairs_scored_total", summary["pairs_scored"])
+        METRICS.inc("score_cache_hits_total", summary.get("cache_hits", 0))
+        METRICS.inc("score_cache_misses_total", summary.get("cache_misses", 0))
+    elif kind == "train":
+        from backend.app.services.model_service import reset_models
+        reset_models()
+
+
+# ======================================================================
+# WORKER SIDE
+# ======================================================================
+class _JobReporter:
+    """
+    Progress sink for one job in the worker process. The computation
+    thread only enqueues (SimpleQueue.put never blocks); a daemon thread
+    writes job-row updates and job_events rows to SQLite in order.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.stages = []
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._drain, name=f"job-{job_id}-events", daemon=True)
+        self._thread.start()
+
+    # -- called from the computation thread -----------------------------
+    def stage(self, event, name, wall_s):
+        self._queue.put(("stage", {"event": event, "stage": name,
+                                   "wall_s": None if wall_s is None else round(wall_s, 3)}))
+
+    def round(self, stats):
+        self._queue.put(("round", stats))
+
+    def status(self, status, **fields):
+        self._queue.put(("status", {"status": status, **fields}))
+
+    def close(self):
+        """Flushes everything queued so far, then stops the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    # -- writer thread ---------------------------------------------------
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+            except sqlite3.Error as e:
+                # progress is best-effort; never take the job down with it
+                print(f"Job {self.job_id}: could not record progress ({e})")
+
+    def _write(self, kind, data):
+        fields = {}
+        if kind == "stage":
+            if data["event"] == "start":
+                self.stages.append({"stage": data["stage"], "status": "running", "wall_s": None})
+            else:
+                for s in reversed(self.stages):
+                    if s["stage"] == data["stage"] and s["status"] == "running":
+                        s.update(status="done", wall_s=data["wall_s"])
+                        break
+            fields = {"current_stage": data["stage"] if data["event"] == "start" else None,
+                      "stages": json.dumps(self.stages)}
+        elif kind == "status":
+            fields = dict(data)
+            # the event carries status/error only; the result stays on the job row
+            data = {k: v for k, v in data.items() if k in ("status", "error")}
+
+        with _connect() as conn:
+            if fields:
+                cols = ", ".join(f"{k} = ?" for k in fields)
+                conn.execute(f"UPDATE jobs SET {cols} WHERE job_id = ?", (*fields.values(), self.job_id))
+            _add_event(conn, self.job_id, kind, data)
+
+
+def _run_job(job_id, kind, params):
+    """
+    Pool entry point. Records success/failure in SQLite itself and
+    returns {"result", "run"} on success, None on failure.
+    """
+    reporter = _JobReporter(job_id)
+    reporter.status("running", started_at=time.time())
+
+    try:
+        if kind == "train":
+            from backend.app.services.train_service import train_all
+            result = train_all(on_stage=reporter.stage, **params)
+        else:
+            from backend.app.services.allocate_service import allocate_all
+            result = allocate_all(on_stage=reporter.stage, on_round=reporter.round, **params)
+    except Exception as e:
+        reporter.status("failed", finished_at=time.time(), current_stage=None,
+                        error=f"{type(e).__name__}: {e}")
+        reporter.close()
+        return None
+
+    reporter.status("succeeded", finished_at=time.time(), current_stage=None,
+                    result=json.dumps(result))
+    reporter.close()
+    return {"result": result, "run": last_run(kind)}
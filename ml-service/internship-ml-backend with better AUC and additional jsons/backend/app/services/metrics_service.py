@@ -0,0 +1,253 @@
+import os
+import time
+import bisect
+import threading
+
+from src.instrumentation import last_run
+
+
+# Request latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name → (type, help)
+METRIC_HELP = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route template, method and status."),
+    "http_requests_in_flight": ("gauge", "Requests currently being served."),
+    "predictions_total": ("counter", "Student-internship pairs scored by the online endpoints."),
+    "model_load_seconds": ("gauge", "Time taken by the last model + vectorizer load."),
+    "model_info": ("gauge", "Active model version (content hash of the model files)."),
+    "pairs_scored_total": ("counter", "Pairs scored by allocation runs since process start."),
+    "allocation_runs_total": ("counter", "Completed allocation runs since process start."),
+    "allocation_run_duration_seconds": ("gauge", "Wall time of the last allocation run."),
+    "allocation_stage_duration_seconds": ("gauge", "Wall time per stage of the last allocation run (inclusive)."),
+    "allocation_pairs_scored": ("gauge", "Pairs scored by the last allocation run."),
+    "allocation_run_counter": ("gauge", "Counters of the last allocation run (e.g. score cache hits / misses)."),
+    "score_cache_hits_total": ("counter", "Pair scores served from the score cache by allocation runs."),
+    "score_cache_misses_total": ("counter", "Pair scores missing from the score cache in allocation runs."),
+    "process_resident_memory_bytes": ("gauge", "Resident set size of this process."),
+    "process_cpu_seconds_total": ("counter", "User + system CPU time of this process."),
+    "process_start_time_seconds": ("gauge", "Unix time the process started."),
+}
+
+_PROCESS_START = time.time()
+
+
+# ======================================================================
+# THREAD-SHARDED REGISTRY
+# ======================================================================
+class _Shard:
+    """One thread's counters / histograms; written only by that thread."""
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+
+class MetricsRegistry:
+    """
+    Counters, histograms and up/down gauges are kept in per-thread shards,
+    so the hot path is a couple of dict updates with no lock; shards
+    are summed only when /metrics is scraped. Set-style gauges (model
+    version, load time) change rarely and live in one locked dict.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._gauges = {}
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, value=1.0, **labels):
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0.0) + value
+
+    def observe(self, name, value, **labels):
+        histograms = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        h = histograms.get(key)
+        if h is None:
+            # per-bucket counts (last = +Inf), sum, count
+            h = histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        h[0][bisect.bisect_left(self.buckets, value)] += 1
+        h[1] += value
+        h[2] += 1
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = float(value)
+
+    def clear_gauge(self, name):
+        with self._lock:
+            for key in [k for k in self._gauges if k[0] == name]:
+                del self._gauges[key]
+
+    def collect(self):
+        """Merged (counters, histograms, gauges) snapshot."""
+
+        with self._lock:
+            shards = list(self._shards)
+            gauges = dict(self._gauges)
+
+        counters, histograms = {}, {}
+        for shard in shards:
+            for key, v in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0.0) + v
+            for key, (counts, total, n) in list(shard.histograms.items()):
+                agg = histograms.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+                agg[0] = [a + b for a, b in zip(agg[0], counts)]
+                agg[1] += total
+                agg[2] += n
+
+        return counters, histograms, gauges
+
+
+METRICS = MetricsRegistry()
+
+
+# ======================================================================
+# PROMETHEUS TEXT FORMAT
+# ======================================================================
+def render_metrics():
+    """All metrics in Prometheus text exposition format (0.0.4)."""
+
+    counters, histograms, gauges = METRICS.collect()
+    gauges.update(_process_gauges())
+    gauges.update(_allocation_gauges())
+
+    counters[("process_cpu_seconds_total", ())] = sum(os.times()[:2])
+
+    families = {}
+    for (name, labels), v in sorted(counters.items()):
+        families.setdefault(name, []).append(_sample(name, labels, v))
+    for (name, labels), v in sorted(gauges.items()):
+        families.setdefault(name, []).append(_sample(name, labels, v))
+    for (name, labels), (counts, total, n) in sorted(histograms.items()):
+        # buckets stay in ascending `le` order, ending with +Inf
+        lines = families.setdefault(name, [])
+        cumulative = 0
+        for bound, c in zip(METRICS.buckets + (float("inf"),), counts):
+            cumulative += c
+            lines.append(_sample(f"{name}_bucket", labels + (("le", _fmt(bound)),), cumulative))
+        lines.append(_sample(f"{name}_sum", labels, total))
+        lines.append(_sample(f"{name}_count", labels, n))
+
+    out = []
+    for name in sorted(families):
+        kind, text = METRIC_HELP.get(name, ("untyped", name))
+        out.append(f"# HELP {name} {text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(families[name])
+
+    return "\n".join(out) + "\n"
+
+
+def _sample(name, labels, value):
+    if labels:
+        inner = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+        return f"{name}{{{inner}}} {_fmt(value)}"
+    return f"{name} {_fmt(value)}"
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(v):
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _process_gauges():
+    gauges = {("process_start_time_seconds", ()): _PROCESS_START}
+    try:
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        gauges[("process_resident_memory_bytes", ())] = rss
+    except (OSError, ValueError):
+        pass
+    return gauges
+
+
+def _allocation_gauges():
+    """Last allocation run's stage breakdown, from src.instrumentation."""
+
+    run = last_run("allocate")
+    if run is None:
+        return {}
+
+    gauges = {("allocation_run_duration_seconds", ()): run["wall_s"] or 0.0}
+    for name, rec in run["stages"].items():
+        gauges[("allocation_stage_duration_seconds", (("stage", name),))] = rec["wall_s"]
+
+    score = run["stages"].get("score")
+    if score and score.get("rows"):
+        gauges[("allocation_pairs_scored", ())] = score["rows"]
+
+    for name, value in run.get("counters", {}).items():
+        gauges[("allocation_run_counter", (("counter", name),))] = value
+
+    return gauges
+
+
+# ======================================================================
+# ASGI MIDDLEWARE — PER-ROUTE LATENCY + IN-FLIGHT
+# ======================================================================
+class MetricsMiddleware:
+    """
+    Times every HTTP request until its last response byte is sent.
+    Routes are labelled by their template (/student/{student_id}/...)
+    to keep label cardinality bounded; unmatched paths are "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        METRICS.inc("http_requests_in_flight", 1)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            METRICS.inc("http_requests_in_flight", -1)
+            METRICS.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - t0,
+                route=_route_template(scope),
+                method=scope.get("method", ""),
+                status=str(status["code"]),
+            )
+
+
+def _route_template(scope):
+    """Full path template of the matched route, prefix included."""
+
+    # Newer FastAPI resolves included routers lazily: scope["route"] is the
+    # router-local route and the prefixed template sits in the route context
+    ctx = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(ctx, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
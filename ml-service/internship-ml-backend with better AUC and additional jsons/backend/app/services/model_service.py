@@ -1,17 +1,92 @@
+import io
 import os
+import json
+import time
+import numpy as np
 import pandas as pd
 from typing import Dict
-from src.models import load_models_and_vectorizer, score_all_pairs
+from src.models import load_models_and_vectorizer, score_all_pairs, model_version
+from src.pair_builder import build_pairs, PREF_COLS
+from src.featurize import prefeaturize_internships, featurize_student_block
+from src.boost_engine import middle_tier_boost_amounts
+from src.ranklist_builder import compute_final_scores
+from src.tree_predictor import FlatTreeEnsemble
+from src.ingest import dataset_path, load_students, load_internships
+from backend.app.services.metrics_service import METRICS
+from backend.app.services import run_store
+
+DATA_DIR = "data"
+JSON_DIR = "json_outputs"
+BOOST_STATS_JSON = "boost_stats.json"
+
+# Hard limit on pairs scored by one /student/predict/batch call
+MAX_BATCH_PAIRS = 50000
+
+# Upper bound for k in /student/{id}/recommendations
+MAX_RECOMMENDATIONS = 100
+
+# Inference engine for the match/accept models:
+#   lightgbm → LGBMClassifier.predict_proba
+#   numpy    → flattened trees evaluated in NumPy (src/tree_predictor.py)
+#   auto     → numpy for batches up to NUMPY_MAX_ROWS rows, lightgbm above
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "lightgbm").lower()
+NUMPY_MAX_ROWS = 8
 
 # Lazy-load models once
 _MODEL_CACHE = None
 
+# students/internships CSVs, reloaded only when the files change
+_ENTITY_CACHE = {"key": None, "students": None, "internships": None}
+
+# Pre-featurized internship block + last run's boost pools, aligned by row
+_BLOCK_CACHE = {"key": None, "block": None, "median": None, "sigma": None}
+
+
 def _load():
     global _MODEL_CACHE
     if _MODEL_CACHE is None:
-        _MODEL_CACHE = load_models_and_vectorizer()
+        t0 = time.perf_counter()
+        model_match, model_accept, vectorizer = load_models_and_vectorizer()
+
+        if INFERENCE_ENGINE in ("numpy", "auto"):
+            max_rows = NUMPY_MAX_ROWS if INFERENCE_ENGINE == "auto" else None
+            model_match = FlatTreeEnsemble.from_lgbm(model_match, max_rows=max_rows)
+            model_accept = FlatTreeEnsemble.from_lgbm(model_accept, max_rows=max_rows)
+        elif INFERENCE_ENGINE != "lightgbm":
+            raise ValueError(f"Unknown INFERENCE_ENGINE '{INFERENCE_ENGINE}'")
+
+        _MODEL_CACHE = (model_match, model_accept, vectorizer)
+
+        METRICS.set_gauge("model_load_seconds", time.perf_counter() - t0)
+        METRICS.clear_gauge("model_info")
+        METRICS.set_gauge("model_info", 1, version=model_version(), engine=INFERENCE_ENGINE)
     return _MODEL_CACHE
 
+
+def reset_models():
+    """Drop the cached models so the next request loads the freshly trained ones."""
+    global _MODEL_CACHE
+    _MODEL_CACHE = None
+
+
+def _load_entities():
+    students_path = dataset_path("students", DATA_DIR)
+    internships_path = dataset_path("internships", DATA_DIR)
+
+    key = (students_path, os.path.getmtime(students_path), internships_path, os.path.getmtime(internships_path))
+    if _ENTITY_CACHE["key"] != key:
+        students_df = load_students(DATA_DIR)
+        internships_df = load_internships(DATA_DIR)
+
+        # Same skill normalisation as main.py
+        students_df["skills"] = students_df["skills"].astype(str).str.replace(";", " ")
+        internships_df["req_skills"] = internships_df["req_skills"].astype(str).str.replace(";", " ")
+
+        _ENTITY_CACHE.update(key=key, students=students_df, internships=internships_df)
+
+    return _ENTITY_CACHE["students"], _ENTITY_CACHE["internships"]
+
+
 def predict_score(payload) -> Dict:
     """
     payload: pydantic object with .student and .internship
@@ -43,4 +118,264 @@ def predict_score(payload) -> Dict:
     accept = float(scored.iloc[0]["accept_score"])
     final = match * accept
 
+    METRICS.inc("predictions_total", 1, endpoint="predict")
+
     return {"match_score": match, "accept_score": accept, "final_score": final}
+
+
+# ==========================================================
+# BATCH SCORING
+# ==========================================================
+def parse_batch_body(body: bytes, content_type: str) -> pd.DataFrame:
+    """
+    Turns a /student/predict/batch request body into a pair DataFrame.
+
+    Accepted bodies:
+        application/json     → [ {student: {...}, internship: {...}}, ... ]
+                               or flat pair objects
+                               or {"student_ids": [...], "internship_ids": [...]}
+        application/x-ndjson → one pair object per line
+        text/csv             → columns skills, req_skills, gpa, stipend,
+                               reservation, gender, rural (student_id,
+                               internship_id, pref_rank optional)
+
+    Raises ValueError on malformed input or when the batch exceeds MAX_BATCH_PAIRS.
+    """
+    content_type = (content_type or "application/json").split(";")[0].strip().lower()
+
+    try:
+        if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+            records = [json.loads(line) for line in body.splitlines() if line.strip()]
+        elif content_type in ("text/csv", "application/csv"):
+            records = pd.read_csv(io.BytesIO(body)).to_dict(orient="records")
+        else:
+            records = json.loads(body)
+    except (ValueError, pd.errors.ParserError) as e:
+        raise ValueError(f"Could not parse {content_type} body: {e}")
+
+    if isinstance(records, dict):
+        if "student_ids" in records and "internship_ids" in records:
+            return _pairs_from_ids(records["student_ids"], records["internship_ids"])
+        records = records.get("pairs", [records])
+
+    if not isinstance(records, list):
+        raise ValueError("Batch body must be a list of pairs")
+    if len(records) == 0:
+        raise ValueError("Batch is empty")
+    if len(records) > MAX_BATCH_PAIRS:
+        raise ValueError(f"Batch has {len(records)} pairs, limit is {MAX_BATCH_PAIRS}")
+
+    return pd.DataFrame([_pair_row(i, rec) for i, rec in enumerate(records)])
+
+
+def _pair_row(i, rec):
+    if not isinstance(rec, dict):
+        raise ValueError(f"Pair {i} is not an object")
+
+    # Nested {student, internship} objects or a flat row
+    s = rec.get("student", rec)
+    j = rec.get("internship", rec)
+
+    try:
+        return {
+            "student_id": s.get("student_id", rec.get("student_id", i)),
+            "internship_id": j.get("internship_id", rec.get("internship_id", i)),
+            "skills": str(s["skills"]),
+            "req_skills_job": str(j["req_skills"]),
+            "gpa": float(s["gpa"]),
+            "stipend_internship": float(j.get("stipend", 0.0)),
+            "reservation": s.get("reservation", "GEN"),
+            "gender": s.get("gender", "M"),
+            "rural": int(s.get("rural", 0)),
+            "pref_rank": int(rec.get("pref_rank", 1)),
+        }
+    except KeyError as e:
+        raise ValueError(f"Pair {i} is missing field {e}")
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Pair {i} has an invalid value: {e}")
+
+
+def _pairs_from_ids(student_ids, internship_ids):
+    """
+    Student IDs × internship IDs against the uploaded CSVs, in request
+    order (student-major; repeated IDs give repeated pairs).
+    pref_rank comes from the students' own preferences, as in allocation.
+    """
+    if not isinstance(student_ids, list) or not isinstance(internship_ids, list):
+        raise ValueError("student_ids and internship_ids must be lists")
+
+    n_pairs = len(student_ids) * len(internship_ids)
+    if n_pairs == 0:
+        raise ValueError("Batch is empty")
+    if n_pairs > MAX_BATCH_PAIRS:
+        raise ValueError(f"Batch has {n_pairs} pairs, limit is {MAX_BATCH_PAIRS}")
+
+    students_df, internships_df = _load_entities()
+
+    students = students_df.drop_duplicates("student_id").set_index("student_id")
+    internships = internships_df.drop_duplicates("internship_id").set_index("internship_id")
+
+    missing = {i for i in student_ids if i not in students.index}
+    missing |= {i for i in internship_ids if i not in internships.index}
+    if missing:
+        raise ValueError(f"Unknown IDs: {sorted(map(str, missing))[:20]}")
+
+    return build_pairs(students.loc[student_ids].reset_index(),
+                       internships.loc[internship_ids].reset_index())
+
+
+def predict_batch(pairs_df: pd.DataFrame):
+    """
+    Scores every pair in one featurize + predict pass.
+
+    Returns (scored DataFrame, scoring time in ms). final_score is
+    match_score * accept_score, as in /student/predict.
+    """
+    model_match, model_accept, vectorizer = _load()
+
+    t0 = time.perf_counter()
+    scored = score_all_pairs(pairs_df, model_match, model_accept, vectorizer)
+    scored["final_score"] = scored["match_score"] * scored["accept_score"]
+    score_ms = (time.perf_counter() - t0) * 1000
+
+    METRICS.inc("predictions_total", len(scored), endpoint="predict_batch")
+
+    return scored[[
+        "student_id", "internship_id",
+        "match_score", "accept_score", "final_score"
+    ]], score_ms
+
+
+# ==========================================================
+# TOP-N RECOMMENDATIONS
+# ==========================================================
+def _recommendation_block():
+    """
+    Internship block featurized once per (internships dataset, vectorizer,
+    boost_stats.json) version, with the last run's pool median/sigma
+    aligned to block rows.
+    """
+    _, _, vectorizer = _load()
+    _, internships_df = _load_entities()
+
+    stats_path = _boost_stats_path()
+    stats_mtime = os.path.getmtime(stats_path) if stats_path is not None else None
+    key = (_ENTITY_CACHE["key"], id(vectorizer), stats_path, stats_mtime)
+
+    if _BLOCK_CACHE["key"] != key:
+        block = prefeaturize_internships(internships_df, vectorizer)
+        block["index"] = {iid: i for i, iid in enumerate(block["internship_ids"])}
+        block["sector"] = internships_df["sector"].tolist() if "sector" in internships_df else [None] * len(internships_df)
+
+        stats = {}
+        if stats_path is not None:
+            with open(stats_path, "r") as f:
+                stats = json.load(f)
+
+        # Internships without pool stats get a zero window → no boost
+        median = np.zeros(len(block["internship_ids"]))
+        sigma = np.zeros(len(block["internship_ids"]))
+        for i, iid in enumerate(block["internship_ids"]):
+            if str(iid) in stats:
+                median[i] = stats[str(iid)]["median"]
+                sigma[i] = stats[str(iid)]["sigma"]
+
+        _BLOCK_CACHE.update(key=key, block=block, median=median, sigma=sigma)
+
+    return _BLOCK_CACHE["block"], _BLOCK_CACHE["median"], _BLOCK_CACHE["sigma"]
+
+
+def _boost_stats_path():
+    """boost_stats.json of the published run (pre-workspace json_outputs/ before the first one)."""
+    try:
+        return run_store.run_file(BOOST_STATS_JSON)
+    except FileNotFoundError:
+        pass
+    legacy = os.path.join(JSON_DIR, BOOST_STATS_JSON)
+    if run_store.latest_run_id() is None and os.path.exists(legacy):
+        return legacy
+    return None
+
+
+def recommend_for_student(student_id: str, k: int = 10) -> Dict:
+    """
+    Top-k internships for a student from the uploaded students.csv.
+    """
+    students_df, _ = _load_entities()
+
+    match = students_df[students_df["student_id"] == student_id]
+    if match.empty:
+        raise KeyError(f"Unknown student_id '{student_id}'")
+
+    row = match.iloc[0]
+    prefs = [row[c] for c in PREF_COLS if c in students_df.columns]
+
+    result = recommend_for_profile(row.to_dict(), prefs, k)
+    result["student_id"] = student_id
+    return result
+
+
+def recommend_for_profile(student: Dict, prefs, k: int = 10) -> Dict:
+    """
+    Scores one student profile against every internship in a single
+    batched call and returns the top-k by final_score (same score as
+    the allocator's ranklists, with the last run's middle-tier boost).
+
+    student: dict with skills, gpa, reservation, gender, rural
+    prefs: ordered internship IDs (pref_1 first), at most 6 used
+    """
+    if k < 1 or k > MAX_RECOMMENDATIONS:
+        raise ValueError(f"k must be between 1 and {MAX_RECOMMENDATIONS}")
+
+    model_match, model_accept, vectorizer = _load()
+    block, median, sigma = _recommendation_block()
+
+    n = len(block["internship_ids"])
+    reservation = student.get("reservation", "GEN")
+    gender = student.get("gender", "M")
+    rural = int(student.get("rural", 0))
+
+    # Best rank wins if an internship is listed twice
+    pref_ranks = np.full(n, 7, dtype=int)
+    for r, iid in reversed(list(enumerate(list(prefs)[:6], start=1))):
+        pos = block["index"].get(iid)
+        if pos is not None:
+            pref_ranks[pos] = r
+
+    X = featurize_student_block(student, block, vectorizer, pref_ranks)
+    match_score = model_match.predict_proba(X)[:, 1]
+    accept_score = model_accept.predict_proba(X)[:, 1]
+
+    METRICS.inc("predictions_total", n, endpoint="recommendations")
+
+    base_score = 0.6 * match_score + 0.4 * accept_score
+    boost = middle_tier_boost_amounts(
+        base_score, median, sigma,
+        np.full(n, reservation), np.full(n, rural),
+    )
+    boosted_score = np.minimum(base_score + boost, 1.0)
+
+    final_score = compute_final_scores(
+        boosted_score, pref_ranks,
+        np.full(n, reservation), np.full(n, gender), np.full(n, rural),
+    )
+
+    k = min(k, n)
+    top = np.argpartition(-final_score, k - 1)[:k]
+    top = top[np.argsort(-final_score[top], kind="stable")]
+
+    return {
+        "k": int(k),
+        "recommendations": [
+            {
+                "internship_id": block["internship_ids"][i],
+                "sector": block["sector"][i],
+                "final_score": float(final_score[i]),
+                "match_score": float(match_score[i]),
+                "accept_score": float(accept_score[i]),
+                "boost_amount": float(boost[i]),
+                "pref_rank": int(pref_ranks[i]),
+            }
+            for i in top
+        ],
+    }
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+from backend.app.services import run_store
+
+# Written into each run workspace at publish time:
+#   cube — float64 [*dimension sizes, measure]: one cell per combination
+#          of dimension values, measures summed over the students in it
+#   meta — dimension order + labels, measure names
+CUBE_FILE = "olap_cube.npy"
+CUBE_META = "olap_cube.json"
+
+CUBE_DIMENSIONS = ["sector", "reservation", "gender", "rural", "pref_rank", "tier", "location_type"]
+CUBE_MEASURES = ["placed", "eligible", "offers", "rejections", "boost_sum"]
+
+# Dimensions that describe the seat a student got: unplaced students
+# fall into the UNPLACED member (so "eligible" is only meaningful once
+# these are rolled up); missing student attributes go to UNKNOWN
+PLACEMENT_DIMENSIONS = {"sector", "pref_rank", "tier", "location_type"}
+UNPLACED = "unplaced"
+UNKNOWN = "unknown"
+
+# How often a query re-checks which run LATEST points at
+CUBE_RECHECK_SECONDS = 1.0
+
+# "latest" is one (run_id, cube, meta) tuple, replaced in a single
+# assignment so a lock-free reader never mixes two runs
+_cache_lock = threading.Lock()
+_cache = {"latest": None, "checked": 0.0}
+
+
+# ======================================================================
+# BUILD (at publish time)
+# ======================================================================
+def build_cube(run_dir, facts):
+    """
+    Aggregates the per-student fact table (src.analytics_engine.build_facts,
+    built with offer events and boosted pairs) into a dense cube over
+    CUBE_DIMENSIONS with one bincount per measure.
+    """
+    st = facts["students"]
+    placed = st["alloc_order"].values >= 0
+
+    codes, labels = [], {}
+    for dim in CUBE_DIMENSIONS:
+        c, labels[dim] = _dimension(facts, dim, placed)
+        codes.append(c)
+
+    shape = tuple(len(labels[d]) for d in CUBE_DIMENSIONS)
+    flat = np.ravel_multi_index(codes, shape) if len(st) else np.array([], dtype=np.intp)
+    size = int(np.prod(shape))
+
+    zeros = np.zeros(len(st))
+    weights = {
+        "placed": placed.astype(np.float64),
+        "eligible": None,
+        "offers": st["offers"].values if "offers" in st.columns else zeros,
+        "rejections": st["rejections"].values if "rejections" in st.columns else zeros,
+        "boost_sum": (np.where(placed, np.nan_to_num(st["boost_amount"].values.astype(np.float64)), 0.0)
+                      if "boost_amount" in st.columns else zeros),
+    }
+
+    cube = np.empty(shape + (len(CUBE_MEASURES),), dtype=np.float64)
+    for k, measure in enumerate(CUBE_MEASURES):
+        cube[..., k] = np.bincount(flat, weights=weights[measure], minlength=size).reshape(shape)
+
+    np.save(os.path.join(run_dir, CUBE_FILE), cube)
+    with open(os.path.join(run_dir, CUBE_META), "w") as f:
+        json.dump({"dimensions": CUBE_DIMENSIONS, "labels": labels, "measures": CUBE_MEASURES,
+                   "students": len(st)}, f, indent=2)
+
+    return {"cells": size, "nonempty_cells": int((cube[..., CUBE_MEASURES.index("eligible")] > 0).sum())}
+
+
+def _dimension(facts, dim, placed):
+    """Integer codes + string labels of one dimension (last label = UNPLACED / UNKNOWN)."""
+    st = facts["students"]
+    extra = UNPLACED if dim in PLACEMENT_DIMENSIONS else UNKNOWN
+
+    if dim not in st.columns:
+        return np.zeros(len(st), dtype=np.int64), [extra]
+
+    if dim in facts["labels"]:
+        codes = st[dim].values.astype(np.int64)
+        labels = [_label(v) for v in facts["labels"][dim]]
+    else:
+        values = pd.Series(st[dim].values)
+        if dim in PLACEMENT_DIMENSIONS:
+            values = values.where(placed)
+        codes, uniques = pd.factorize(values, sort=True)
+        labels = [_label(v) for v in uniques]
+
+    if dim in PLACEMENT_DIMENSIONS:
+        codes = np.where(placed, codes, -1)
+    codes = np.where(codes >= 0, codes, len(labels))
+    return codes, labels + [extra]
+
+
+def _label(value):
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+# ======================================================================
+# QUERY
+# ======================================================================
+def _load(run_id=None):
+    """Memory-mapped cube of run_id, or of LATEST (re-checked every CUBE_RECHECK_SECONDS)."""
+    if run_id is not None:
+        return run_id, *_open(run_store.resolve_run_dir(run_id))
+
+    now = time.monotonic()
+    cached = _cache["latest"]
+    if cached is not None and now - _cache["checked"] < CUBE_RECHECK_SECONDS:
+        return cached
+
+    with _cache_lock:
+        latest = run_store.latest_run_id()
+        if latest is None:
+            raise FileNotFoundError("No published allocation yet.")
+        cached = _cache["latest"]
+        if cached is None or cached[0] != latest:
+            cached = (latest, *_open(run_store.resolve_run_dir(latest)))
+            _cache["latest"] = cached
+        _cache["checked"] = now
+        return cached
+
+
+def _open(run_dir):
+    path = os.path.join(run_dir, CUBE_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError("This run has no OLAP cube; run /admin/allocate again.")
+    with open(os.path.join(run_dir, CUBE_META), "r") as f:
+        meta = json.load(f)
+    return np.load(path, mmap_mode="r"), meta
+
+
+def query_cube(group_by=None, filters=None, measures=None, run_id=None):
+    """
+    Roll-up of the cube: measures summed over every dimension not in
+    group_by, restricted to the filter members ({dimension: [labels]}).
+    Only combinations with at least one student are returned.
+    Raises ValueError for unknown dimensions / measures.
+    """
+    t0 = time.perf_counter()
+    run_id, cube, meta = _load(run_id)
+    dims, labels = meta["dimensions"], meta["labels"]
+
+    group_by = list(group_by or [])
+    filters = {k: v for k, v in (filters or {}).items() if v}
+    measures = list(measures or meta["measures"])
+
+    for name in group_by + list(filters):
+        if name not in dims:
+            raise ValueError(f"Unknown dimension '{name}' (allowed: {', '.join(dims)})")
+    if len(set(group_by)) != len(group_by):
+        raise ValueError("group_by lists a dimension twice")
+    for name in measures:
+        if name not in meta["measures"]:
+            raise ValueError(f"Unknown measure '{name}' (allowed: {', '.join(meta['measures'])})")
+
+    # Slice the filter members, then sum out everything not grouped on
+    index = []
+    for dim in dims:
+        members = filters.get(dim)
+        if members is None:
+            index.append(np.arange(len(labels[dim])))
+        else:
+            index.append(np.array([labels[dim].index(m) for m in members if m in labels[dim]], dtype=np.intp))
+    measure_idx = np.array([meta["measures"].index(m) for m in measures], dtype=np.intp)
+    eligible_idx = meta["measures"].index("eligible")
+
+    sub = cube[np.ix_(*index, np.r_[eligible_idx, measure_idx])]
+    kept = [d for d in dims if d in group_by]
+    agg = sub.sum(axis=tuple(i for i, d in enumerate(dims) if d not in group_by))
+    agg = agg.transpose([kept.index(g) for g in group_by] + [len(group_by)])
+
+    flat = agg.reshape(-1, agg.shape[-1])
+    rows = []
+    for cell in np.flatnonzero(flat[:, 0] > 0):
+        pos = np.unravel_index(cell, agg.shape[:-1]) if group_by else ()
+        row = {g: labels[g][index[dims.index(g)][p]] for g, p in zip(group_by, pos)}
+        row.update(_measures(measures, flat[cell, 1:]))
+        rows.append(row)
+
+    return {
+        "run_id": run_id,
+        "group_by": group_by,
+        "filters": filters,
+        "rows": rows,
+        "totals": _measures(measures, flat[:, 1:].sum(axis=0)),
+        "query_ms": round((time.perf_counter() - t0) * 1000, 3),
+    }
+
+
+def _measures(names, values):
+    return {m: (round(float(v), 6) if m == "boost_sum" else int(round(v))) for m, v in zip(names, values)}
+
+
+def cube_dimensions(run_id=None):
+    """Dimension members and measure names of a run's cube."""
+    run_id, cube, meta = _load(run_id)
+    return {"run_id": run_id, "dimensions": meta["labels"], "measures": meta["measures"],
+            "cells": int(np.prod(cube.shape[:-1]))}
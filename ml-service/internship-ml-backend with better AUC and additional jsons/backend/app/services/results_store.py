@@ -0,0 +1,260 @@
+import os
+import json
+import sqlite3
+
+from backend.app.services import run_store
+
+# Indexed copy of a run's dashboard data, written next to last_results.json
+RESULTS_DB = "results.sqlite"
+
+# Page size limits for the dashboard query endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# allocations: one row per placed student, with the student / internship
+# attributes the dashboard filters and groups by
+ALLOCATION_COLUMNS = {
+    "student_id": "TEXT PRIMARY KEY",
+    "internship_id": "TEXT",
+    "pref_rank": "INTEGER",
+    "reservation": "TEXT",
+    "gender": "TEXT",
+    "rural": "INTEGER",
+    "gpa": "REAL",
+    "sector": "TEXT",
+    "tier": "TEXT",
+    "location_type": "TEXT",
+    "boosted": "INTEGER",
+    "saved_by_boost": "INTEGER",
+    "rank_improvement_estimate": "REAL",
+}
+ALLOCATION_FILTERS = ("student_id", "internship_id", "pref_rank", "reservation", "gender",
+                      "rural", "sector", "tier", "location_type", "boosted", "saved_by_boost")
+ALLOCATION_INDEXES = ("internship_id", "reservation", "gender", "rural", "sector", "tier", "pref_rank", "boosted")
+
+ROUND_COLUMNS = ("round", "offers_made", "acceptances", "rejections", "upgrades", "seats_filled_this_round")
+
+# boost report entries moved out of the "boost" section into tables
+BOOST_LIST_KEYS = ("rank_improvement_estimate", "students_saved_by_boost")
+
+
+# ======================================================================
+# BUILD (at publish time)
+# ======================================================================
+def build_results_db(path, final_df, students_df, internships_df, round_logs, fairness_report, boost_report):
+    """
+    Writes the run's dashboard data as indexed SQLite tables:
+    allocations, boost_students, rounds, and small JSON sections
+    (summary, fairness, boost) for the summary view.
+    """
+    improvement = {r["student_id"]: r["rank_improvement_estimate"]
+                   for r in boost_report.get("rank_improvement_estimate", [])}
+    saved = set(boost_report.get("students_saved_by_boost", []))
+
+    alloc = final_df[["student_id", "internship_id", "pref_rank"]]
+    alloc = alloc.merge(
+        students_df[[c for c in ("student_id", "reservation", "gender", "rural", "gpa") if c in students_df]],
+        on="student_id", how="left",
+    ).merge(
+        internships_df[[c for c in ("internship_id", "sector", "tier", "location_type") if c in internships_df]],
+        on="internship_id", how="left",
+    )
+    alloc["boosted"] = alloc["student_id"].isin(improvement.keys()).astype(int)
+    alloc["saved_by_boost"] = alloc["student_id"].isin(saved).astype(int)
+    alloc["rank_improvement_estimate"] = alloc["student_id"].map(improvement)
+    for col in ALLOCATION_COLUMNS:
+        if col not in alloc:
+            alloc[col] = None
+    alloc = alloc[list(ALLOCATION_COLUMNS)].astype(object).where(alloc.notna(), None)
+
+    fairness = {k: v for k, v in fairness_report.items() if k != "round_stats"}
+    boost = {k: v for k, v in boost_report.items() if k not in BOOST_LIST_KEYS}
+    summary = {
+        "students": len(students_df),
+        "internships": len(internships_df),
+        "allocations_count": len(final_df),
+    }
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        cols = ", ".join(f"{c} {t}" for c, t in ALLOCATION_COLUMNS.items())
+        conn.execute(f"CREATE TABLE allocations ({cols})")
+        conn.executemany(
+            f"INSERT INTO allocations VALUES ({', '.join('?' * len(ALLOCATION_COLUMNS))})",
+            alloc.itertuples(index=False, name=None),
+        )
+        for col in ALLOCATION_INDEXES:
+            conn.execute(f"CREATE INDEX allocations_{col} ON allocations ({col}, student_id)")
+
+        conn.execute("CREATE TABLE boost_students (student_id TEXT PRIMARY KEY, "
+                     "rank_improvement_estimate REAL, placed INTEGER, saved_by_boost INTEGER)")
+        placed = set(final_df["student_id"])
+        conn.executemany(
+            "INSERT INTO boost_students VALUES (?, ?, ?, ?)",
+            ((sid, float(v), int(sid in placed), int(sid in saved)) for sid, v in improvement.items()),
+        )
+        conn.execute("CREATE INDEX boost_students_improvement ON boost_students (rank_improvement_estimate)")
+
+        conn.execute(f"CREATE TABLE rounds ({', '.join(c + ' INTEGER' for c in ROUND_COLUMNS)})")
+        conn.executemany(
+            f"INSERT INTO rounds VALUES ({', '.join('?' * len(ROUND_COLUMNS))})",
+            ([int(r.get(c, 0)) for c in ROUND_COLUMNS] for r in round_logs),
+        )
+
+        conn.execute("CREATE TABLE sections (name TEXT PRIMARY KEY, data TEXT)")
+        conn.executemany(
+            "INSERT INTO sections VALUES (?, ?)",
+            [("summary", json.dumps(summary)), ("fairness", json.dumps(fairness)), ("boost", json.dumps(boost))],
+        )
+
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ======================================================================
+# QUERIES
+# ======================================================================
+def _open(run_id=None):
+    path = os.path.join(run_store.resolve_run_dir(run_id), RESULTS_DB)
+    if not os.path.exists(path):
+        raise FileNotFoundError("This run has no query index; run /admin/allocate again.")
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _projection(fields, allowed, what="field"):
+    if not fields:
+        return list(allowed)
+    cols = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [c for c in cols if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {what}(s): {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return cols
+
+
+def _page(limit, offset):
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    if offset < 0:
+        raise ValueError("offset must be >= 0")
+    return limit, offset
+
+
+def get_summary(run_id=None, sections=None):
+    """
+    Headline counts, per-round stats and the small report sections
+    (fairness, boost) without any per-student lists.
+    """
+    wanted = _projection(sections, ("fairness", "boost", "rounds"), what="section")
+    conn = _open(run_id)
+    try:
+        data = {r["name"]: json.loads(r["data"]) for r in conn.execute("SELECT name, data FROM sections")}
+        out = {"run_id": run_id or run_store.latest_run_id(), **data["summary"]}
+        for name in wanted:
+            if name == "rounds":
+                out["rounds"] = [dict(r) for r in conn.execute("SELECT * FROM rounds ORDER BY round")]
+            else:
+                out[name] = data[name]
+        return out
+    finally:
+        conn.close()
+
+
+def query_allocations(filters=None, fields=None, limit=DEFAULT_PAGE_SIZE, offset=0, run_id=None):
+    """
+    Page of allocations matching equality filters (any of ALLOCATION_FILTERS),
+    ordered by student_id, with the total match count.
+    """
+    cols = _projection(fields, ALLOCATION_COLUMNS)
+    limit, offset = _page(limit, offset)
+
+    where, args = _where(filters)
+    conn = _open(run_id)
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM allocations{where}", args).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {', '.join(cols)} FROM allocations{where} ORDER BY student_id LIMIT ? OFFSET ?",
+            (*args, limit, offset),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "items": [dict(r) for r in rows],
+    }
+
+
+def count_allocations(group_by, filters=None, run_id=None):
+    """Placed counts grouped by one allocation attribute (e.g. internship_id, sector)."""
+    if group_by not in ALLOCATION_INDEXES:
+        raise ValueError(f"group_by must be one of: {', '.join(ALLOCATION_INDEXES)}")
+
+    where, args = _where(filters)
+    conn = _open(run_id)
+    try:
+        rows = conn.execute(
+            f"SELECT {group_by} AS key, COUNT(*) AS placed FROM allocations{where} "
+            f"GROUP BY {group_by} ORDER BY {group_by}", args,
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return {"group_by": group_by, "groups": [dict(r) for r in rows]}
+
+
+def query_boost_students(placed=None, saved_by_boost=None, min_improvement=None,
+                         limit=DEFAULT_PAGE_SIZE, offset=0, run_id=None):
+    """Page of boosted students, largest rank_improvement_estimate first."""
+    limit, offset = _page(limit, offset)
+
+    clauses, args = [], []
+    if placed is not None:
+        clauses.append("placed = ?")
+        args.append(int(placed))
+    if saved_by_boost is not None:
+        clauses.append("saved_by_boost = ?")
+        args.append(int(saved_by_boost))
+    if min_improvement is not None:
+        clauses.append("rank_improvement_estimate >= ?")
+        args.append(float(min_improvement))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    conn = _open(run_id)
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM boost_students{where}", args).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM boost_students{where} "
+            f"ORDER BY rank_improvement_estimate DESC, student_id LIMIT ? OFFSET ?",
+            (*args, limit, offset),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return {
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if offset + limit < total else None,
+        "items": [dict(r) for r in rows],
+    }
+
+
+def _where(filters):
+    clauses, args = [], []
+    for col, value in (filters or {}).items():
+        if value is None:
+            continue
+        if col not in ALLOCATION_FILTERS:
+            raise ValueError(f"Cannot filter on '{col}'")
+        clauses.append(f"{col} = ?")
+        args.append(value)
+    return (f" WHERE {' AND '.join(clauses)}" if clauses else ""), args
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+
+JSON_DIR = "json_outputs"
+
+# Every allocation run writes into RUNS_DIR/<run_id>/; LATEST names the
+# published run that the dashboard / download endpoints serve.
+RUNS_DIR = os.path.join(JSON_DIR, "runs")
+LATEST_POINTER = os.path.join(RUNS_DIR, "LATEST")
+MANIFEST = "manifest.json"
+
+# Published runs kept by gc_runs() (the LATEST run is always kept)
+RUN_RETENTION = int(os.environ.get("RUN_RETENTION", "5"))
+
+# Unpublished run dirs older than this are treated as crashed and removed
+STALE_RUN_SECONDS = 24 * 3600
+
+
+# ======================================================================
+# WRITING A RUN
+# ======================================================================
+def input_hash(paths):
+    """sha256 over the content of the input files (missing files hash as absent)."""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.basename(path).encode())
+        if not os.path.exists(path):
+            h.update(b"<missing>")
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def create_run(run_id=None):
+    """Creates an empty workspace RUNS_DIR/<run_id>/ and returns (run_id, path)."""
+    if run_id is None:
+        run_id = f"allocate-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    path = os.path.join(RUNS_DIR, run_id)
+    os.makedirs(path)
+    return run_id, path
+
+
+def publish_run(run_id, manifest):
+    """
+    Seals a finished run (manifest.json) and atomically points LATEST at it.
+    Readers see either the previous run or this one, never a mix.
+    """
+    path = run_path(run_id)
+    manifest = {"run_id": run_id, "published_at": time.time(), **manifest}
+    manifest.setdefault("files", sorted(f for f in os.listdir(path) if f != MANIFEST))
+
+    _write_atomic(os.path.join(path, MANIFEST), manifest)
+    pin_run(run_id)
+    return manifest
+
+
+def pin_run(run_id):
+    """Points LATEST at an already published run (publish or roll back)."""
+    if not os.path.exists(os.path.join(run_path(run_id), MANIFEST)):
+        raise FileNotFoundError(f"Run '{run_id}' is not a published run")
+    _write_atomic(LATEST_POINTER, {"run_id": run_id, "pinned_at": time.time()})
+
+
+def _write_atomic(path, obj):
+    tmp = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ======================================================================
+# READING
+# ======================================================================
+def run_path(run_id):
+    if not run_id or os.path.basename(run_id) != run_id or run_id.startswith("."):
+        raise FileNotFoundError(f"Invalid run id '{run_id}'")
+    return os.path.join(RUNS_DIR, run_id)
+
+
+def latest_run_id():
+    """run_id LATEST points at, or None before the first published run."""
+    try:
+        with open(LATEST_POINTER, "r") as f:
+            return json.load(f)["run_id"]
+    except FileNotFoundError:
+        return None
+
+
+def resolve_run_dir(run_id=None):
+    """
+    Directory of the requested published run (default: LATEST).
+    Raises FileNotFoundError if there is no such run.
+    """
+    run_id = run_id or latest_run_id()
+    if run_id is None:
+        raise FileNotFoundError("No published run yet. Run /admin/allocate first.")
+    path = run_path(run_id)
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        raise FileNotFoundError(f"Run '{run_id}' not found")
+    return path
+
+
+def read_manifest(run_id=None):
+    """manifest.json of a published run (default: LATEST)."""
+    with open(os.path.join(resolve_run_dir(run_id), MANIFEST), "r") as f:
+        return json.load(f)
+
+
+def run_file(fname, run_id=None):
+    """Path of fname inside a published run (default: LATEST)."""
+    if os.path.basename(fname) != fname:
+        raise FileNotFoundError(fname)
+    path = os.path.join(resolve_run_dir(run_id), fname)
+    if not os.path.exists(path):
+        raise FileNotFoundError(fname)
+    return path
+
+
+def list_runs():
+    """Manifests of published runs, newest first, with a "latest" flag."""
+    latest = latest_run_id()
+    runs = []
+    for manifest in _published_manifests():
+        runs.append({**manifest, "latest": manifest["run_id"] == latest})
+    return runs
+
+
+def _published_manifests():
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    manifests = []
+    for name in os.listdir(RUNS_DIR):
+        path = os.path.join(RUNS_DIR, name, MANIFEST)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m["published_at"], reverse=True)
+
+
+# ======================================================================
+# RETENTION
+# ======================================================================
+def gc_runs(keep=RUN_RETENTION):
+    """
+    Deletes published runs beyond the newest `keep` (never the LATEST
+    run) and unpublished workspaces older than STALE_RUN_SECONDS.
+    In-progress runs are younger than that and left alone.
+    """
+    if not os.path.isdir(RUNS_DIR):
+        return []
+
+    latest = latest_run_id()
+    published = [m["run_id"] for m in _published_manifests()]
+    doomed = [rid for rid in published[keep:] if rid != latest]
+
+    now = time.time()
+    for name in os.listdir(RUNS_DIR):
+        path = os.path.join(RUNS_DIR, name)
+        if not os.path.isdir(path) or name in published:
+            continue
+        if now - os.path.getmtime(path) > STALE_RUN_SECONDS:
+            doomed.append(name)
+
+    for rid in doomed:
+        shutil.rmtree(os.path.join(RUNS_DIR, rid), ignore_errors=True)
+
+    return doomed
@@ -1,35 +1,50 @@
 import os
-import pandas as pd
 
 from src.data_real_past_generator import generate_pseudo_past_data
 from src.models import train_models
+from src.instrumentation import pipeline_run
+from src.ingest import load_students, load_internships
 
 DATA_DIR = "data"
 MODELS_DIR = "models"
+TRAIN_METRICS_JSON = os.path.join("json_outputs", "train_metrics.json")
 
 
-def train_all(n_samples_past: int = 12000, generator_seed: int = 123, train_seed: int = 42):
+def train_all(n_samples_past: int = 12000, generator_seed: int = 123, train_seed: int = 42,
+              n_shards: int = None, on_stage=None):
     """
     Trains match + accept models using students.csv + internships.csv.
     This is CPU/memory intensive — run locally if possible.
+
+    n_shards: generate past pairs as Parquet shards under data/past_shards
+              (parallel, for large n_samples_past) instead of one CSV.
+    on_stage: optional progress callback (see src.instrumentation.pipeline_run).
     """
-    if not os.path.exists(os.path.join(DATA_DIR, "students.csv")):
-        raise FileNotFoundError("students.csv missing in /data")
+    with pipeline_run("train", out_path=TRAIN_METRICS_JSON, on_stage=on_stage) as run:
+        result = _train_all(n_samples_past, generator_seed, train_seed, n_shards)
+
+    if run is not None:
+        result["run_id"] = run.run_id
+        result["stage_timings_s"] = run.summary()
+
+    return result
 
-    if not os.path.exists(os.path.join(DATA_DIR, "internships.csv")):
-        raise FileNotFoundError("internships.csv missing in /data")
 
-    students_df = pd.read_csv(os.path.join(DATA_DIR, "students.csv"))
-    internships_df = pd.read_csv(os.path.join(DATA_DIR, "internships.csv"))
+def _train_all(n_samples_past, generator_seed, train_seed, n_shards):
+    # typed Parquet datasets (CSV fallback); FileNotFoundError if missing
+    students_df = load_students(DATA_DIR)
+    internships_df = load_internships(DATA_DIR)
 
-    # Generate pseudo past pairs (saved to data/past_pairs_gen.csv)
+    # Generate pseudo past pairs (saved to data/past_pairs_gen.csv, or shards)
     past_path = os.path.join(DATA_DIR, "past_pairs_gen.csv")
     past_df = generate_pseudo_past_data(
         students_df=students_df,
         internships_df=internships_df,
         n_samples=n_samples_past,
         seed=generator_seed,
-        save_path=past_path
+        save_path=None if n_shards else past_path,
+        n_shards=n_shards,
+        shard_dir=os.path.join(DATA_DIR, "past_shards")
     )
 
     # Train models (saves to models/ folder)
@@ -44,6 +59,6 @@ def train_all(n_samples_past: int = 12000, generator_seed: int = 123, train_seed
         "message": "Training completed successfully",
         "students": len(students_df),
         "internships": len(internships_df),
-        "past_pairs_generated": len(past_df),
+        "past_pairs_generated": n_samples_past,
         "models_dir": MODELS_DIR,
     }
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py
+
+Times every pipeline stage in isolation at a chosen scale tier and
+records wall time, CPU time, peak RSS and throughput (rows/s) to JSON,
+optionally comparing against a stored baseline.
+
+Stages:
+    pairs, featurize, score, boost, ranklists, allocation,
+    fairness_report, preference_satisfaction, student_boost_impact,
+    sector_fairness, round_dynamics, internship_quality
+
+Each stage's inputs are prepared (and copied, where the stage mutates
+them) outside the timed region. Scoring uses the trained models in
+models/ — run main.py or /admin/train first.
+
+Cohorts over --max-pairs (medium, large) are benchmarked on a seeded
+sample of their students; est_full_wall_s extrapolates to the full tier.
+
+Usage (from the service root):
+    python -m benchmarks.run_benchmarks --tier small
+    python -m benchmarks.run_benchmarks --tier small --save-baseline
+    python -m benchmarks.run_benchmarks --tier small --threshold 0.15
+    python -m benchmarks.run_benchmarks --tier large --max-pairs 20000000
+    python -m benchmarks.run_benchmarks --students 20000 --internships 300
+    python -m benchmarks.run_benchmarks --data-dir data     # real CSVs
+
+Exit code 1 when any stage regresses by more than --threshold.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+import resource
+
+import numpy as np
+
+from src.cohort_generator import generate_internships, generate_students, popularity_weights
+from src.ingest import load_students, load_internships
+from src.pair_builder import build_pairs
+from src.featurize import featurize_pairs
+from src.models import load_models_and_vectorizer, score_all_pairs
+from src.boost_engine import apply_middle_tier_boost
+from src.ranklist_builder import build_ranklists
+from src.optionC_allotment import optionC_allotment_simulated_rejection
+from src.fairness_report import build_fairness_report
+from src.preference_metrics import compute_preference_satisfaction
+from src.boost_report import build_student_boost_report
+from src.sector_fairness import build_sector_fairness_report
+from src.round_dynamics import analyze_round_dynamics
+from src.internship_quality import compute_internship_quality_scores
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# (students, internships)
+TIERS = {
+    "small": (6_000, 69),
+    "medium": (60_000, 700),
+    "large": (300_000, 2_000),
+}
+
+# Tiers whose cross product exceeds this run on a seeded sample of the
+# students (all internships kept) sized to this many pairs; each stage
+# also reports its wall time scaled up to the full tier (est_full_wall_s)
+MAX_PAIRS = 10_000_000
+
+# Allowed slowdown vs baseline before a stage counts as a regression
+REGRESSION_THRESHOLD = 0.10
+
+# ...and by at least this many seconds (millisecond stages are mostly noise)
+MIN_REGRESSION_SECONDS = 0.05
+
+# RSS sampling period while a stage runs
+RSS_SAMPLE_SECONDS = 0.005
+
+SEED = 123
+
+
+# ======================================================================
+# MEASUREMENT
+# ======================================================================
+class _RssSampler(threading.Thread):
+    """Polls /proc/self/statm; keeps the highest resident set seen."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = _current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, _current_rss())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, _current_rss())
+        return self.peak
+
+
+def _current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Non-Linux: lifetime peak is the best available (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(fn, *args, rows=None, **kwargs):
+    """Runs fn once; returns (output, metrics dict)."""
+
+    sampler = _RssSampler()
+    rss_before = sampler.peak
+    sampler.start()
+
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+    try:
+        out = fn(*args, **kwargs)
+    finally:
+        cpu = time.process_time() - cpu0
+        wall = time.perf_counter() - wall0
+        peak = sampler.stop()
+
+    metrics = {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_mb": round(peak / 1e6, 1),
+        "rss_growth_mb": round((peak - rss_before) / 1e6, 1),
+    }
+    if rows is not None:
+        metrics["rows"] = int(rows)
+        metrics["rows_per_s"] = round(rows / wall, 1) if wall > 0 else None
+
+    return out, metrics
+
+
+# ======================================================================
+# DATA
+# ======================================================================
+def load_cohort(n_students, n_internships, seed=SEED, data_dir=None):
+    """Real datasets from data_dir (Parquet or CSV), else a deterministic synthetic cohort."""
+
+    if data_dir:
+        students_df = load_students(data_dir)
+        internships_df = load_internships(data_dir)
+    else:
+        rng = np.random.default_rng(seed)
+        internships_df = generate_internships(n_internships, rng)
+        popularity = popularity_weights(n_internships, rng)
+        students_df = generate_students(
+            n_students, rng, internships_df["internship_id"].values, popularity
+        )
+
+    # Same normalisation as main.py
+    students_df["skills"] = students_df["skills"].astype(str).str.replace(";", " ")
+    internships_df["req_skills"] = internships_df["req_skills"].astype(str).str.replace(";", " ")
+
+    return students_df, internships_df
+
+
+def sample_students(students_df, n_internships, max_pairs, seed=SEED):
+    """Seeded student sample whose cross product with the internships fits max_pairs."""
+    n = max(1, max_pairs // max(n_internships, 1))
+    if n >= len(students_df):
+        return students_df, 1.0
+    sample = students_df.sample(n=n, random_state=seed).reset_index(drop=True)
+    return sample, n / len(students_df)
+
+
+# ======================================================================
+# STAGES
+# ======================================================================
+def run_stages(students_df, internships_df, out_dir, sample_fraction=1.0):
+    """
+    Runs every stage once, in pipeline order; returns {stage: metrics}.
+    On a sample, est_full_wall_s scales wall time up linearly in the
+    students (internships fixed) — a rough estimate that runs high for
+    stages with a per-internship fixed cost (ranklists).
+    """
+
+    model_match, model_accept, vectorizer = load_models_and_vectorizer()
+    n_students = len(students_df)
+    n_pairs = n_students * len(internships_df)
+
+    stages = {}
+
+    def stage(name, fn, *args, rows=None, **kwargs):
+        print(f"  {name:<24}", end="", flush=True)
+        out, metrics = measure(fn, *args, rows=rows, **kwargs)
+        if sample_fraction < 1.0:
+            metrics["est_full_wall_s"] = round(metrics["wall_s"] / sample_fraction, 2)
+        stages[name] = metrics
+        print(f"{metrics['wall_s']:>9.3f}s  {metrics['peak_rss_mb']:>9.1f} MB")
+        return out
+
+    pairs_df = stage("pairs", build_pairs, students_df, internships_df, rows=n_pairs)
+
+    stage("featurize", featurize_pairs, pairs_df, vectorizer, rows=n_pairs)
+
+    scored = stage(
+        "score", score_all_pairs, pairs_df.copy(), model_match, model_accept, vectorizer,
+        joint=True, rows=n_pairs,
+    )
+
+    boosted = stage("boost", apply_middle_tier_boost, scored, rows=n_pairs)
+
+    ranklists = stage("ranklists", build_ranklists, boosted, internships_df, rows=n_pairs)
+
+    final_df, round_logs = stage(
+        "allocation", optionC_allotment_simulated_rejection,
+        ranklists=ranklists, internships_df=internships_df,
+        out_json_dir=out_dir, max_rounds=8, seed=SEED, rows=n_students,
+    )
+
+    # -------------------------------------------------------------
+    # Analytics reports (inputs copied — some add columns in place)
+    # -------------------------------------------------------------
+    stage("fairness_report", build_fairness_report, final_df, students_df, round_logs, rows=n_students)
+
+    stage(
+        "preference_satisfaction", compute_preference_satisfaction,
+        final_alloc_df=final_df, pairs_df=scored.copy(),
+        out_path=os.path.join(out_dir, "preference_satisfaction"), rows=n_pairs,
+    )
+
+    stage(
+        "student_boost_impact", build_student_boost_report,
+        boosted_df=boosted.copy(), final_alloc_df=final_df,
+        out_path=os.path.join(out_dir, "student_boost_impact.json"), rows=n_pairs,
+    )
+
+    stage(
+        "sector_fairness", build_sector_fairness_report,
+        final_alloc_df=final_df, students_df=students_df, internships_df=internships_df,
+        out_path=os.path.join(out_dir, "sector_fairness"), rows=n_students,
+    )
+
+    stage(
+        "round_dynamics", analyze_round_dynamics,
+        round_logs, out_path=os.path.join(out_dir, "round_dynamics"), rows=n_students,
+    )
+
+    stage(
+        "internship_quality", compute_internship_quality_scores,
+        scored.copy(), final_df, internships_df,
+        out_path=os.path.join(out_dir, "internship_quality"), rows=n_pairs,
+    )
+
+    return stages
+
+
+# ======================================================================
+# BASELINE COMPARISON
+# ======================================================================
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Per-stage wall-time ratio vs baseline.
+    Returns {stage: {"baseline_s", "current_s", "ratio", "regressed"}}.
+    """
+
+    report = {}
+    for name, cur in results.get("stages", {}).items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or not base.get("wall_s"):
+            continue
+
+        ratio = cur["wall_s"] / base["wall_s"]
+        report[name] = {
+            "baseline_s": base["wall_s"],
+            "current_s": cur["wall_s"],
+            "ratio": round(ratio, 3),
+            "regressed": ratio > 1.0 + threshold
+                         and cur["wall_s"] - base["wall_s"] >= MIN_REGRESSION_SECONDS,
+        }
+
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ======================================================================
+# CLI
+# ======================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages.")
+    parser.add_argument("--tier", choices=sorted(TIERS), default="small")
+    parser.add_argument("--students", type=int, help="Override the tier's student count")
+    parser.add_argument("--internships", type=int, help="Override the tier's internship count")
+    parser.add_argument("--data-dir", help="Benchmark real students.csv / internships.csv instead")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--max-pairs", type=int, default=MAX_PAIRS,
+                        help="Sample the students of bigger cohorts down to this many pairs")
+    parser.add_argument("--out", help="Results JSON (default: benchmarks/results/<tier>.json)")
+    parser.add_argument("--baseline", help="Baseline JSON (default: benchmarks/results/baseline_<tier>.json)")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    label = args.tier if args.students is None and args.internships is None and not args.data_dir else "custom"
+    n_students = args.students or TIERS[args.tier][0]
+    n_internships = args.internships or TIERS[args.tier][1]
+
+    out_path = args.out or os.path.join(RESULTS_DIR, f"{label}.json")
+    baseline_path = args.baseline or os.path.join(RESULTS_DIR, f"baseline_{label}.json")
+
+    students_df, internships_df = load_cohort(n_students, n_internships, args.seed, args.data_dir)
+    n_full = len(students_df)
+    n_pairs = n_full * len(internships_df)
+    students_df, sample_fraction = sample_students(students_df, len(internships_df), args.max_pairs, args.seed)
+
+    results = {
+        "tier": label,
+        "n_students": n_full,
+        "n_internships": len(internships_df),
+        "n_pairs": n_pairs,
+        "sampled_students": len(students_df),
+        "sample_fraction": round(sample_fraction, 6),
+        "seed": args.seed,
+        "data_dir": args.data_dir,
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+    }
+
+    print(f"\nBenchmark [{label}] {n_full} students × {len(internships_df)} internships = {n_pairs} pairs")
+    if sample_fraction < 1.0:
+        print(f"Sampled {len(students_df)} students ({len(students_df) * len(internships_df)} pairs, "
+              f"--max-pairs {args.max_pairs}); est_full_wall_s scales up ×{1 / sample_fraction:.1f}")
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results["stages"] = run_stages(students_df, internships_df, tmp, sample_fraction)
+
+    regressions = []
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+        results["comparison"] = compare(results, baseline, args.threshold)
+        results["threshold"] = args.threshold
+
+        print(f"\nvs baseline {baseline.get('commit') or baseline_path}:")
+        for name, c in results["comparison"].items():
+            flag = "  REGRESSION" if c["regressed"] else ""
+            print(f"  {name:<24}{c['baseline_s']:>9.3f}s → {c['current_s']:>9.3f}s  ×{c['ratio']:.2f}{flag}")
+            if c["regressed"]:
+                regressions.append(name)
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved → {out_path}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved → {baseline_path}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,18 +2,32 @@
 """
 Enhanced main.py
 Complete ML-driven Internship Allocation Pipeline with Advanced Analytics.
+
+The pipeline is a DAG of stages (load → generate → train → pairs → score
+→ boost → ranklists → allocate → reports). Each stage's output is cached
+in data/stage_cache/ under a hash of its inputs, parameters and code
+(src.stage_cache), so a rerun only executes stages whose inputs changed:
+
+    python main.py                   # run, reusing cached stages
+    python main.py --status          # show which stages would hit / miss
+    python main.py --force reports   # recompute a stage (or "all")
+    python main.py --no-cache        # recompute everything
+    python main.py --clear-cache     # drop all cached stage outputs
 """
 
 import os
-import json
-import pandas as pd
+import argparse
 
 # Utility
 from src.utils import ensure_dirs
+from src.ingest import load_students, load_internships, dataset_path
+from src.stage_cache import run_stages, file_digest, clear_cache
 
 # Core pipeline modules
 from src.data_real_past_generator import generate_pseudo_past_data
-from src.models import train_models, score_all_pairs
+from src.featurize import VECTORIZER_PATH
+from src.models import train_models, score_all_pairs, MODEL_MATCH_PATH, MODEL_ACCEPT_PATH
+from src.pair_builder import build_pairs
 from src.boost_engine import apply_middle_tier_boost
 from src.ranklist_builder import build_ranklists
 from src.optionC_allotment import optionC_allotment_simulated_rejection
@@ -24,6 +38,9 @@ from src.boost_report import build_student_boost_report
 from src.sector_fairness import build_sector_fairness_report
 from src.round_dynamics import analyze_round_dynamics
 from src.internship_quality import compute_internship_quality_scores
+from src.analytics_runner import run_reports
+from src.analytics_engine import build_facts
+from src.instrumentation import pipeline_run
 
 
 # ------------------------------------------------------------
@@ -34,25 +51,143 @@ DATA_DIR = os.path.join(ROOT_DIR, "data")
 MODELS_DIR = os.path.join(ROOT_DIR, "models")
 OUTPUT_DIR = os.path.join(ROOT_DIR, "output")
 JSON_DIR = os.path.join(ROOT_DIR, "json_outputs")
+STAGE_CACHE_DIR = os.path.join(DATA_DIR, "stage_cache")
 
 RANDOM_SEED = 123
 
+ANALYTICS_MODULES = [
+    "src.preference_metrics", "src.boost_report", "src.sector_fairness",
+    "src.round_dynamics", "src.internship_quality",
+]
 
-def main(n_samples_past=15000, generator_seed=123, generator_weights=None):
-    print("\n======== INTERNSHIP ALLOCATION PIPELINE STARTED ========\n")
 
+def main(n_samples_past=15000, generator_seed=123, generator_weights=None,
+         k_window=1.0, max_rounds=8, force=(), use_cache=True, dry_run=False):
     ensure_dirs(DATA_DIR, MODELS_DIR, OUTPUT_DIR, JSON_DIR)
 
-    # ------------------------------------------------------------
-    # LOAD STUDENTS + INTERNSHIPS
-    # ------------------------------------------------------------
-    print("Loading datasets...")
+    stages = pipeline_stages(n_samples_past, generator_seed, generator_weights, k_window, max_rounds)
 
-    students_path = os.path.join(DATA_DIR, "students.csv")
-    internships_path = os.path.join(DATA_DIR, "internships.csv")
+    if dry_run:
+        report = run_stages(stages, STAGE_CACHE_DIR, force=force, use_cache=use_cache, dry_run=True)
+        _print_stage_report(report, dry_run=True)
+        return report
 
-    students_df = pd.read_csv(students_path)
-    internships_df = pd.read_csv(internships_path)
+    print("\n======== INTERNSHIP ALLOCATION PIPELINE STARTED ========\n")
+
+    with pipeline_run("pipeline", out_path=os.path.join(JSON_DIR, "run_metrics.json")) as run:
+        report = run_stages(stages, STAGE_CACHE_DIR, force=force, use_cache=use_cache)
+
+    print("\n======== PIPELINE COMPLETED SUCCESSFULLY ========")
+    print(f"JSON analytics saved inside: {JSON_DIR}")
+    print("=================================================\n")
+
+    _print_stage_report(report)
+
+    if run is not None:
+        print("Stage timings (inclusive):")
+        for name, rec in run.to_dict()["stages"].items():
+            rows = f"{rec['rows']:>10} rows" if rec["rows"] else ""
+            print(f"  {name:<26}{rec['wall_s']:>9.2f}s  {rows}")
+        print(f"  {'TOTAL':<26}{run.wall_s:>9.2f}s\n")
+
+    return report
+
+
+def _print_stage_report(report, dry_run=False):
+    print(f"Stage cache ({STAGE_CACHE_DIR}):")
+    for name, rec in report.items():
+        wall = "" if dry_run else f"{rec['wall_s']:>9.2f}s"
+        print(f"  {name:<12}{rec['status']:<8}{rec['key']}  {wall}")
+    print()
+
+
+# ======================================================================
+# PIPELINE DAG
+# ======================================================================
+def pipeline_stages(n_samples_past, generator_seed, generator_weights, k_window, max_rounds):
+    """
+    Stage definitions for src.stage_cache.run_stages. A stage's params
+    hold everything besides its upstream stages that changes its output.
+    """
+    datasets = [dataset_path("students", DATA_DIR), dataset_path("internships", DATA_DIR)]
+
+    return [
+        {
+            "name": "load", "deps": [],
+            "params": {"datasets": file_digest(datasets)},
+            "code": ["src.ingest"],
+            "run": _load,
+        },
+        {
+            "name": "generate", "deps": ["load"],
+            "params": {"n_samples": n_samples_past, "seed": generator_seed, "weights": generator_weights},
+            "code": ["src.data_real_past_generator"],
+            "run": lambda data: _generate(data, n_samples_past, generator_seed, generator_weights),
+            "outputs": [os.path.join(DATA_DIR, "past_pairs_gen.csv")],
+        },
+        {
+            "name": "train", "deps": ["load", "generate"],
+            "params": {"seed": RANDOM_SEED},
+            "code": ["src.models", "src.featurize"],
+            "run": _train,
+            "outputs": [MODEL_MATCH_PATH, MODEL_ACCEPT_PATH, VECTORIZER_PATH],
+        },
+        {
+            "name": "pairs", "deps": ["load"],
+            "code": ["src.pair_builder"],
+            "run": _pairs,
+        },
+        {
+            "name": "score", "deps": ["pairs", "train"],
+            "code": ["src.models", "src.featurize"],
+            "run": _score,
+        },
+        {
+            "name": "boost", "deps": ["score"],
+            "params": {"k_window": k_window},
+            "code": ["src.boost_engine"],
+            "run": lambda scored: _boost(scored, k_window),
+            "outputs": [os.path.join(OUTPUT_DIR, "boosted_pairs_debug.csv")],
+        },
+        {
+            "name": "ranklists", "deps": ["boost", "load"],
+            "code": ["src.ranklist_builder"],
+            "run": _ranklists,
+        },
+        {
+            "name": "allocate", "deps": ["ranklists", "load"],
+            "params": {"max_rounds": max_rounds, "default_accept_prob": 0.70, "seed": RANDOM_SEED},
+            "code": ["src.optionC_allotment"],
+            "run": lambda ranklists, data: _allocate(ranklists, data, max_rounds),
+            "outputs": [
+                os.path.join(OUTPUT_DIR, "final_allocations_real.csv"),
+                os.path.join(JSON_DIR, "sim_rounds.json"),
+                os.path.join(JSON_DIR, "sim_offer_events.json"),
+            ],
+        },
+        {
+            "name": "reports", "deps": ["allocate", "boost", "load"],
+            "code": ANALYTICS_MODULES + ["src.analytics_runner", "src.analytics_engine"],
+            "run": _reports,
+            "outputs": [
+                os.path.join(JSON_DIR, "preference_satisfaction"),
+                os.path.join(JSON_DIR, "student_boost_impact.json"),
+                os.path.join(JSON_DIR, "sector_fairness"),
+                os.path.join(JSON_DIR, "round_dynamics.json"),
+                os.path.join(JSON_DIR, "internship_quality"),
+            ],
+        },
+    ]
+
+
+# ------------------------------------------------------------
+# LOAD STUDENTS + INTERNSHIPS
+# ------------------------------------------------------------
+def _load():
+    print("Loading datasets...")
+
+    students_df = load_students(DATA_DIR)
+    internships_df = load_internships(DATA_DIR)
 
     if "skills" in students_df:
         students_df["skills"] = students_df["skills"].astype(str).str.replace(";", " ")
@@ -61,10 +196,14 @@ def main(n_samples_past=15000, generator_seed=123, generator_weights=None):
         internships_df["req_skills"] = internships_df["req_skills"].astype(str).str.replace(";", " ")
 
     print(f"Loaded {len(students_df)} students and {len(internships_df)} internships.\n")
+    return students_df, internships_df
 
-    # ------------------------------------------------------------
-    # GENERATE PAST PAIRS
-    # ------------------------------------------------------------
+
+# ------------------------------------------------------------
+# GENERATE PAST PAIRS
+# ------------------------------------------------------------
+def _generate(data, n_samples_past, generator_seed, generator_weights):
+    students_df, internships_df = data
     print("Generating pseudo-historical past data...")
 
     past_df = generate_pseudo_past_data(
@@ -77,13 +216,17 @@ def main(n_samples_past=15000, generator_seed=123, generator_weights=None):
     )
 
     print("Past data generated.\n")
+    return past_df
+
 
-    # ------------------------------------------------------------
-    # TRAIN MODELS
-    # ------------------------------------------------------------
+# ------------------------------------------------------------
+# TRAIN MODELS
+# ------------------------------------------------------------
+def _train(data, past_df):
+    students_df, internships_df = data
     print("Training ML models...\n")
 
-    model_match, model_accept, vectorizer = train_models(
+    models = train_models(
         past_df,
         students_df,
         internships_df,
@@ -91,82 +234,68 @@ def main(n_samples_past=15000, generator_seed=123, generator_weights=None):
     )
 
     print("Model training complete.\n")
+    return models
+
 
-    # ------------------------------------------------------------
-    # BUILD ALL POSSIBLE PAIRS
-    # ------------------------------------------------------------
+# ------------------------------------------------------------
+# BUILD ALL POSSIBLE PAIRS
+# ------------------------------------------------------------
+def _pairs(data):
+    students_df, internships_df = data
     print("Preparing all student-internship pairs...")
 
-    pairs = []
-    for _, s in students_df.iterrows():
-        for _, j in internships_df.iterrows():
-            pairs.append({
-                "student_id": s["student_id"],
-                "internship_id": j["internship_id"],
-                "skills": s["skills"],
-                "req_skills_job": j["req_skills"],
-                "gpa": s.get("gpa", 0),
-                "stipend_internship": j.get("stipend", 0),
-                "reservation": s.get("reservation", "GEN"),
-                "gender": s.get("gender", "M"),
-                "rural": s.get("rural", 0),
-
-                "pref_1": s.get("pref_1"),
-                "pref_2": s.get("pref_2"),
-                "pref_3": s.get("pref_3"),
-                "pref_4": s.get("pref_4"),
-                "pref_5": s.get("pref_5"),
-                "pref_6": s.get("pref_6"),
-            })
-
-    pairs_df = pd.DataFrame(pairs)
+    pairs_df = build_pairs(students_df, internships_df)
     print(f"Total combinations: {len(pairs_df)}\n")
+    return pairs_df
 
-    # Compute preference ranking
-    def _pref_rank(row):
-        iid = row["internship_id"]
-        for r in range(1, 7):
-            if row.get(f"pref_{r}") == iid:
-                return r
-        return 7
 
-    pairs_df["pref_rank"] = pairs_df.apply(_pref_rank, axis=1)
-
-    # ------------------------------------------------------------
-    # SCORE WITH ML MODELS
-    # ------------------------------------------------------------
+# ------------------------------------------------------------
+# SCORE WITH ML MODELS
+# ------------------------------------------------------------
+def _score(pairs_df, models):
+    model_match, model_accept, vectorizer = models
     print("Scoring pairs using ML models...")
 
-    scored_pairs = score_all_pairs(pairs_df, model_match, model_accept, vectorizer)
+    return score_all_pairs(pairs_df.copy(), model_match, model_accept, vectorizer, joint=True)
 
-    # ------------------------------------------------------------
-    # APPLY FAIRNESS BOOST
-    # ------------------------------------------------------------
+
+# ------------------------------------------------------------
+# APPLY FAIRNESS BOOST
+# ------------------------------------------------------------
+def _boost(scored_pairs, k_window):
     print("Applying fairness boosting...")
-    scored_pairs = apply_middle_tier_boost(scored_pairs)
+    boosted = apply_middle_tier_boost(scored_pairs, k_window=k_window)
 
     boosted_path = os.path.join(OUTPUT_DIR, "boosted_pairs_debug.csv")
-    scored_pairs.to_csv(boosted_path, index=False)
+    boosted.to_csv(boosted_path, index=False)
     print(f"Boosted pairs saved → {boosted_path}\n")
+    return boosted
+
 
-    # ------------------------------------------------------------
-    # BUILD RANKLISTS
-    # ------------------------------------------------------------
+# ------------------------------------------------------------
+# BUILD RANKLISTS
+# ------------------------------------------------------------
+def _ranklists(boosted, data):
+    _, internships_df = data
     print("Building ranklists for allocator...")
 
-    ranklists = build_ranklists(scored_pairs, internships_df)
+    ranklists = build_ranklists(boosted, internships_df)
     print("Ranklists ready.\n")
+    return ranklists
+
 
-    # ------------------------------------------------------------
-    # RUN ALLOCATION SIMULATION
-    # ------------------------------------------------------------
+# ------------------------------------------------------------
+# RUN ALLOCATION SIMULATION
+# ------------------------------------------------------------
+def _allocate(ranklists, data, max_rounds):
+    _, internships_df = data
     print("Running multi-round allocation simulation...\n")
 
     final_df, round_logs = optionC_allotment_simulated_rejection(
         ranklists,
         internships_df,
         JSON_DIR,
-        max_rounds=8,
+        max_rounds=max_rounds,
         default_accept_prob=0.70,
         seed=RANDOM_SEED
     )
@@ -175,47 +304,77 @@ def main(n_samples_past=15000, generator_seed=123, generator_weights=None):
     final_df.to_csv(final_alloc_path, index=False)
 
     print(f"Final allocation saved → {final_alloc_path}\n")
+    return final_df, round_logs
 
-    # ------------------------------------------------------------
-    # ADVANCED ANALYTICS OUTPUTS
-    # ------------------------------------------------------------
-    print("Generating advanced analytics...\n")
-
-    compute_preference_satisfaction(
-        final_alloc_df=final_df,
-        pairs_df=pairs_df,
-        out_path=os.path.join(JSON_DIR, "preference_satisfaction")
-    )
-
-    build_student_boost_report(
-        boosted_df=scored_pairs,
-        final_alloc_df=final_df,
-        out_path=os.path.join(JSON_DIR, "student_boost_impact.json")
-    )
-
-    build_sector_fairness_report(
-        final_alloc_df=final_df,
-        students_df=students_df,
-        internships_df=internships_df,
-        out_path=os.path.join(JSON_DIR, "sector_fairness")
-    )
 
-    analyze_round_dynamics(
-        round_logs,
-        out_path=os.path.join(JSON_DIR, "round_dynamics")
-    )
-
-    compute_internship_quality_scores(
-        pairs_df,
-        final_df,
-        internships_df,
-        out_path=os.path.join(JSON_DIR, "internship_quality")
-    )
+# ------------------------------------------------------------
+# ADVANCED ANALYTICS OUTPUTS
+# ------------------------------------------------------------
+def _reports(allocation, boosted, data):
+    final_df, round_logs = allocation
+    students_df, internships_df = data
+    print("Generating advanced analytics...\n")
 
-    print("\n======== PIPELINE COMPLETED SUCCESSFULLY ========")
-    print(f"JSON analytics saved inside: {JSON_DIR}")
-    print("=================================================\n")
+    # One pass over allocations + boosted pairs; every report is a view
+    facts = build_facts(final_df, students_df, internships_df, pairs_df=boosted)
+
+    # The reports only read these frames, so they run concurrently
+    reports = run_reports({
+        "preference_satisfaction": (compute_preference_satisfaction, {
+            "final_alloc_df": final_df,
+            "pairs_df": boosted,
+            "out_path": os.path.join(JSON_DIR, "preference_satisfaction"),
+            "facts": facts,
+        }),
+        "student_boost_impact": (build_student_boost_report, {
+            "boosted_df": boosted,
+            "final_alloc_df": final_df,
+            "out_path": os.path.join(JSON_DIR, "student_boost_impact.json"),
+            "facts": facts,
+        }),
+        "sector_fairness": (build_sector_fairness_report, {
+            "final_alloc_df": final_df,
+            "students_df": students_df,
+            "internships_df": internships_df,
+            "out_path": os.path.join(JSON_DIR, "sector_fairness"),
+            "facts": facts,
+        }),
+        "round_dynamics": (analyze_round_dynamics, {
+            "round_logs": round_logs,
+            "out_path": os.path.join(JSON_DIR, "round_dynamics"),
+        }),
+        "internship_quality": (compute_internship_quality_scores, {
+            "pairs_df": boosted,
+            "final_alloc_df": final_df,
+            "internships_df": internships_df,
+            "out_path": os.path.join(JSON_DIR, "internship_quality"),
+            "facts": facts,
+        }),
+    })
+
+    print("Report timings: " + ", ".join(f"{k} {v:.2f}s" for k, v in reports["timings"].items())
+          + f" (wall {reports['wall_s']:.2f}s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the internship allocation pipeline.")
+    parser.add_argument("--n-samples", type=int, default=15000, help="pseudo-past pairs to generate")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED, help="generator seed")
+    parser.add_argument("--k-window", type=float, default=1.0, help="middle-tier boost window (in pool sigmas)")
+    parser.add_argument("--max-rounds", type=int, default=8, help="allocation rounds")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE",
+                        help='stages to recompute even if cached ("all" for every stage)')
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage")
+    parser.add_argument("--status", action="store_true", help="only show which stages would hit / miss")
+    parser.add_argument("--clear-cache", action="store_true", help="remove all cached stage outputs and exit")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    main(n_samples_past=15000, generator_seed=RANDOM_SEED)
+    args = parse_args()
+    if args.clear_cache:
+        print(f"Cleared stage cache: {clear_cache(STAGE_CACHE_DIR) or 'already empty'}")
+    else:
+        main(n_samples_past=args.n_samples, generator_seed=args.seed,
+             k_window=args.k_window, max_rounds=args.max_rounds,
+             force=args.force, use_cache=not args.no_cache, dry_run=args.status)
@@ -0,0 +1,237 @@
+"""
+Single-pass analytics engine shared by the post-allocation reports.
+
+build_facts() joins the allocation, the applicants, the internships,
+the scored / boosted pairs and the offer events ONCE into integer-coded
+fact tables; each report (fairness, sector fairness, preference
+satisfaction, boost impact, internship quality) is then a bincount /
+groupby view over them instead of re-merging the raw frames.
+
+facts = {
+    "students":    one row per applicant, in students_df order:
+                   student_id, reservation / gender (codes), rural,
+                   alloc_order (row in final_alloc_df, -1 = not placed),
+                   internship, sector, tier, location_type (codes, -1),
+                   pref_rank, match_score, accept_score, base_score,
+                   boosted_score, boost_amount (of the allocated pair),
+                   round (placed in), offers, rejections,
+                   max_boost_amt, pre_boost_best, post_boost_best
+                   (over the student's pairs with boost_amount > 0,
+                   NaN if never boosted)
+    "internships": one row per internship, sorted by id: internship_id,
+                   sector / tier / location_type (codes), demand,
+                   pref_weighted_demand, match_sum, accept_sum, pairs,
+                   placements
+    "allocations": final_alloc_df as given (row-order views)
+    "labels":      {coded column: array of labels}
+    "pair_students": distinct students in the pairs
+}
+
+Columns whose source wasn't passed are simply absent.
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
+
+STUDENT_CODED = ["reservation", "gender"]
+INTERNSHIP_CODED = ["sector", "tier", "location_type"]
+
+# Preference weights (same as the ranklists)
+PREF_WEIGHTS = {1: 1.00, 2: 0.85, 3: 0.70, 4: 0.55, 5: 0.40, 6: 0.25, 7: 0.20}
+DEFAULT_PREF_WEIGHT = 0.20
+
+PAIR_SCORE_COLS = ["match_score", "accept_score", "base_score", "boosted_score", "boost_amount"]
+
+
+# ======================================================================
+# BUILD
+# ======================================================================
+@instrumented("analytics_facts", rows=lambda facts: len(facts["students"]))
+def build_facts(final_alloc_df, students_df, internships_df=None, pairs_df=None, offer_events=None):
+    """
+    Fact tables for the reports (see module docstring). pairs_df: the
+    scored or boosted pairs (one scan); offer_events: allocator events.
+    """
+    labels = {}
+    sid = students_df["student_id"].values
+    student_index = pd.Index(sid)
+    students = pd.DataFrame({"student_id": sid})
+
+    for col in STUDENT_CODED:
+        if col in students_df.columns:
+            students[col], labels[col] = _codes(students_df[col])
+    if "rural" in students_df.columns:
+        students["rural"] = students_df["rural"].values
+
+    # ------------------------------------------------------------------
+    # Allocation → student rows
+    # ------------------------------------------------------------------
+    n_alloc = len(final_alloc_df)
+    alloc_rows = (student_index.get_indexer(final_alloc_df["student_id"])
+                  if n_alloc else np.array([], dtype=np.intp))
+    known = alloc_rows >= 0
+
+    alloc_order = np.full(len(students), -1, dtype=np.int64)
+    alloc_order[alloc_rows[known]] = np.flatnonzero(known)
+    students["alloc_order"] = alloc_order
+    placed = alloc_order >= 0
+
+    if "pref_rank" in final_alloc_df.columns:
+        students["pref_rank"] = _scatter(alloc_rows[known], final_alloc_df["pref_rank"].values[known],
+                                         len(students), -1)
+
+    # ------------------------------------------------------------------
+    # Internship dimension
+    # ------------------------------------------------------------------
+    iids = None
+    if internships_df is not None:
+        dim = internships_df.drop_duplicates("internship_id").sort_values("internship_id")
+        iids = dim["internship_id"].values
+        internships = pd.DataFrame({"internship_id": iids})
+        for col in INTERNSHIP_CODED:
+            if col in dim.columns:
+                internships[col], labels[col] = _codes(dim[col])
+
+        internship_index = pd.Index(iids)
+        alloc_iid = internship_index.get_indexer(final_alloc_df["internship_id"]) if n_alloc else alloc_rows
+        internships["placements"] = np.bincount(alloc_iid[alloc_iid >= 0], minlength=len(iids))
+
+        icode = _scatter(alloc_rows[known], alloc_iid[known], len(students), -1)
+        students["internship"] = icode
+        for col in INTERNSHIP_CODED:
+            if col in internships.columns:
+                students[col] = np.where(icode >= 0, internships[col].values[icode], -1)
+    else:
+        internships = None
+
+    # ------------------------------------------------------------------
+    # One scan over the pairs
+    # ------------------------------------------------------------------
+    pair_students = None
+    if pairs_df is not None and len(pairs_df):
+        p_code, p_uniques = pd.factorize(pairs_df["student_id"])
+        pair_students = len(p_uniques)
+        p_row = student_index.get_indexer(p_uniques)[p_code]  # pair → students row (-1 unknown)
+
+        if iids is not None:
+            p_iid = internship_index.get_indexer(pairs_df["internship_id"])
+            ok = p_iid >= 0
+
+            # demand = distinct students per internship
+            n_i = len(iids)
+            pair_key = p_code[ok].astype(np.int64) * n_i + p_iid[ok]
+            if pair_students * n_i <= 8 * len(pair_key):
+                # dense (cross join): a bitmap beats hashing every pair
+                seen = np.zeros(pair_students * n_i, dtype=bool)
+                seen[pair_key] = True
+                internships["demand"] = seen.reshape(pair_students, n_i).sum(axis=0)
+            else:
+                internships["demand"] = np.bincount(np.unique(pair_key) % n_i, minlength=n_i)
+
+            if "pref_rank" in pairs_df.columns:
+                rank = pd.to_numeric(pairs_df["pref_rank"], errors="coerce").fillna(7).astype(int)
+                weight = rank.map(PREF_WEIGHTS).fillna(DEFAULT_PREF_WEIGHT).values
+                internships["pref_weighted_demand"] = np.bincount(p_iid[ok], weights=weight[ok], minlength=len(iids))
+            for col in ("match_score", "accept_score"):
+                if col in pairs_df.columns:
+                    internships[col.replace("_score", "_sum")] = np.bincount(
+                        p_iid[ok], weights=pairs_df[col].values[ok], minlength=len(iids))
+            internships["pairs"] = np.bincount(p_iid[ok], minlength=len(iids))
+
+            # scores of each student's allocated pair
+            if "internship" in students.columns:
+                mine = (p_row >= 0) & ok
+                mine[mine] = students["internship"].values[p_row[mine]] == p_iid[mine]
+                for col in PAIR_SCORE_COLS:
+                    if col in pairs_df.columns:
+                        values = pairs_df[col].values
+                        out = np.full(len(students), np.nan, dtype=np.result_type(values.dtype, np.float32))
+                        out[p_row[mine]] = values[mine]
+                        students[col] = out
+                if "pref_rank" not in students.columns and "pref_rank" in pairs_df.columns:
+                    students["pref_rank"] = _scatter(p_row[mine], pairs_df["pref_rank"].values[mine],
+                                                     len(students), -1)
+
+        # per-student best scores over boosted pairs
+        if {"boost_amount", "base_score", "boosted_score"}.issubset(pairs_df.columns):
+            sel = (pairs_df["boost_amount"].values > 0) & (p_row >= 0)
+            for col, src in (("max_boost_amt", "boost_amount"), ("pre_boost_best", "base_score"),
+                             ("post_boost_best", "boosted_score")):
+                values = pairs_df[src].values
+                best = np.full(len(students), -np.inf, dtype=values.dtype)
+                np.maximum.at(best, p_row[sel], values[sel])
+                best[np.isneginf(best)] = np.nan
+                students[col] = best
+
+    # ------------------------------------------------------------------
+    # Offer events
+    # ------------------------------------------------------------------
+    if offer_events:
+        ev = pd.DataFrame(offer_events, columns=["round", "student_id", "accepted"])
+        e_row = student_index.get_indexer(ev["student_id"])
+        ok = e_row >= 0
+        accepted = ev["accepted"].values.astype(bool)
+        students["offers"] = np.bincount(e_row[ok], minlength=len(students))
+        students["rejections"] = np.bincount(e_row[ok & ~accepted], minlength=len(students))
+
+        # round of the last accepted offer (the final seat, after upgrades)
+        rnd = np.full(len(students), -1, dtype=np.int64)
+        acc = ok & accepted
+        np.maximum.at(rnd, e_row[acc], ev["round"].values[acc].astype(np.int64))
+        students["round"] = np.where(placed, rnd, -1)
+
+    return {
+        "students": students,
+        "internships": internships,
+        "allocations": final_alloc_df,
+        "labels": labels,
+        "pair_students": pair_students,
+    }
+
+
+def _codes(series):
+    """Sorted integer codes (-1 = missing) and their labels."""
+    codes, uniques = pd.factorize(series, sort=True)
+    return codes.astype(np.int32), np.asarray(uniques, dtype=object)
+
+
+def _scatter(rows, values, n, fill):
+    values = np.asarray(values)
+    out = np.full(n, fill, dtype=values.dtype if values.dtype.kind in "iuf" else object)
+    out[rows] = values
+    return out
+
+
+# ======================================================================
+# AGGREGATION HELPERS
+# ======================================================================
+def value_counts(codes, labels, mask=None, order=None):
+    """
+    {label: count} of integer codes (-1 ignored) under `mask`, ordered
+    like pandas value_counts(): count descending, ties by first
+    appearance along `order` (default: row order).
+    """
+    codes = np.asarray(codes)
+    if mask is None:
+        mask = np.ones(len(codes), dtype=bool)
+    mask = mask & (codes >= 0)
+    counts = np.bincount(codes[mask], minlength=len(labels))
+
+    key = np.arange(len(codes)) if order is None else np.asarray(order)
+    first = np.full(len(labels), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, codes[mask], key[mask].astype(np.int64))
+
+    present = np.flatnonzero(counts)
+    present = present[np.lexsort((first[present], -counts[present]))]
+    return {labels[c]: int(counts[c]) for c in present}
+
+
+def label_of(facts, col, codes):
+    """Labels for integer codes of a coded column (None for -1)."""
+    labels = facts["labels"][col]
+    codes = np.asarray(codes)
+    if not len(labels):
+        return np.full(len(codes), None, dtype=object)
+    return np.where(codes >= 0, labels[np.maximum(codes, 0)], None)
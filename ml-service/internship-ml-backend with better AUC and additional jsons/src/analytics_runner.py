@@ -0,0 +1,62 @@
+"""
+Concurrent runner for the post-allocation analytics reports.
+
+The reports only read their inputs (final allocations, scored / boosted
+pairs, students, internships, round logs), so they run side by side in
+a thread pool over the same DataFrames — nothing is copied or pickled —
+and each writes its own output files from its worker. Report time is
+then close to the slowest report instead of the sum.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.instrumentation import stage, worker_task
+
+# Worker threads (0 = one per report, 1 = run the reports one by one)
+ANALYTICS_WORKERS = int(os.environ.get("ANALYTICS_WORKERS", "0"))
+
+
+def run_reports(tasks, max_workers=None):
+    """
+    tasks: {name: (fn, kwargs)} — report builders over shared read-only inputs.
+
+    Returns {"results": {name: report}, "timings": {name: wall_s}, "wall_s"}.
+    If a report raises, the others still finish and the first error
+    (in task order) is re-raised.
+    """
+    workers = max_workers or ANALYTICS_WORKERS or len(tasks)
+    results, timings, errors = {}, {}, {}
+
+    def _timed(name, fn, kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(**kwargs)
+        finally:
+            timings[name] = round(time.perf_counter() - t0, 4)
+
+    t0 = time.perf_counter()
+    with stage("analytics"):
+        if workers <= 1:
+            for name, (fn, kwargs) in tasks.items():
+                try:
+                    results[name] = _timed(name, fn, kwargs)
+                except Exception as e:
+                    errors[name] = e
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analytics") as pool:
+                futures = {
+                    name: pool.submit(worker_task(_timed), name, fn, kwargs)
+                    for name, (fn, kwargs) in tasks.items()
+                }
+            for name, fut in futures.items():
+                try:
+                    results[name] = fut.result()
+                except Exception as e:
+                    errors[name] = e
+
+    if errors:
+        raise next(iter(errors.values()))
+
+    return {"results": results, "timings": timings, "wall_s": round(time.perf_counter() - t0, 4)}
@@ -1,54 +1,122 @@
 import pandas as pd
 import numpy as np
 
+from src.instrumentation import instrumented
 
+
+RESERVED_CATEGORIES = ["SC", "ST", "OBC"]
+MIN_SIGMA = 0.01
+
+
+@instrumented("boost", rows=len)
 def apply_middle_tier_boost(scored_df,
                             k_window=1.0,
                             max_caste_boost=0.10,
-                            max_rural_boost=0.15):
+                            max_rural_boost=0.15,
+                            pool_stats=None):
+    """
+    pool_stats: optional {internship_id: {"median", "sigma"}} (as from
+    compute_boost_stats) covering every pool, used instead of
+    recomputing the per-pool statistics.
+    """
 
     df = scored_df.copy()
 
     # Step-1: Base fused score (same logic everywhere)
-    df["base_score"] = (
-        0.6 * df["match_score"] +
-        0.4 * df["accept_score"]
+    df["base_score"] = fused_base_score(df["match_score"], df["accept_score"])
+
+    # Per-internship pool statistics, broadcast back to every pair
+    if pool_stats is None:
+        pool = df.groupby("internship_id")["base_score"]
+        median_val = pool.transform("median")
+        sigma = pool.transform(_pool_std).clip(lower=MIN_SIGMA)
+    else:
+        iid = df["internship_id"].astype(str)
+        median_val = iid.map({k: v["median"] for k, v in pool_stats.items()})
+        sigma = iid.map({k: v["sigma"] for k, v in pool_stats.items()})
+
+    if "reservation" in df.columns:
+        reservation = df["reservation"].values
+    else:
+        reservation = np.full(len(df), "GEN")
+    rural = df["rural"].values if "rural" in df.columns else np.zeros(len(df))
+
+    # Middle-tier boosting for reserved categories
+    df["boost_amount"] = middle_tier_boost_amounts(
+        df["base_score"].values,
+        median_val.values,
+        sigma.values,
+        reservation,
+        rural,
+        k_window=k_window,
+        max_caste_boost=max_caste_boost,
+        max_rural_boost=max_rural_boost,
     )
 
-    df["boost_amount"] = 0.0
-    df["boosted_score"] = df["base_score"]
+    df["boosted_score"] = (df["base_score"] + df["boost_amount"]).clip(upper=1.0)
 
-    # Group by internship and apply middle-tier boosting for reserved categories
-    for iid, pool in df.groupby("internship_id"):
+    return df
 
-        median_val = pool["base_score"].median()
-        sigma = pool["base_score"].std()
-        sigma = 0.01 if sigma < 0.01 else sigma
 
-        window_radius = sigma * k_window
+def fused_base_score(match_score, accept_score):
+    return 0.6 * match_score + 0.4 * accept_score
 
-        for idx, row in pool.iterrows():
 
-            score = row["base_score"]
-            is_reserved = row.get("reservation", "GEN") in ["SC", "ST", "OBC"]
-            if not is_reserved:
-                continue
+def _pool_std(scores):
+    # Series.std rather than the grouped cython kernel, so scores match
+    # the per-pool loop bit for bit
+    return scores.std()
 
-            is_rural = (row.get("rural", 0) == 1)
 
-            dist = abs(score - median_val)
-            if dist >= window_radius:
-                continue
+def middle_tier_boost_amounts(base_score,
+                              median_val,
+                              sigma,
+                              reservation,
+                              rural,
+                              k_window=1.0,
+                              max_caste_boost=0.10,
+                              max_rural_boost=0.15):
+    """
+    Boost for each pair given its internship pool's median and sigma.
 
-            factor = 1 - (dist / window_radius)
+    Reserved-category students whose base score lies within
+    sigma * k_window of the pool median get a boost that decays
+    linearly with distance from the median; rural students get the
+    extra rural component on top.
+    """
 
-            boost = max_caste_boost * factor
-            if is_rural:
-                boost += max_rural_boost * factor
+    base_score = np.asarray(base_score, dtype=float)
+    window_radius = np.asarray(sigma, dtype=float) * k_window
 
-            # Use .loc assignment to avoid SettingWithCopyWarning
-            df.loc[idx, "boost_amount"] = boost
+    dist = np.abs(base_score - np.asarray(median_val, dtype=float))
+    is_reserved = np.isin(np.asarray(reservation), RESERVED_CATEGORIES)
+    is_rural = np.asarray(rural) == 1
 
-    df["boosted_score"] = (df["base_score"] + df["boost_amount"]).clip(upper=1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = 1 - (dist / window_radius)
 
-    return df
+    boost = max_caste_boost * factor + np.where(is_rural, max_rural_boost * factor, 0.0)
+
+    eligible = is_reserved & ~(dist >= window_radius)
+    return np.where(eligible, boost, 0.0)
+
+
+def compute_boost_stats(boosted_df):
+    """
+    Per-internship pool statistics used by the middle-tier boost:
+        { internship_id: {"median": float, "sigma": float} }
+
+    Saved after each allocation run so single students can be
+    boosted against the last run's pools without rescoring everyone.
+    """
+
+    pool = boosted_df.groupby("internship_id")["base_score"]
+    stats = pd.DataFrame({
+        "median": pool.median(),
+        "sigma": pool.agg(_pool_std).clip(lower=MIN_SIGMA),
+    })
+
+    return {
+        str(iid): {"median": float(row["median"]), "sigma": float(row["sigma"])}
+        for iid, row in stats.iterrows()
+    }
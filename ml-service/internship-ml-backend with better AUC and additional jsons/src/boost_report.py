@@ -2,11 +2,16 @@ import pandas as pd
 import json
 import os
 
+from src.instrumentation import instrumented
+from src.analytics_engine import build_facts, label_of
 
+
+@instrumented("student_boost_impact")
 def build_student_boost_report(
     boosted_df,
     final_alloc_df,
-    out_path
+    out_path,
+    facts=None
 ):
     """
     Extended boost impact analysis.
@@ -18,6 +23,10 @@ def build_student_boost_report(
     final_alloc_df must contain:
         student_id, internship_id
 
+    facts: optional src.analytics_engine.build_facts() tables built with
+        boosted_df as the pairs (per-student boost maxima come from there
+        instead of a groupby over all boosted pairs)
+
     Outputs:
         A JSON with the following:
             - total boosted students
@@ -33,38 +42,38 @@ def build_student_boost_report(
             - NEW: top beneficiaries (sorted)
     """
 
+    if facts is None:
+        # the pairs carry the student attributes the report needs
+        students = boosted_df.drop_duplicates("student_id")[["student_id", "reservation", "rural"]]
+        facts = build_facts(final_alloc_df, students, pairs_df=boosted_df)
+
     # ---------------------------------------------------------
-    # Filter only boosted pairs
+    # Students with at least one boosted pair (sorted by id)
     # ---------------------------------------------------------
-    boosted_pairs = boosted_df[boosted_df["boost_amount"] > 0].copy()
+    st = facts["students"]
+    st = st[st["max_boost_amt"].notna()].sort_values("student_id")
 
-    # Compress student-level data
-    student_boost = (
-        boosted_pairs.groupby("student_id")
-        .agg(
-            max_boost_amt=("boost_amount", "max"),
-            reservation=("reservation", "first"),
-            rural=("rural", "first"),
-            pre_boost_best=("base_score", "max"),
-            post_boost_best=("boosted_score", "max")
-        )
-        .reset_index()
-    )
+    student_boost = pd.DataFrame({
+        "student_id": st["student_id"].values,
+        "max_boost_amt": st["max_boost_amt"].values,
+        "reservation": label_of(facts, "reservation", st["reservation"].values),
+        "rural": st["rural"].values,
+        "pre_boost_best": st["pre_boost_best"].values,
+        "post_boost_best": st["post_boost_best"].values,
+    })
 
     total_boosted_students = len(student_boost)
 
     # ---------------------------------------------------------
     # Identify selected students
     # ---------------------------------------------------------
-    placed_students = set(final_alloc_df["student_id"].unique())
+    alloc_order = st["alloc_order"].values
+    is_selected = alloc_order >= 0
 
-    boosted_selected_students = student_boost[
-        student_boost["student_id"].isin(placed_students)
-    ].copy()
-
-    boosted_not_selected_students = student_boost[
-        ~student_boost["student_id"].isin(placed_students)
-    ].copy()
+    boosted_selected_students = student_boost[is_selected].copy()
+    boosted_selected_students["internship_id"] = (
+        final_alloc_df["internship_id"].values[alloc_order[is_selected]]
+    )
 
     uplift_success_count = len(boosted_selected_students)
 
@@ -134,14 +143,8 @@ def build_student_boost_report(
     # ---------------------------------------------------------
     # NEW: Internship-level boost effectiveness
     # ---------------------------------------------------------
-    merged = boosted_selected_students.merge(
-        final_alloc_df,
-        on="student_id",
-        how="left"
-    )
-
     internship_boost_stats = (
-        merged.groupby("internship_id")["counterfactual_helped"]
+        boosted_selected_students.groupby("internship_id")["counterfactual_helped"]
         .sum()
         .sort_values(ascending=False)
         .astype(int)
@@ -162,7 +165,7 @@ def build_student_boost_report(
     # ---------------------------------------------------------
     avg_student_boost = float(student_boost["max_boost_amt"].mean())
     max_student_boost = float(student_boost["max_boost_amt"].max())
-    coverage_ratio = total_boosted_students / boosted_df["student_id"].nunique()
+    coverage_ratio = total_boosted_students / facts["pair_students"]
 
     report = {
         "boosted_students": int(total_boosted_students),
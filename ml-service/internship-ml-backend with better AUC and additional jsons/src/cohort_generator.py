@@ -0,0 +1,286 @@
+"""
+cohort_generator.py
+
+Synthetic students.csv / internships.csv at benchmark scale
+(100k–1M students, 1k–20k internships), in the same layout as data/*.csv.
+
+- marginals (GPA, reservation, gender, rural, skill counts, tiers,
+  location types, capacities) follow the real 6000 × 69 cohort
+- student skills lean towards one sector's skill pool
+- preferences are 6 distinct internships drawn with Zipf-like popularity
+- cap_ur + cap_rural == capacity for every internship
+- students are generated and appended to the CSV chunk by chunk
+
+Deterministic: the same (seed, n_students, n_internships, zipf_exponent,
+chunk_rows) always writes byte-identical files.
+
+CLI:
+    python -m src.cohort_generator --students 1000000 --internships 20000 --out-dir bench_data
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+
+# Students generated (and written) per chunk; part of the determinism key
+CHUNK_ROWS = 100_000
+
+# popularity ∝ 1 / rank^ZIPF_EXPONENT — 0.6 gives the ~10x top/bottom
+# demand spread seen across the 69 real internships
+ZIPF_EXPONENT = 0.6
+
+# Extra sampling weight for skills in a student's own sector pool
+SECTOR_AFFINITY = 6.0
+
+SECTOR_SKILLS = {
+    "IT Services": ["ml", "python", "backend", "cloud", "sql", "frontend", "networking", "java"],
+    "Finance": ["presentation", "sql", "analysis", "excel", "communication", "financial_modeling"],
+    "Healthcare": ["communication", "ml", "analysis", "writing", "sql", "presentation", "excel", "python"],
+    "Electronics": ["design", "python", "manufacturing", "pcb_design", "networking", "analysis"],
+    "Mechanical": ["design", "manufacturing", "cad_modelling", "autocad", "analysis"],
+    "Automobile": ["construction_management", "surveying", "design", "autocad", "analysis"],
+    "Marketing": ["writing", "seo", "design", "communication", "excel", "presentation", "social_media"],
+}
+
+SECTORS = list(SECTOR_SKILLS)
+SECTOR_PROBS = [0.26, 0.17, 0.13, 0.12, 0.12, 0.10, 0.10]
+
+ALL_SKILLS = sorted({s for pool in SECTOR_SKILLS.values() for s in pool})
+
+TIERS = ["Tier1", "Tier2", "Tier3"]
+TIER_PROBS = [0.41, 0.52, 0.07]
+
+LOCATION_TYPES = ["Office", "Remote", "Factory"]
+LOCATION_PROBS = [0.54, 0.27, 0.19]
+
+RESERVATIONS = ["GEN", "OBC", "SC", "ST"]
+RESERVATION_PROBS = [0.55, 0.26, 0.12, 0.07]
+
+GENDERS = ["M", "F", "O"]
+GENDER_PROBS = [0.55, 0.43, 0.02]
+
+RURAL_SHARE = 0.41
+
+STUDENT_COLS = ["student_id", "gpa", "skills", "reservation", "rural", "gender",
+                "pref_1", "pref_2", "pref_3", "pref_4", "pref_5", "pref_6"]
+INTERNSHIP_COLS = ["internship_id", "sector", "tier", "capacity", "cap_ur", "cap_rural",
+                   "req_skills", "stipend", "location_type"]
+
+N_PREFS = 6
+
+
+# ======================================================================
+# ENTRY POINT
+# ======================================================================
+def generate_cohort(out_dir="bench_data",
+                    n_students=100_000,
+                    n_internships=1_000,
+                    seed=0,
+                    zipf_exponent=ZIPF_EXPONENT,
+                    chunk_rows=CHUNK_ROWS):
+    """
+    Writes <out_dir>/internships.csv and <out_dir>/students.csv.
+
+    Internships use the first child of SeedSequence(seed); student
+    chunk k uses child k + 1, so every chunk is independent of how
+    the others were generated.
+    """
+
+    if n_internships < N_PREFS:
+        raise ValueError(f"Need at least {N_PREFS} internships for distinct preferences")
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    n_chunks = max(1, -(-n_students // chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks + 1)
+
+    # -------------------------------------------------------------
+    # Internships
+    # -------------------------------------------------------------
+    rng = np.random.default_rng(seeds[0])
+    internships_df = generate_internships(n_internships, rng)
+    popularity = popularity_weights(n_internships, rng, zipf_exponent)
+
+    internships_path = os.path.join(out_dir, "internships.csv")
+    internships_df.to_csv(internships_path, index=False)
+
+    # -------------------------------------------------------------
+    # Students, streamed chunk by chunk
+    # -------------------------------------------------------------
+    students_path = os.path.join(out_dir, "students.csv")
+    tmp_path = students_path + ".tmp"
+
+    internship_ids = internships_df["internship_id"].values
+    id_width = max(5, len(str(n_students)))
+
+    with open(tmp_path, "w", newline="") as f:
+        for k in range(n_chunks):
+            start = k * chunk_rows
+            n = min(chunk_rows, n_students - start)
+
+            chunk = generate_students(
+                n, np.random.default_rng(seeds[k + 1]),
+                internship_ids, popularity, first_index=start + 1, id_width=id_width,
+            )
+            chunk.to_csv(f, index=False, header=(k == 0))
+
+            print(f"Students: {start + n}/{n_students}")
+
+    os.replace(tmp_path, students_path)
+
+    return {
+        "students_csv": students_path,
+        "internships_csv": internships_path,
+        "n_students": n_students,
+        "n_internships": n_internships,
+        "seed": seed,
+    }
+
+
+# ======================================================================
+# INTERNSHIPS
+# ======================================================================
+def generate_internships(n, rng):
+    """Internship table in the data/internships.csv layout."""
+
+    sector_idx = rng.choice(len(SECTORS), size=n, p=SECTOR_PROBS)
+    capacity = rng.integers(18, 26, size=n)
+
+    # Rural seats: per-internship share, so cap_ur + cap_rural == capacity
+    cap_rural = rng.binomial(capacity, rng.uniform(0.05, 0.8, size=n))
+
+    # 2-4 required skills from the sector's pool
+    req_skills = np.empty(n, dtype=object)
+    n_req = rng.integers(2, 5, size=n)
+    for s, sector in enumerate(SECTORS):
+        rows = np.flatnonzero(sector_idx == s)
+        pool = np.array(SECTOR_SKILLS[sector], dtype=object)
+        keys = rng.random((len(rows), len(pool)))
+        order = np.argsort(keys, axis=1)
+        req_skills[rows] = [
+            ";".join(pool[o[:k]]) for o, k in zip(order, n_req[rows])
+        ]
+
+    width = max(3, len(str(n)))
+
+    return pd.DataFrame({
+        "internship_id": [f"I{i:0{width}d}" for i in range(1, n + 1)],
+        "sector": np.array(SECTORS, dtype=object)[sector_idx],
+        "tier": rng.choice(TIERS, size=n, p=TIER_PROBS),
+        "capacity": capacity,
+        "cap_ur": capacity - cap_rural,
+        "cap_rural": cap_rural,
+        "req_skills": req_skills,
+        "stipend": 5000,
+        "location_type": rng.choice(LOCATION_TYPES, size=n, p=LOCATION_PROBS),
+    })[INTERNSHIP_COLS]
+
+
+def popularity_weights(n, rng, exponent=ZIPF_EXPONENT):
+    """Zipf-like demand: random internship order, weight ∝ 1 / rank^exponent."""
+    ranks = rng.permutation(n) + 1
+    w = 1.0 / ranks.astype(float) ** exponent
+    return w / w.sum()
+
+
+# ======================================================================
+# STUDENTS
+# ======================================================================
+def generate_students(n, rng, internship_ids, popularity, first_index=1, id_width=5):
+    """One chunk of students in the data/students.csv layout."""
+
+    gpa = np.round(np.clip(rng.normal(7.0, 1.0, size=n), 4.0, 10.0), 2)
+    reservation = rng.choice(RESERVATIONS, size=n, p=RESERVATION_PROBS)
+    rural = (rng.random(n) < RURAL_SHARE).astype(int)
+    gender = rng.choice(GENDERS, size=n, p=GENDER_PROBS)
+
+    skills = _student_skills(n, rng)
+    prefs = _distinct_prefs(n, rng, popularity)
+
+    df = pd.DataFrame({
+        "student_id": [f"S{i:0{id_width}d}" for i in range(first_index, first_index + n)],
+        "gpa": gpa,
+        "skills": skills,
+        "reservation": reservation,
+        "rural": rural,
+        "gender": gender,
+    })
+    for r in range(N_PREFS):
+        df[f"pref_{r + 1}"] = internship_ids[prefs[:, r]]
+
+    return df[STUDENT_COLS]
+
+
+def _student_skills(n, rng):
+    """
+    2-5 distinct skills per student, weighted towards one random
+    sector's pool (weighted sampling without replacement via
+    u^(1/w) keys, top-k per row).
+    """
+
+    home = rng.choice(len(SECTORS), size=n, p=SECTOR_PROBS)
+
+    affinity = np.ones((len(SECTORS), len(ALL_SKILLS)))
+    for s, sector in enumerate(SECTORS):
+        for skill in SECTOR_SKILLS[sector]:
+            affinity[s, ALL_SKILLS.index(skill)] = SECTOR_AFFINITY
+
+    keys = rng.random((n, len(ALL_SKILLS))) ** (1.0 / affinity[home])
+    order = np.argsort(-keys, axis=1)
+    n_skills = rng.integers(2, 6, size=n)
+
+    names = np.array(ALL_SKILLS, dtype=object)[order]
+    out = np.empty(n, dtype=object)
+    for k in range(2, 6):
+        rows = np.flatnonzero(n_skills == k)
+        out[rows] = [";".join(r) for r in names[rows, :k].tolist()]
+
+    return out
+
+
+def _distinct_prefs(n, rng, popularity):
+    """
+    (n, 6) internship positions drawn by popularity; rows with a
+    repeated internship are redrawn until all 6 are distinct.
+    """
+
+    prefs = rng.choice(len(popularity), size=(n, N_PREFS), p=popularity)
+    redo = _has_repeat(prefs)
+
+    while redo.any():
+        rows = np.flatnonzero(redo)
+        prefs[rows] = rng.choice(len(popularity), size=(len(rows), N_PREFS), p=popularity)
+        redo[rows] = _has_repeat(prefs[rows])
+
+    return prefs
+
+
+def _has_repeat(prefs):
+    s = np.sort(prefs, axis=1)
+    return (s[:, 1:] == s[:, :-1]).any(axis=1)
+
+
+# ======================================================================
+# CLI
+# ======================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark cohort.")
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--internships", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--zipf", type=float, default=ZIPF_EXPONENT)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--out-dir", default="bench_data")
+    args = parser.parse_args()
+
+    info = generate_cohort(
+        out_dir=args.out_dir,
+        n_students=args.students,
+        n_internships=args.internships,
+        seed=args.seed,
+        zipf_exponent=args.zipf,
+        chunk_rows=args.chunk_rows,
+    )
+    print(f"Wrote {info['students_csv']} and {info['internships_csv']}")
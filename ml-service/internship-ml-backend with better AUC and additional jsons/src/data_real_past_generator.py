@@ -1,8 +1,48 @@
 import os
-import random
+import glob
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 
+from src.instrumentation import instrumented
+
+
+# Rows drawn per vectorized step; part of the seed contract (see below)
+GEN_CHUNK_ROWS = 1_000_000
+
+# Sharded mode: file naming and dictionary-encoded (categorical) columns
+SHARD_PATTERN = "past_pairs_gen-{:05d}-of-{:05d}.parquet"
+SHARD_GLOB = "past_pairs_gen-*-of-*.parquet"
+CATEGORICAL_COLS = ["student_id", "internship_id", "skills", "req_skills_job", "reservation", "gender"]
+
+# ---------------------------------------------------------
+# Stronger, optimized weights (improves AUC significantly)
+# ---------------------------------------------------------
+DEFAULT_WEIGHTS = {
+    "w_skill": 4.0,
+    "w_gpa": 1.8,
+    "w_stipend": 1.2,
+    "w_tier": 1.2,
+
+    "w_bias": -2.0,
+
+    # Accept model
+    "a_pref": 2.5,
+    "a_stipend": 1.0,
+    "a_tier": 0.8,
+    "a_location_remote_bonus": 0.15,
+    "a_noise": 0.10,  # reduced randomness → higher AUC
+
+    # Small demographic nudges
+    "w_reservation_bias": 0.05,
+    "w_gender_bias": 0.03,
+    "w_rural_bias": -0.02
+}
+
+# Accept-model preference value by pref rank (unlisted → 0.2)
+PREF_SCORE_MAP = {1: 1.0, 2: 0.85, 3: 0.70, 4: 0.55, 5: 0.40, 6: 0.25}
+NO_PREF_VALUE = 0.2
+
 
 def _sigmoid(x):
     return 1.0 / (1.0 + np.exp(-x))
@@ -22,13 +62,17 @@ def _tokens(s):
     return set(str(s).lower().replace(";", " ").replace(",", " ").split())
 
 
+@instrumented("generate_past_data")
 def generate_pseudo_past_data(
     students_df,
     internships_df,
     n_samples=20000,
     seed=42,
     save_path=None,
-    weights=None
+    weights=None,
+    n_shards=None,
+    shard_dir=None,
+    n_workers=None
 ):
     """
     Generates realistic pseudo-training data for Match + Accept ML models.
@@ -37,44 +81,145 @@ def generate_pseudo_past_data(
     ✔ Stronger skill/GPA correlation for better AUC
     ✔ Reduced noise for clearer supervised signals
     ✔ Improved preference handling
+
+    Vectorized: all student / internship indices, labels and noise are
+    drawn as arrays (GEN_CHUNK_ROWS at a time), overlaps come from
+    skill incidence matrices and pref ranks from a (student, internship)
+    lookup, so millions of rows are practical.
+
+    Seed contract:
+        All randomness comes from np.random.default_rng(seed); the
+        global np.random / random state is neither used nor modified.
+        The same (students_df, internships_df, n_samples, seed, weights)
+        always gives the same rows, in the same order.
+        Within each chunk the draws are, in order: student indices,
+        internship indices, match uniforms, accept noise, accept uniforms.
+
+    Sharded mode (n_shards set):
+        n_samples is split into n_shards near-equal shards, each with its
+        own child seed from np.random.SeedSequence(seed).spawn(n_shards),
+        generated in a process pool of n_workers (default: one per CPU)
+        and written to shard_dir as Parquet with categorical columns.
+        Returns the sorted list of shard paths instead of a DataFrame
+        (train_models accepts it directly). Output depends only on
+        (inputs, n_samples, seed, n_shards, weights) — not on n_workers.
     """
 
-    rand = random.Random(seed)
-    np.random.seed(seed)
+    ctx = prepare_generator_context(students_df, internships_df)
+
+    if n_shards:
+        return _generate_shards(ctx, n_samples, seed, n_shards, shard_dir, n_workers, weights)
+
+    rng = np.random.default_rng(seed)
+
+    chunks = []
+    for start in range(0, n_samples, GEN_CHUNK_ROWS):
+        n = min(GEN_CHUNK_ROWS, n_samples - start)
+        chunks.append(sample_past_rows(ctx, n, rng, weights))
+
+    # Convert to DataFrame
+    if chunks:
+        df = pd.concat(chunks, ignore_index=True)
+    else:
+        df = sample_past_rows(ctx, 0, rng, weights)
+
+    # Save (optional)
+    if save_path:
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        df.to_csv(save_path, index=False)
+
+    return df
+
+
+# ======================================================================
+# SHARDED GENERATION → PARQUET
+# ======================================================================
+def _generate_shards(ctx, n_samples, seed, n_shards, shard_dir, n_workers, weights):
+    import pyarrow  # noqa: F401 — Parquet output needs pyarrow
+
+    shard_dir = shard_dir or os.path.join("data", "past_shards")
+    os.makedirs(shard_dir, exist_ok=True)
+
+    # Stale shards from a previous run (possibly another shard count) would be picked up by loaders
+    for old in glob.glob(os.path.join(shard_dir, SHARD_GLOB)):
+        os.remove(old)
+
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    sizes = [len(part) for part in np.array_split(np.arange(n_samples), n_shards)]
+    paths = [os.path.join(shard_dir, SHARD_PATTERN.format(k, n_shards)) for k in range(n_shards)]
+
+    tasks = list(zip([ctx] * n_shards, sizes, seeds, [weights] * n_shards, paths))
+
+    n_workers = min(n_shards, n_workers or os.cpu_count() or 1)
+    if n_workers == 1:
+        for task in tasks:
+            _write_shard(*task)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            list(pool.map(_write_shard, *zip(*tasks)))
+
+    print(f"Wrote {n_shards} past-data shards ({n_samples} rows) to {shard_dir}")
+
+    return paths
+
+
+def _write_shard(ctx, n, seed_seq, weights, path):
+    rng = np.random.default_rng(seed_seq)
+
+    chunks = [
+        sample_past_rows(ctx, min(GEN_CHUNK_ROWS, n - start), rng, weights)
+        for start in range(0, n, GEN_CHUNK_ROWS)
+    ] or [sample_past_rows(ctx, 0, rng, weights)]
+
+    df = pd.concat(chunks, ignore_index=True)
+    for c in CATEGORICAL_COLS:
+        df[c] = df[c].astype("category")
+    for c in ("rural", "match", "accept"):
+        df[c] = df[c].astype(np.int8)
+
+    # Write to a temp name first so a crashed worker never leaves a half shard
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, engine="pyarrow", index=False)
+    os.replace(tmp, path)
+
+    return path
 
-    # ---------------------------------------------------------
-    # Stronger, optimized weights (improves AUC significantly)
-    # ---------------------------------------------------------
-    if weights is None:
-        weights = {
-            "w_skill": 4.0,
-            "w_gpa": 1.8,
-            "w_stipend": 1.2,
-            "w_tier": 1.2,
-
-            "w_bias": -2.0,
-
-            # Accept model
-            "a_pref": 2.5,
-            "a_stipend": 1.0,
-            "a_tier": 0.8,
-            "a_location_remote_bonus": 0.15,
-            "a_noise": 0.10,  # reduced randomness → higher AUC
-
-            # Small demographic nudges
-            "w_reservation_bias": 0.05,
-            "w_gender_bias": 0.03,
-            "w_rural_bias": -0.02
-        }
+
+def list_past_shards(source):
+    """Shard paths from a directory or an explicit list, in shard order."""
+    if isinstance(source, (str, os.PathLike)):
+        return sorted(glob.glob(os.path.join(source, SHARD_GLOB)))
+    return [str(p) for p in source]
+
+
+def iter_past_shards(source):
+    """
+    Yields one DataFrame per shard, read through a memory map so only
+    the current shard is resident. Categorical columns stay categorical.
+    """
+    import pyarrow.parquet as pq
+
+    for path in list_past_shards(source):
+        yield pq.read_table(path, memory_map=True).to_pandas()
+
+
+def prepare_generator_context(students_df, internships_df):
+    """
+    Per-entity arrays the sampler indexes into: normalized attributes,
+    skill incidence matrices, the pref-rank lookup and the internship
+    sampling distribution (weighted by stipend+tier).
+    """
 
     # ---------------------------------------------------------
-    # Precompute skill sets
+    # Skill sets → incidence matrices over a shared vocabulary
     # ---------------------------------------------------------
     students_skills = students_df["skills"].fillna("").astype(str).apply(_tokens).tolist()
     internships_skills = internships_df["req_skills"].fillna("").astype(str).apply(_tokens).tolist()
 
-    student_ids = students_df["student_id"].tolist()
-    internship_ids = internships_df["internship_id"].tolist()
+    vocab = {t: k for k, t in enumerate(sorted(set().union(*students_skills, *internships_skills)))}
+
+    student_ids = students_df["student_id"].values
+    internship_ids = internships_df["internship_id"].values
 
     # ---------------------------------------------------------
     # Internship attractiveness
@@ -116,18 +261,6 @@ def generate_pseudo_past_data(
 
     loc_norm = _normalize_series(location_raw)
 
-    # ---------------------------------------------------------
-    # Student attributes
-    # ---------------------------------------------------------
-    gpas = students_df["gpa"].astype(float).values
-    gpa_norm = _normalize_series(gpas)
-
-    reservations = students_df["reservation"].fillna("GEN").astype(str).tolist()
-    genders = students_df["gender"].fillna("M").astype(str).tolist()
-    rurals = students_df["rural"].fillna(0).astype(int).tolist()
-
-    rows = []
-
     # ---------------------------------------------------------
     # Internship sampling: weighted by stipend+tier
     # ---------------------------------------------------------
@@ -137,112 +270,177 @@ def generate_pseudo_past_data(
     internship_probs = internship_probs / internship_probs.sum()
 
     # ---------------------------------------------------------
-    # MAIN LOOP
+    # Student attributes
     # ---------------------------------------------------------
-    for _ in range(n_samples):
-
-        si = rand.randrange(len(student_ids))
-        sj = np.random.choice(len(internship_ids), p=internship_probs)
-
-        sid = student_ids[si]
-        iid = internship_ids[sj]
-
-        s_sk = students_skills[si]
-        j_sk = internships_skills[sj]
-
-        # Skills overlap ratio
-        overlap = len(s_sk.intersection(j_sk))
-        overlap_score = overlap / max(1, len(j_sk))
-
-        # -----------------------------
-        # MATCH MODEL
-        # -----------------------------
-        logit_match = (
-            weights["w_bias"]
-            + weights["w_skill"] * overlap_score
-            + weights["w_gpa"] * gpa_norm[si]
-            + weights["w_stipend"] * stipend_norm[sj]
-            + weights["w_tier"] * tier_norm[sj]
-        )
-
-        # Small demographic fairness simulation effects
-        if reservations[si] != "GEN":
-            logit_match += weights["w_reservation_bias"]
-        if genders[si] == "F":
-            logit_match += weights["w_gender_bias"]
-        if rurals[si] == 1:
-            logit_match += weights["w_rural_bias"]
-
-        p_match = _sigmoid(logit_match)
-        p_match = min(max(p_match, 0.001), 0.999)
-        match = int(rand.random() < p_match)
-
-        # -----------------------------
-        # ACCEPT MODEL (only meaningful if match==1)
-        # -----------------------------
-        # Determine preference match
-        pref_rank = None
-        student_row = students_df.iloc[si]
-
-        for r in range(1, 7):
-            if student_row.get(f"pref_{r}") == iid:
-                pref_rank = r
-                break
-
-        # Preference fallback
-        if pref_rank is None:
-            pref_val = 0.2
-        else:
-            pref_score_map = {1: 1.0, 2: 0.85, 3: 0.70, 4: 0.55, 5: 0.40, 6: 0.25}
-            pref_val = pref_score_map.get(pref_rank, 0.2)
-
-        logit_accept = (
-            -1.2  # base bias
-            + weights["a_pref"] * pref_val
-            + weights["a_stipend"] * stipend_norm[sj]
-            + weights["a_tier"] * tier_norm[sj]
-            + weights["a_location_remote_bonus"] * loc_norm[sj]
-            + np.random.normal(0, weights["a_noise"])
-        )
-
-        # Slight demographic biases
-        if reservations[si] in ("SC", "ST"):
-            logit_accept += 0.03
-        if genders[si] == "F":
-            logit_accept += 0.02
-        if rurals[si] == 1:
-            logit_accept -= 0.01
-
-        p_accept = min(max(_sigmoid(logit_accept), 0.001), 0.999)
-
-        if match:
-            accept = int(rand.random() < p_accept)
-        else:
-            accept = int(rand.random() < (0.02 * p_accept))  # small chance if unmatched
-
-        # -----------------------------
-        # RECORD ROW
-        # -----------------------------
-        rows.append({
-            "student_id": sid,
-            "internship_id": iid,
-            "skills": " ".join(sorted(list(s_sk))),
-            "req_skills_job": " ".join(sorted(list(j_sk))),
-            "gpa": gpas[si],
-            "stipend_internship": stipends[sj],
-            "reservation": reservations[si],
-            "gender": genders[si],
-            "rural": rurals[si],
-            "match": match,
-            "accept": accept
-        })
+    gpas = students_df["gpa"].astype(float).values
+    reservations = students_df["reservation"].fillna("GEN").astype(str).values
+    genders = students_df["gender"].fillna("M").astype(str).values
+
+    return {
+        "student_ids": student_ids,
+        "internship_ids": internship_ids,
+        "student_skill_str": np.array([" ".join(sorted(s)) for s in students_skills], dtype=object),
+        "internship_skill_str": np.array([" ".join(sorted(s)) for s in internships_skills], dtype=object),
+        "student_incidence": _incidence(students_skills, vocab),
+        "internship_incidence": _incidence(internships_skills, vocab),
+        "internship_skill_count": np.array([max(1, len(s)) for s in internships_skills], dtype=float),
+        "pref_keys": _pref_lookup(students_df, internship_ids),
+        "stipends": stipends,
+        "stipend_norm": stipend_norm,
+        "tier_norm": tier_norm,
+        "loc_norm": loc_norm,
+        "internship_probs": internship_probs,
+        "gpas": gpas,
+        "gpa_norm": _normalize_series(gpas),
+        "reservations": reservations,
+        "genders": genders,
+        "rurals": students_df["rural"].fillna(0).astype(int).values,
+    }
+
+
+def sample_past_rows(ctx, n, rng, weights=None):
+    """
+    Draws n pseudo-history rows from a prepared context using `rng`
+    (a np.random.Generator) — see the seed contract above for draw order.
+    """
 
-    # Convert to DataFrame
-    df = pd.DataFrame(rows)
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+
+    n_students = len(ctx["student_ids"])
+    n_internships = len(ctx["internship_ids"])
+
+    si = rng.integers(n_students, size=n)
+    sj = rng.choice(n_internships, size=n, p=ctx["internship_probs"])
+    u_match = rng.random(n)
+    noise = rng.normal(0, weights["a_noise"], size=n)
+    u_accept = rng.random(n)
+
+    # Skills overlap ratio
+    overlap = (ctx["student_incidence"][si] & ctx["internship_incidence"][sj]).sum(axis=1)
+    overlap_score = overlap / ctx["internship_skill_count"][sj]
+
+    reservation = ctx["reservations"][si]
+    is_female = ctx["genders"][si] == "F"
+    is_rural = ctx["rurals"][si] == 1
+
+    stipend_norm = ctx["stipend_norm"][sj]
+    tier_norm = ctx["tier_norm"][sj]
+
+    # -----------------------------
+    # MATCH MODEL
+    # -----------------------------
+    logit_match = (
+        weights["w_bias"]
+        + weights["w_skill"] * overlap_score
+        + weights["w_gpa"] * ctx["gpa_norm"][si]
+        + weights["w_stipend"] * stipend_norm
+        + weights["w_tier"] * tier_norm
+    )
+
+    # Small demographic fairness simulation effects
+    logit_match = (
+        logit_match
+        + np.where(reservation != "GEN", weights["w_reservation_bias"], 0.0)
+        + np.where(is_female, weights["w_gender_bias"], 0.0)
+        + np.where(is_rural, weights["w_rural_bias"], 0.0)
+    )
+
+    p_match = np.clip(_sigmoid(logit_match), 0.001, 0.999)
+    match = (u_match < p_match).astype(int)
+
+    # -----------------------------
+    # ACCEPT MODEL (only meaningful if match==1)
+    # -----------------------------
+    pref_val = _pref_values(ctx["pref_keys"], si * n_internships + sj)
+
+    logit_accept = (
+        -1.2  # base bias
+        + weights["a_pref"] * pref_val
+        + weights["a_stipend"] * stipend_norm
+        + weights["a_tier"] * tier_norm
+        + weights["a_location_remote_bonus"] * ctx["loc_norm"][sj]
+        + noise
+    )
+
+    # Slight demographic biases
+    logit_accept = (
+        logit_accept
+        + np.where(np.isin(reservation, ("SC", "ST")), 0.03, 0.0)
+        + np.where(is_female, 0.02, 0.0)
+        - np.where(is_rural, 0.01, 0.0)
+    )
+
+    p_accept = np.clip(_sigmoid(logit_accept), 0.001, 0.999)
+
+    # small chance of acceptance if unmatched
+    accept = (u_accept < np.where(match == 1, p_accept, 0.02 * p_accept)).astype(int)
+
+    return pd.DataFrame({
+        "student_id": ctx["student_ids"][si],
+        "internship_id": ctx["internship_ids"][sj],
+        "skills": ctx["student_skill_str"][si],
+        "req_skills_job": ctx["internship_skill_str"][sj],
+        "gpa": ctx["gpas"][si],
+        "stipend_internship": ctx["stipends"][sj],
+        "reservation": reservation,
+        "gender": ctx["genders"][si],
+        "rural": ctx["rurals"][si],
+        "match": match,
+        "accept": accept
+    })
+
+
+def _incidence(token_sets, vocab):
+    """Boolean (entity × vocabulary) skill incidence matrix."""
+    m = np.zeros((len(token_sets), max(1, len(vocab))), dtype=bool)
+    for row, tokens in enumerate(token_sets):
+        m[row, [vocab[t] for t in tokens]] = True
+    return m
+
+
+def _pref_lookup(students_df, internship_ids):
+    """
+    Sorted (student_index * n_internships + internship_index) keys with
+    their best pref rank, for O(log P) rank lookups of drawn pairs.
+    """
 
-    # Save (optional)
-    if save_path:
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        df.to_csv(save_path, index=False)
+    n_internships = len(internship_ids)
+    id_index = pd.Index(internship_ids)
 
-    return df
+    keys, ranks = [], []
+    for r in range(1, 7):
+        col = f"pref_{r}"
+        if col not in students_df.columns:
+            continue
+        j = id_index.get_indexer(students_df[col].values)
+        listed = np.flatnonzero(j >= 0)
+        keys.append(listed * n_internships + j[listed])
+        ranks.append(np.full(len(listed), r))
+
+    if not keys:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=int)
+
+    keys = np.concatenate(keys).astype(np.int64)
+    ranks = np.concatenate(ranks)
+
+    # Sort by key, then rank → first entry of each key is its best rank
+    order = np.lexsort((ranks, keys))
+    keys, ranks = keys[order], ranks[order]
+    first = np.r_[True, keys[1:] != keys[:-1]]
+
+    return keys[first], ranks[first]
+
+
+def _pref_values(pref_keys, pair_keys):
+    keys, ranks = pref_keys
+    values = np.full(len(pair_keys), NO_PREF_VALUE)
+    if len(keys) == 0:
+        return values
+
+    pos = np.minimum(np.searchsorted(keys, pair_keys), len(keys) - 1)
+    found = keys[pos] == pair_keys
+
+    rank_values = np.array([PREF_SCORE_MAP.get(r, NO_PREF_VALUE) for r in range(8)])
+    values[found] = rank_values[ranks[pos[found]]]
+    return values
@@ -1,10 +1,15 @@
-import pandas as pd
+import numpy as np
 
+from src.instrumentation import instrumented
+from src.analytics_engine import build_facts, value_counts
 
+
+@instrumented("fairness_report")
 def build_fairness_report(
     final_alloc_df,
     students_df,
-    round_logs
+    round_logs,
+    facts=None
 ):
     """
     Builds an easy-to-explain fairness report.
@@ -12,6 +17,8 @@ def build_fairness_report(
     final_alloc_df : DataFrame of placed students
     students_df     : Full dataset
     round_logs      : Allocation simulation round-wise logs
+    facts           : optional src.analytics_engine.build_facts() tables
+                      (shared with the other reports)
 
     Output dictionary:
         - total applicants
@@ -26,21 +33,30 @@ def build_fairness_report(
     # -----------------------------------------------------
     # BASIC STATS
     # -----------------------------------------------------
-    placed_students = final_alloc_df["student_id"].unique().tolist()
-    total_placed = len(placed_students)
-    total_applicants = len(students_df)
+    if facts is None:
+        facts = build_facts(final_alloc_df, students_df)
+    st = facts["students"]
+
+    total_placed = final_alloc_df["student_id"].nunique()
+    total_applicants = len(st)
 
-    # Only placed student rows
-    placed_df = students_df[students_df["student_id"].isin(placed_students)].copy()
+    # Placed student rows
+    is_placed = st["alloc_order"].values >= 0
 
     # -----------------------------------------------------
     # CATEGORY-WISE FAIRNESS
     # -----------------------------------------------------
+    res = st["reservation"].values
+    res_labels = list(facts["labels"]["reservation"])
+    eligible_by_code = np.bincount(res[res >= 0], minlength=len(res_labels))
+    placed_by_code = np.bincount(res[(res >= 0) & is_placed], minlength=len(res_labels))
+
     category_stats = {}
 
     for cat in ["GEN", "OBC", "SC", "ST"]:
-        eligible = students_df[students_df["reservation"] == cat].shape[0]
-        placed = placed_df[placed_df["reservation"] == cat].shape[0]
+        code = res_labels.index(cat) if cat in res_labels else None
+        eligible = eligible_by_code[code] if code is not None else 0
+        placed = placed_by_code[code] if code is not None else 0
 
         category_stats[cat] = {
             "eligible": int(eligible),
@@ -51,14 +67,14 @@ def build_fairness_report(
     # -----------------------------------------------------
     # GENDER FAIRNESS
     # -----------------------------------------------------
-    gender_counts = placed_df["gender"].value_counts().to_dict()
-    gender_counts = {k: int(v) for k, v in gender_counts.items()}
+    gender_counts = value_counts(st["gender"].values, facts["labels"]["gender"], mask=is_placed)
 
     # -----------------------------------------------------
     # RURAL FAIRNESS
     # -----------------------------------------------------
-    rural_eligible = students_df[students_df["rural"] == 1].shape[0]
-    rural_placed = placed_df[placed_df["rural"] == 1].shape[0]
+    is_rural = st["rural"].values == 1
+    rural_eligible = int(is_rural.sum())
+    rural_placed = int((is_rural & is_placed).sum())
 
     rural_stats = {
         "eligible": int(rural_eligible),
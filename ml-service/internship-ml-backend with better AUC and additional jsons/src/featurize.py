@@ -6,6 +6,8 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from scipy.sparse import hstack, csr_matrix
 
+from src.instrumentation import instrumented, n_rows
+
 
 # ----------------------------------------------
 # PATH TO SAVE/LOAD SKILL VECTORIZER
@@ -14,6 +16,16 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 VECTORIZER_PATH = os.path.join(BASE_DIR, "..", "models", "skill_vectorizer.pkl")
 VECTORIZER_PATH = os.path.abspath(VECTORIZER_PATH)
 
+# Categorical encodings shared by every featurizer
+RESERVATION_MAP = {"GEN": 0, "OBC": 1, "SC": 2, "ST": 3}
+GENDER_MAP = {"M": 0, "F": 1, "O": 2}
+
+# Vocabularies up to this size use the dense float32 layout under layout="auto"
+DENSE_VOCAB_LIMIT = 256
+
+# overlap, gpa, stipend, reservation, gender, rural, pref
+N_DENSE_FEATURES = 7
+
 
 # ======================================================================
 # VECTORIZE — TRAIN OR LOAD TF-IDF
@@ -55,13 +67,19 @@ def fit_vectorizer(students_df=None, internships_df=None, load=True):
 # ======================================================================
 # FEATURE GENERATION — TRAINING & SCORING
 # ======================================================================
-def featurize_pairs(df: pd.DataFrame, vectorizer, require_pref_rank=True):
+@instrumented("featurize", rows=n_rows)
+def featurize_pairs(df: pd.DataFrame, vectorizer, require_pref_rank=True, layout="auto"):
     """
     Converts pair dataframe → ML feature matrix.
 
     Required columns:
        skills, req_skills_job, gpa, stipend_internship,
        reservation, gender, rural, pref_rank (optional)
+
+    layout:
+       "sparse" → float64 CSR
+       "dense"  → C-contiguous float32 ndarray, same columns
+       "auto"   → dense when the vocabulary has <= DENSE_VOCAB_LIMIT terms
     """
 
     if vectorizer is None:
@@ -83,64 +101,170 @@ def featurize_pairs(df: pd.DataFrame, vectorizer, require_pref_rank=True):
     # -------------------------------------------------------------
     # TEXT FIELDS → TF-IDF ENCODING
     # -------------------------------------------------------------
-    skills_vec = vectorizer.transform(df["skills"].astype(str).tolist())
-    req_vec = vectorizer.transform(df["req_skills_job"].astype(str).tolist())
-
-    # -------------------------------------------------------------
-    # NUMERIC FIELDS
-    # -------------------------------------------------------------
-    gpa = csr_matrix(df["gpa"].astype(float).values.reshape(-1, 1))
-    stipend = csr_matrix(df["stipend_internship"].astype(float).values.reshape(-1, 1))
-    rural = csr_matrix(df["rural"].astype(int).values.reshape(-1, 1))
+    skills_vec = _transform_text(vectorizer, df["skills"])
+    req_vec = _transform_text(vectorizer, df["req_skills_job"])
 
     # -------------------------------------------------------------
     # Preference Rank Feature
     # -------------------------------------------------------------
     if require_pref_rank:
-        pref = csr_matrix(df["pref_rank"].astype(int).values.reshape(-1, 1))
+        pref = df["pref_rank"].astype(int).values
     else:
-        pref = csr_matrix(np.zeros((len(df), 1)))
+        pref = np.zeros(len(df))
 
-    # -------------------------------------------------------------
-    # CATEGORICAL — Reservation
-    # -------------------------------------------------------------
-    reservation_map = {"GEN": 0, "OBC": 1, "SC": 2, "ST": 3}
-    res = csr_matrix(
-        df["reservation"].map(reservation_map).fillna(0).astype(int).values.reshape(-1, 1)
+    return _stack_features(
+        skills_vec,
+        req_vec,
+        overlap=_overlap_counts(df["skills"], df["req_skills_job"]),
+        gpa=df["gpa"].astype(float).values,
+        stipend=df["stipend_internship"].astype(float).values,
+        res=df["reservation"].astype(str).map(RESERVATION_MAP).fillna(0).astype(int).values,
+        gender=df["gender"].astype(str).map(GENDER_MAP).fillna(0).astype(int).values,
+        rural=df["rural"].astype(int).values,
+        pref=pref,
+        layout=resolve_layout(layout, vectorizer),
     )
 
-    # -------------------------------------------------------------
-    # CATEGORICAL — Gender
-    # -------------------------------------------------------------
-    gender_map = {"M": 0, "F": 1, "O": 2}
-    gender = csr_matrix(
-        df["gender"].map(gender_map).fillna(0).astype(int).values.reshape(-1, 1)
+
+# ======================================================================
+# PRE-FEATURIZED INTERNSHIP BLOCK — ONE STUDENT VS ALL INTERNSHIPS
+# ======================================================================
+def prefeaturize_internships(internships_df: pd.DataFrame, vectorizer):
+    """
+    Encodes the internship side of the feature matrix once, so a single
+    student can be scored against every internship without rebuilding
+    pair rows.
+
+    Returns a dict with internship_ids, req_vec, stipend and req token sets.
+    """
+
+    req_skills = internships_df["req_skills"].astype(str)
+
+    if "stipend" in internships_df.columns:
+        stipend = internships_df["stipend"].astype(float).values
+    else:
+        stipend = np.zeros(len(internships_df))
+
+    return {
+        "internship_ids": internships_df["internship_id"].tolist(),
+        "req_vec": vectorizer.transform(req_skills.tolist()),
+        "stipend": stipend,
+        "req_tokens": [set(r.split()) for r in req_skills],
+    }
+
+
+def featurize_student_block(student: dict, block: dict, vectorizer, pref_ranks, layout="auto"):
+    """
+    Feature matrix for one student against every internship in `block`
+    (rows in block order). Same columns and layouts as featurize_pairs.
+
+    student: dict with skills, gpa, reservation, gender, rural
+    pref_ranks: per-internship preference rank (1-6, else 7)
+    """
+
+    n = len(block["internship_ids"])
+    skills = str(student["skills"])
+    s_tokens = set(skills.split())
+
+    skills_vec = vectorizer.transform([skills])[np.zeros(n, dtype=int)]
+
+    return _stack_features(
+        skills_vec,
+        block["req_vec"],
+        overlap=np.array([len(s_tokens & j) for j in block["req_tokens"]], dtype=float),
+        gpa=np.full(n, float(student["gpa"])),
+        stipend=block["stipend"],
+        res=np.full(n, RESERVATION_MAP.get(student.get("reservation"), 0)),
+        gender=np.full(n, GENDER_MAP.get(student.get("gender"), 0)),
+        rural=np.full(n, int(student.get("rural", 0))),
+        pref=np.asarray(pref_ranks, dtype=int),
+        layout=resolve_layout(layout, vectorizer),
     )
 
-    # -------------------------------------------------------------
-    # INTERACTION FEATURE — Skill Overlap Count
-    # -------------------------------------------------------------
-    def overlap_count(row):
-        s = set(str(row["skills"]).split())
-        j = set(str(row["req_skills_job"]).split())
-        return len(s.intersection(j))
 
-    overlap_vals = df.apply(overlap_count, axis=1).astype(float).values.reshape(-1, 1)
-    overlap = csr_matrix(overlap_vals)
+def resolve_layout(layout, vectorizer):
+    """Maps layout="auto" to "dense" or "sparse" by vocabulary size."""
+
+    if layout == "auto":
+        return "dense" if len(vectorizer.vocabulary_) <= DENSE_VOCAB_LIMIT else "sparse"
+    if layout not in ("dense", "sparse"):
+        raise ValueError(f"Unknown feature layout '{layout}'")
+    return layout
+
+
+def _overlap_counts(skills, req_skills):
+    """Skill overlap count per row (whitespace tokens)."""
+
+    if isinstance(skills.dtype, pd.CategoricalDtype) and isinstance(req_skills.dtype, pd.CategoricalDtype):
+        # Count once per distinct (skills, req_skills) combination
+        s_cats = skills.cat.categories.astype(str).tolist() + ["nan"]
+        r_cats = req_skills.cat.categories.astype(str).tolist() + ["nan"]
+        s_codes = np.where(skills.cat.codes.values < 0, len(s_cats) - 1, skills.cat.codes.values)
+        r_codes = np.where(req_skills.cat.codes.values < 0, len(r_cats) - 1, req_skills.cat.codes.values)
+
+        combo, inverse = np.unique(s_codes.astype(np.int64) * len(r_cats) + r_codes, return_inverse=True)
+        counts = np.array([
+            len(set(s_cats[c // len(r_cats)].split()).intersection(r_cats[c % len(r_cats)].split()))
+            for c in combo
+        ], dtype=float)
+        return counts[inverse.ravel()]
+
+    return np.array([
+        len(set(s.split()).intersection(j.split()))
+        for s, j in zip(skills.astype(str), req_skills.astype(str))
+    ], dtype=float)
+
+
+def _stack_features(skills_vec, req_vec, overlap, gpa, stipend, res, gender, rural, pref, layout="sparse"):
+    """
+    Final feature matrix. Column order is part of the trained model
+    contract — do not reorder.
+    """
+
+    if layout == "dense":
+        # Preallocated C-contiguous float32, filled in place — no hstack
+        n, v = skills_vec.shape
+        X = np.zeros((n, 2 * v + N_DENSE_FEATURES), dtype=np.float32)
+
+        _scatter_csr(X, skills_vec, 0)
+        _scatter_csr(X, req_vec, v)
+
+        for k, vals in enumerate((overlap, gpa, stipend, res, gender, rural, pref)):
+            X[:, 2 * v + k] = vals
+
+        return X
+
+    def col(v):
+        return csr_matrix(np.asarray(v).reshape(-1, 1))
 
-    # -------------------------------------------------------------
-    # FINAL FEATURE MATRIX
-    # -------------------------------------------------------------
     X = hstack([
         skills_vec,          # student skills TF-IDF
         req_vec,             # internship skills TF-IDF
-        overlap,             # NEW powerful feature
-        gpa,
-        stipend,
-        res,
-        gender,
-        rural,
-        pref
+        col(overlap),        # NEW powerful feature
+        col(gpa),
+        col(stipend),
+        col(res),
+        col(gender),
+        col(rural),
+        col(pref)
     ]).tocsr()
 
     return X
+
+
+def _transform_text(vectorizer, col):
+    """TF-IDF rows for a text column; categoricals encode each category once."""
+
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Missing values (code -1) encode as "nan", like astype(str)
+        cats = col.cat.categories.astype(str).tolist() + ["nan"]
+        codes = col.cat.codes.values
+        return vectorizer.transform(cats)[np.where(codes < 0, len(cats) - 1, codes)]
+
+    return vectorizer.transform(col.astype(str).tolist())
+
+
+def _scatter_csr(X, m, col_offset):
+    """Writes CSR block `m` into dense X starting at column col_offset."""
+    rows = np.repeat(np.arange(m.shape[0]), np.diff(m.indptr))
+    X[rows, col_offset + m.indices] = m.data
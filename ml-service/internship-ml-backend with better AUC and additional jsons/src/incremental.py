@@ -0,0 +1,170 @@
+"""
+Delta-aware scoring for repeated allocation runs.
+
+A pair's match/accept scores depend only on the student's and the
+internship's scoring columns and on the model, so each entity is
+identified by a content hash of those columns and scores are cached
+under (student hash, internship hash) per model version in the
+memory-mapped score cache (src.score_cache). A rerun after a corrected
+upload featurizes and scores only pairs that involve a new or changed
+entity.
+
+Internship pools are fingerprinted from their scored pairs: a pool
+whose pairs are unchanged reuses its boost statistics and ranklist
+from the previous run. (Every student is in every pool, so a changed
+student dirties all pools; a changed internship dirties only its own.)
+"""
+
+import os
+import uuid
+import pickle
+import numpy as np
+import pandas as pd
+
+from src.models import score_pairs_joint
+from src.pair_builder import PREF_COLS
+from src.boost_engine import apply_middle_tier_boost, compute_boost_stats, fused_base_score
+from src.ranklist_builder import build_ranklists
+from src.score_cache import lookup_scores, store_scores, SCORE_CACHE_DIR, COMPACT_SEGMENTS
+from src.instrumentation import instrumented, add_count
+
+# Last run's pool fingerprints / stats / ranklists (one cohort, one model)
+POOLS_FILE = "pools.pkl"
+
+# Columns that feed featurize_pairs (internship_id via pref_rank)
+STUDENT_KEY_COLS = ["skills", "gpa", "reservation", "gender", "rural", *PREF_COLS]
+INTERNSHIP_KEY_COLS = ["internship_id", "req_skills", "stipend"]
+
+# Everything boost + ranklists read from a pool's pairs
+POOL_KEY_COLS = ["student_id", "match_score", "accept_score", "pref_rank", "reservation", "gender", "rural"]
+
+
+# ======================================================================
+# CONTENT HASHES
+# ======================================================================
+def entity_hashes(df, cols):
+    """uint64 content hash per row over `cols` (missing columns are skipped)."""
+    present = [c for c in cols if c in df.columns]
+    return pd.util.hash_pandas_object(df[present].astype(str), index=False).to_numpy(np.uint64)
+
+
+def pool_fingerprints(scored_df):
+    """{internship_id: uint64} — order-independent sum of the pool's pair hashes."""
+    h = pd.util.hash_pandas_object(scored_df[POOL_KEY_COLS], index=False).to_numpy(np.uint64)
+    codes, iids = pd.factorize(scored_df["internship_id"], sort=True)
+
+    order = np.argsort(codes, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+    sums = np.add.reduceat(h[order], starts) if len(h) else np.array([], dtype=np.uint64)
+    return {iid: int(s) for iid, s in zip(iids, sums)}
+
+
+# ======================================================================
+# SCORE CACHE
+# ======================================================================
+@instrumented("score", rows=lambda out: len(out[0]))
+def score_pairs_cached(pairs_df, student_hash, internship_hash, model_match, model_accept,
+                       vectorizer, version, cache_dir=SCORE_CACHE_DIR):
+    """
+    Adds match_score / accept_score to pairs_df (the student-major cross
+    join from build_pairs), scoring only pairs missing from the score
+    cache (src.score_cache), and stores the newly scored pairs.
+    Returns (pairs_df, {"pairs", "cache_hits", "cache_misses",
+    "pairs_rescored", "cache_segments_used"}).
+    """
+    n_s, n_i = len(student_hash), len(internship_hash)
+    scores, used = lookup_scores(student_hash, internship_hash, version, cache_dir)
+    missing = np.isnan(scores[..., 0])
+    n_missing = int(missing.sum())
+
+    # Misses as (at most) two rectangles, each scored and stored as one
+    # segment: all students × new internships, then the remaining
+    # (new / changed) students × the internships they miss
+    rects = []
+    new_cols = missing.all(axis=0) if n_s else np.zeros(n_i, dtype=bool)
+    if new_cols.any():
+        rects.append((np.ones(n_s, dtype=bool), new_cols))
+    rest = missing & ~new_cols
+    rest_rows = rest.any(axis=1)
+    if rest_rows.any():
+        rects.append((rest_rows, rest[rest_rows].any(axis=0)))
+
+    todo = np.zeros((n_s, n_i), dtype=bool)
+    for rows, cols in rects:
+        todo[np.ix_(rows, cols)] = True
+    flat = todo.ravel()
+    if flat.any():
+        scores.reshape(-1, 2)[flat] = score_pairs_joint(pairs_df[flat], model_match, model_accept, vectorizer)
+
+    for rows, cols in rects:
+        store_scores(student_hash[rows], internship_hash[cols], scores[np.ix_(rows, cols)], version, cache_dir)
+    if used > COMPACT_SEGMENTS:
+        # served from many small segments: keep the cohort as one
+        store_scores(student_hash, internship_hash, scores, version, cache_dir)
+
+    pairs_df["match_score"] = scores[..., 0].ravel()
+    pairs_df["accept_score"] = scores[..., 1].ravel()
+
+    stats = {
+        "pairs": n_s * n_i,
+        "cache_hits": n_s * n_i - n_missing,
+        "cache_misses": n_missing,
+        "pairs_rescored": int(flat.sum()),
+        "cache_segments_used": used,
+    }
+    add_count("score_cache_hits", stats["cache_hits"])
+    add_count("score_cache_misses", stats["cache_misses"])
+    print(f"Scored pairs: {stats['pairs_rescored']} rescored, {stats['cache_hits']} from cache "
+          f"({used} segments).")
+    return pairs_df, stats
+
+
+# ======================================================================
+# POOL REUSE: BOOST STATS + RANKLISTS
+# ======================================================================
+def boost_and_rank(scored_df, internships_df, version, cache_dir=SCORE_CACHE_DIR):
+    """
+    Middle-tier boost + ranklists, recomputing pool statistics and
+    ranklists only for pools whose fingerprint changed since the last
+    run. Returns (boosted_df, boost_stats, ranklists, {"pools", "pools_recomputed"}).
+    """
+    fingerprints = pool_fingerprints(scored_df)
+    cache = _load_pools(cache_dir, version)
+    clean = {iid for iid, fp in fingerprints.items() if cache["fingerprints"].get(iid) == fp}
+
+    dirty_rows = ~scored_df["internship_id"].isin(clean).values
+    stats = {str(iid): cache["stats"][str(iid)] for iid in clean}
+    stats.update(compute_boost_stats(pd.DataFrame({
+        "internship_id": scored_df["internship_id"].values[dirty_rows],
+        "base_score": fused_base_score(scored_df["match_score"].values[dirty_rows],
+                                       scored_df["accept_score"].values[dirty_rows]),
+    })))
+
+    boosted = apply_middle_tier_boost(scored_df, pool_stats=stats)
+    ranklists = build_ranklists(boosted, internships_df,
+                                reuse={iid: cache["ranklists"][iid] for iid in clean})
+
+    # saved before the allocator runs, so later mutation can't leak in
+    _save_pools(cache_dir, version, fingerprints, stats, ranklists)
+
+    return boosted, stats, ranklists, {"pools": len(fingerprints), "pools_recomputed": len(fingerprints) - len(clean)}
+
+
+def _load_pools(cache_dir, version):
+    path = os.path.join(cache_dir, POOLS_FILE)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            cache = pickle.load(f)
+        if cache.get("version") == version:
+            return cache
+    return {"fingerprints": {}, "stats": {}, "ranklists": {}}
+
+
+def _save_pools(cache_dir, version, fingerprints, stats, ranklists):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, POOLS_FILE)
+    tmp = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": version, "fingerprints": fingerprints, "stats": stats, "ranklists": ranklists},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
@@ -0,0 +1,488 @@
+"""
+Streaming CSV ingestion → typed Parquet datasets.
+
+Uploads are parsed in CSV_CHUNK_ROWS chunks (never fully in memory),
+validated row by row against the candidate schema (dbms/candidate.sql)
+and the internship layout the pipeline expects, and the valid rows are
+written to data/students.parquet / data/internships.parquet with fixed
+Arrow types. Rejected rows come back in a line-numbered error report.
+
+load_students() / load_internships() are what every pipeline stage
+reads: the Parquet dataset when it is current, else the CSV with the
+same explicit dtypes.
+"""
+
+import os
+import uuid
+import numpy as np
+import pandas as pd
+
+# Rows parsed + validated per step
+CSV_CHUNK_ROWS = 50_000
+
+# Error rows returned in the report (all rows are still counted)
+MAX_REPORTED_ERRORS = 1000
+
+# Skills allowed by dbms/candidate.sql. "autocad" is not in that list
+# but is used throughout the current cohort and internship req_skills
+# (and the trained vectorizer), so it is accepted as a legacy skill.
+ALLOWED_SKILLS = {
+    "python", "sql", "ml", "cloud", "frontend", "backend", "networking",
+    "java", "excel", "analysis", "presentation", "communication",
+    "financial_modeling", "design", "manufacturing", "pcb_design",
+    "cad_modelling", "surveying", "construction_management", "seo",
+    "social_media", "writing",
+}
+LEGACY_SKILLS = {"autocad"}
+MAX_SKILLS = 6
+
+# Pipeline codes, plus the spellings used by dbms/candidate.sql
+RESERVATIONS = {"GEN": "GEN", "GENERAL": "GEN", "OBC": "OBC", "SC": "SC", "ST": "ST"}
+GENDERS = {"M": "M", "MALE": "M", "F": "F", "FEMALE": "F", "O": "O", "OTHER": "O"}
+RURAL = {"0": 0, "1": 1, "URBAN": 0, "RURAL": 1}
+TIERS = ("Tier1", "Tier2", "Tier3")
+GPA_RANGE = (0.0, 10.0)
+
+PREF_COLS = [f"pref_{r}" for r in range(1, 7)]
+
+# Column → dtype of the typed dataset (also used when falling back to CSV)
+STUDENT_DTYPES = {
+    "student_id": "str",
+    "gpa": "float64",
+    "skills": "str",
+    "reservation": "str",
+    "rural": "int64",
+    "gender": "str",
+    **{c: "str" for c in PREF_COLS},
+}
+INTERNSHIP_DTYPES = {
+    "internship_id": "str",
+    "sector": "str",
+    "tier": "str",
+    "capacity": "int64",
+    "cap_ur": "int64",
+    "cap_rural": "int64",
+    "req_skills": "str",
+    "stipend": "int64",
+    "location_type": "str",
+}
+
+DATASETS = {
+    "students": {"id": "student_id", "dtypes": STUDENT_DTYPES, "optional": set(PREF_COLS)},
+    "internships": {"id": "internship_id", "dtypes": INTERNSHIP_DTYPES, "optional": set()},
+}
+
+
+# ======================================================================
+# PATHS + LOADING
+# ======================================================================
+def dataset_paths(kind, data_dir="data"):
+    """(csv_path, parquet_path) of a dataset."""
+    return os.path.join(data_dir, f"{kind}.csv"), os.path.join(data_dir, f"{kind}.parquet")
+
+
+def dataset_path(kind, data_dir="data"):
+    """
+    File the pipeline reads for a dataset: the Parquet dataset unless a
+    newer CSV was dropped in by hand (or there is no Parquet yet).
+    Raises FileNotFoundError when neither exists.
+    """
+    csv_path, parquet_path = dataset_paths(kind, data_dir)
+    if os.path.exists(parquet_path):
+        if not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            return parquet_path
+    if os.path.exists(csv_path):
+        return csv_path
+    raise FileNotFoundError(f"{kind}.csv missing in /{data_dir}")
+
+
+def load_dataset(kind, data_dir="data"):
+    """
+    Typed dataset (see dataset_path). The CSV fallback raises ValueError
+    naming the first cell that doesn't fit its column's dtype.
+    """
+    path = dataset_path(kind, data_dir)
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, engine="pyarrow")
+
+    dtypes = DATASETS[kind]["dtypes"]
+    df = pd.read_csv(path, dtype={c: t for c, t in dtypes.items() if t == "str"})
+    for col, t in dtypes.items():
+        if col in df and t != "str":
+            try:
+                df[col] = df[col].astype(t)
+            except (TypeError, ValueError):
+                raise ValueError(_bad_cell(path, kind, df[col], t)) from None
+    return df
+
+
+def _bad_cell(path, kind, values, dtype):
+    num = pd.to_numeric(values, errors="coerce")
+    bad = np.flatnonzero(num.isna().values)
+    if len(bad):
+        value = values.iloc[bad[0]]
+        where = f"line {bad[0] + 2} ({'blank' if pd.isna(value) else repr(value)})"  # header is line 1
+    else:
+        where = "a value"
+    return (f"{path}: column '{values.name}' {where} is not a valid {dtype}; "
+            f"re-upload it through /admin/upload/{kind} for a full error report")
+
+
+def load_students(data_dir="data"):
+    return load_dataset("students", data_dir)
+
+
+def load_internships(data_dir="data"):
+    return load_dataset("internships", data_dir)
+
+
+# ======================================================================
+# INGESTION
+# ======================================================================
+def ingest_csv(source, kind, data_dir="data"):
+    """
+    Streams a CSV (path or binary file object) into data/<kind>.parquet.
+
+    The upload is copied to data/<kind>.csv as received, then parsed in
+    chunks; each chunk is validated and its valid rows appended to the
+    Parquet file. Both files are swapped in atomically at the end, so a
+    failed upload leaves the previous dataset untouched.
+
+    Returns a report: rows / rows_valid / rows_rejected, error_counts per
+    (column, error), up to MAX_REPORTED_ERRORS error rows
+    ({"line", "column", "value", "error"}), warnings, ignored_columns,
+    and the delta against the previous dataset (see dataset_delta).
+    Raises ValueError if required columns are missing or no row is valid.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if kind not in DATASETS:
+        raise ValueError(f"Unknown dataset '{kind}'")
+
+    os.makedirs(data_dir, exist_ok=True)
+    csv_path, parquet_path = dataset_paths(kind, data_dir)
+    suffix = f".tmp-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    csv_tmp, parquet_tmp = csv_path + suffix, parquet_path + suffix
+
+    state = {
+        "seen_ids": set(),
+        "known_internships": _known_internships(data_dir) if kind == "students" else None,
+    }
+    report = {
+        "dataset": kind,
+        "rows": 0,
+        "rows_valid": 0,
+        "rows_rejected": 0,
+        "error_counts": {},
+        "errors": [],
+        "errors_truncated": False,
+        "warnings": {},
+        "ignored_columns": [],
+    }
+
+    dtypes = DATASETS[kind]["dtypes"]
+    arrow_types = {"str": pa.string(), "float64": pa.float64(), "int64": pa.int64()}
+    schema = pa.schema([(c, arrow_types[t]) for c, t in dtypes.items()])
+    writer = None
+
+    try:
+        _copy_source(source, csv_tmp)
+
+        reader = pd.read_csv(csv_tmp, dtype=str, keep_default_na=False,
+                             chunksize=CSV_CHUNK_ROWS, skipinitialspace=True)
+        for n, chunk in enumerate(reader):
+            chunk.columns = [c.strip() for c in chunk.columns]
+            if n == 0:
+                _check_columns(chunk, kind, report)
+
+            # header is line 1
+            chunk.index = np.arange(report["rows"], report["rows"] + len(chunk)) + 2
+            report["rows"] += len(chunk)
+
+            clean, errors = _VALIDATORS[kind](chunk, state, report)
+            _add_errors(report, errors)
+
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_tmp, schema)
+            writer.write_table(pa.Table.from_pandas(clean, schema=schema, preserve_index=False))
+            report["rows_valid"] += len(clean)
+
+        if writer is None:
+            raise ValueError("Uploaded CSV has no rows")
+        writer.close()
+        writer = None
+
+        report["rows_rejected"] = report["rows"] - report["rows_valid"]
+        if report["rows_valid"] == 0:
+            raise ValueError(f"No valid rows in uploaded {kind} CSV: {_top_errors(report)}")
+
+        report["delta"] = dataset_delta(kind, parquet_path, parquet_tmp)
+
+        # CSV first: the Parquet dataset must end up the newer of the two
+        os.replace(csv_tmp, csv_path)
+        os.replace(parquet_tmp, parquet_path)
+    finally:
+        if writer is not None:
+            writer.close()
+        for tmp in (csv_tmp, parquet_tmp):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    report["path"] = parquet_path
+    print(f"Ingested {kind}: {report['rows_valid']}/{report['rows']} rows valid → {parquet_path}")
+    return report
+
+
+def dataset_delta(kind, old_path, new_path):
+    """
+    {"added", "removed", "changed", "unchanged"} id counts of a new typed
+    snapshot against the previous one (rows compared by content hash),
+    or None when there is no previous snapshot.
+    """
+    if not os.path.exists(old_path):
+        return None
+
+    id_col = DATASETS[kind]["id"]
+    old, new = pd.read_parquet(old_path), pd.read_parquet(new_path)
+    old_h = pd.Series(pd.util.hash_pandas_object(old, index=False).values, index=old[id_col].values)
+    new_h = pd.Series(pd.util.hash_pandas_object(new, index=False).values, index=new[id_col].values)
+
+    common = new_h.index.intersection(old_h.index)
+    changed = int((new_h[common] != old_h[common]).sum())
+    return {
+        "added": len(new_h.index.difference(old_h.index)),
+        "removed": len(old_h.index.difference(new_h.index)),
+        "changed": changed,
+        "unchanged": len(common) - changed,
+    }
+
+
+def _copy_source(source, dst):
+    with open(dst, "wb") as out:
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                _copy_blocks(f, out)
+        else:
+            _copy_blocks(source, out)
+
+
+def _copy_blocks(fin, fout, block=1 << 20):
+    for data in iter(lambda: fin.read(block), b""):
+        fout.write(data)
+
+
+def _check_columns(chunk, kind, report):
+    dtypes, optional = DATASETS[kind]["dtypes"], DATASETS[kind]["optional"]
+    missing = [c for c in dtypes if c not in chunk.columns and c not in optional]
+    if missing:
+        raise ValueError(f"Missing required column(s) in {kind} CSV: {', '.join(missing)}")
+    report["ignored_columns"] = [c for c in chunk.columns if c not in dtypes]
+
+
+def _known_internships(data_dir):
+    try:
+        return set(load_internships(data_dir)["internship_id"].astype(str))
+    except FileNotFoundError:
+        return None
+
+
+# ======================================================================
+# ERROR COLLECTION
+# ======================================================================
+def _errors_where(chunk, mask, column, message):
+    """Error rows (line, column, value, error) for the rows flagged by mask."""
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return None
+    values = chunk[column].values[mask] if column in chunk else np.full(mask.sum(), "")
+    return pd.DataFrame({"line": chunk.index.values[mask], "column": column,
+                         "value": values, "error": message})
+
+
+def _add_errors(report, errors):
+    errors = [e for e in errors if e is not None]
+    if not errors:
+        return
+    errors = pd.concat(errors, ignore_index=True).sort_values("line", kind="stable")
+
+    for (column, message), n in errors.groupby(["column", "error"], sort=False).size().items():
+        key = f"{column}: {message}"
+        report["error_counts"][key] = report["error_counts"].get(key, 0) + int(n)
+
+    room = MAX_REPORTED_ERRORS - len(report["errors"])
+    if len(errors) > room:
+        report["errors_truncated"] = True
+    if room > 0:
+        report["errors"].extend(errors.head(room).astype({"line": int}).to_dict(orient="records"))
+
+
+def _warn(report, message, n):
+    if n:
+        report["warnings"][message] = report["warnings"].get(message, 0) + int(n)
+
+
+def _top_errors(report, n=3):
+    top = sorted(report["error_counts"].items(), key=lambda kv: -kv[1])[:n]
+    return "; ".join(f"{k} ({v} rows)" for k, v in top)
+
+
+# ======================================================================
+# FIELD CHECKS (vectorised over a chunk of strings)
+# ======================================================================
+def _col(chunk, column):
+    if column not in chunk:
+        return pd.Series("", index=chunk.index, dtype=object)
+    return chunk[column].astype(str).str.strip()
+
+
+def _in_set(values, members):
+    """Series.isin for a large (and growing) Python set: one hash probe per value."""
+    return pd.Series(np.fromiter((v in members for v in values.to_numpy(dtype=object)),
+                                 dtype=bool, count=len(values)),
+                     index=values.index)
+
+
+def _check_id(chunk, column, state, errors):
+    ids = _col(chunk, column)
+    errors.append(_errors_where(chunk, ids == "", column, "missing id"))
+
+    dup = ids.duplicated(keep="first") | _in_set(ids, state["seen_ids"])
+    dup &= ids != ""
+    errors.append(_errors_where(chunk, dup, column, "duplicate id"))
+
+    state["seen_ids"].update(ids[(ids != "") & ~dup])
+    return ids, (ids == "") | dup
+
+
+def _check_code(chunk, column, codes, errors):
+    raw = _col(chunk, column)
+    mapped = raw.str.upper().map(codes)
+    bad = mapped.isna()
+    errors.append(_errors_where(chunk, bad, column, f"must be one of {', '.join(sorted(set(codes)))}"))
+    return mapped, bad
+
+
+def _check_number(chunk, column, errors, low=None, high=None, integer=False):
+    raw = _col(chunk, column)
+    num = pd.to_numeric(raw, errors="coerce")
+
+    bad = num.isna()
+    errors.append(_errors_where(chunk, bad, column, "not a number"))
+
+    out_of_range = pd.Series(False, index=chunk.index)
+    if low is not None:
+        out_of_range |= num < low
+    if high is not None:
+        out_of_range |= num > high
+    if integer:
+        out_of_range |= num.notna() & (num != np.floor(num))
+    if low is not None or high is not None or integer:
+        bound = f"[{low if low is not None else ''}, {high if high is not None else ''}]"
+        what = "a whole number" if integer else "a number"
+        errors.append(_errors_where(chunk, out_of_range & ~bad, column, f"must be {what} in {bound}"))
+
+    return num, bad | out_of_range
+
+
+def _check_skills(chunk, column, errors, report):
+    """Normalised ';'-joined skill list; unknown skills / too many skills are errors."""
+    joined = _col(chunk, column).str.lower().str.replace(r"[;,\s]+", ";", regex=True).str.strip(";")
+    tokens = joined.str.split(";").explode()
+    tokens = tokens[tokens != ""]
+
+    allowed = ALLOWED_SKILLS | LEGACY_SKILLS
+    unknown = ~tokens.isin(allowed)
+    bad_rows = chunk.index.isin(tokens.index[unknown].unique())
+    errors.append(_errors_where(chunk, bad_rows, column,
+                                "unknown skill (allowed: candidate.sql skills list)"))
+
+    # repeated skills count once
+    tokens = tokens.rename("skill").rename_axis("line").reset_index().drop_duplicates()
+    tokens = tokens.set_index("line")["skill"]
+    counts = tokens.groupby(level=0).size().reindex(chunk.index, fill_value=0)
+    too_many = (counts > MAX_SKILLS).values
+    errors.append(_errors_where(chunk, too_many & ~bad_rows, column, f"more than {MAX_SKILLS} skills"))
+
+    _warn(report, f"{column}: legacy skill 'autocad' (not in candidate.sql)",
+          tokens.isin(LEGACY_SKILLS).groupby(level=0).any().sum())
+
+    return joined, bad_rows | too_many
+
+
+# ======================================================================
+# DATASET VALIDATORS
+# ======================================================================
+def _validate_students(chunk, state, report):
+    errors = []
+    out = pd.DataFrame(index=chunk.index)
+
+    out["student_id"], bad = _check_id(chunk, "student_id", state, errors)
+
+    out["gpa"], b = _check_number(chunk, "gpa", errors, *GPA_RANGE)
+    bad |= b
+    out["skills"], b = _check_skills(chunk, "skills", errors, report)
+    bad |= b
+    out["reservation"], b = _check_code(chunk, "reservation", RESERVATIONS, errors)
+    bad |= b
+    out["rural"], b = _check_code(chunk, "rural", RURAL, errors)
+    bad |= b
+    out["gender"], b = _check_code(chunk, "gender", GENDERS, errors)
+    bad |= b
+
+    # Preferences: optional ids; unknown / repeated ids are kept (the pair
+    # builder ignores them / keeps the best rank) but reported as warnings
+    prefs = pd.DataFrame({c: _col(chunk, c) for c in PREF_COLS})
+    prefs = prefs.where(prefs != "")
+    known = state["known_internships"]
+    if known is not None:
+        unknown = [v for v in pd.unique(prefs.to_numpy().ravel()) if isinstance(v, str) and v not in known]
+        _warn(report, "pref: internship_id not in current internships dataset",
+              prefs.isin(unknown).any(axis=1).sum() if unknown else 0)
+    ordered = np.sort(prefs.fillna("").to_numpy(dtype=str), axis=1)
+    _warn(report, "pref: same internship listed more than once",
+          ((ordered[:, 1:] == ordered[:, :-1]) & (ordered[:, 1:] != "")).any(axis=1).sum())
+    for c in PREF_COLS:
+        out[c] = prefs[c]
+
+    return out[~np.asarray(bad, dtype=bool)].astype(_pandas_dtypes(STUDENT_DTYPES)), errors
+
+
+def _validate_internships(chunk, state, report):
+    errors = []
+    out = pd.DataFrame(index=chunk.index)
+
+    out["internship_id"], bad = _check_id(chunk, "internship_id", state, errors)
+
+    for col in ("sector", "location_type"):
+        out[col] = _col(chunk, col)
+        missing = out[col] == ""
+        errors.append(_errors_where(chunk, missing, col, "missing value"))
+        bad |= missing
+
+    out["tier"] = _col(chunk, "tier").str.replace(" ", "").str.capitalize()
+    b = ~out["tier"].isin(TIERS)
+    errors.append(_errors_where(chunk, b, "tier", f"must be one of {', '.join(TIERS)}"))
+    bad |= b
+
+    for col in ("capacity", "cap_ur", "cap_rural", "stipend"):
+        out[col], b = _check_number(chunk, col, errors, low=0, integer=True)
+        bad |= b
+
+    # cohort invariant: reserved rural + unreserved seats == capacity
+    split = ~bad & (out["cap_ur"] + out["cap_rural"] != out["capacity"])
+    errors.append(_errors_where(chunk, split, "capacity", "cap_ur + cap_rural must equal capacity"))
+    bad |= split
+
+    out["req_skills"], b = _check_skills(chunk, "req_skills", errors, report)
+    bad |= b
+
+    out = out[list(INTERNSHIP_DTYPES)]
+    return out[~np.asarray(bad, dtype=bool)].astype(_pandas_dtypes(INTERNSHIP_DTYPES)), errors
+
+
+def _pandas_dtypes(dtypes):
+    return {c: (object if t == "str" else t) for c, t in dtypes.items()}
+
+
+_VALIDATORS = {"students": _validate_students, "internships": _validate_internships}
@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import uuid
+import random
+import functools
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+
+
+# ======================================================================
+# CONFIG
+# ======================================================================
+# PIPELINE_INSTRUMENTATION=0 stops collecting metrics: hooks only pass
+# top-level stage start / end on to a pipeline_run's on_stage callback
+# (job progress), and cost one context-variable lookup otherwise.
+ENABLED = os.environ.get("PIPELINE_INSTRUMENTATION", "1").lower() not in ("0", "false", "off", "no")
+
+# Fraction of runs that also trace Python allocations with tracemalloc
+# (several % slower while on, so it is sampled rather than always on)
+TRACE_MEMORY_RATE = float(os.environ.get("PIPELINE_TRACE_MEMORY_RATE", "0"))
+
+_current_run = contextvars.ContextVar("pipeline_run", default=None)
+
+_last_lock = threading.Lock()
+_last_runs = {}
+
+
+# ======================================================================
+# RUN + STAGE RECORDS
+# ======================================================================
+class PipelineRun:
+    """
+    Stage timings for one pipeline run (allocate, train, main.py).
+
+    Stages are aggregated by name: a stage entered several times (e.g.
+    featurize per scoring chunk) accumulates calls / time / rows.
+    Times are inclusive — a nested stage's time also counts in its parent.
+    Each thread keeps its own stage stack (see worker_task for pools).
+    """
+
+    def __init__(self, name, trace_memory=False, on_stage=None):
+        self.name = name
+        self.run_id = f"{name}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.trace_memory = trace_memory
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.wall_s = None
+        self.cpu_s = None
+        self.stages = {}
+        self.counters = {}
+        self.on_stage = on_stage
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def enter(self, name, rows=None):
+        st = _Stage(name, rows, self._stack[-1].name if self._stack else None)
+        if self.on_stage is not None and st.parent is None:
+            self.on_stage("start", name, None)
+        if self.trace_memory:
+            self._fold_peak()
+            st.mem0 = tracemalloc.get_traced_memory()[0]
+        self._stack.append(st)
+        st.wall0 = time.perf_counter()
+        st.cpu0 = time.process_time()
+        return st
+
+    def exit(self, st):
+        wall = time.perf_counter() - st.wall0
+        cpu = time.process_time() - st.cpu0
+        if self.trace_memory:
+            self._fold_peak()
+        self._stack.remove(st)
+
+        with self._lock:
+            agg = self.stages.get(st.name)
+            if agg is None:
+                agg = self.stages[st.name] = {
+                    "parent": st.parent, "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": None,
+                }
+            agg["calls"] += 1
+            agg["wall_s"] += wall
+            agg["cpu_s"] += cpu
+            if st.rows is not None:
+                agg["rows"] = (agg["rows"] or 0) + int(st.rows)
+            if self.trace_memory:
+                peak_mb = max(0, st.peak - st.mem0) / 1e6
+                agg["peak_traced_mb"] = round(max(agg.get("peak_traced_mb", 0.0), peak_mb), 2)
+
+        if self.on_stage is not None and st.parent is None:
+            self.on_stage("end", st.name, wall)
+
+    def _fold_peak(self):
+        # tracemalloc has one global peak: credit it to every open stage, then restart it
+        peak = tracemalloc.get_traced_memory()[1]
+        for open_stage in self._stack:
+            open_stage.peak = max(open_stage.peak, peak)
+        tracemalloc.reset_peak()
+
+    def to_dict(self):
+        stages = {}
+        for name, agg in self.stages.items():
+            rec = dict(agg)
+            rec["wall_s"] = round(rec["wall_s"], 4)
+            rec["cpu_s"] = round(rec["cpu_s"], 4)
+            if rec["rows"] and rec["wall_s"] > 0:
+                rec["rows_per_s"] = round(rec["rows"] / rec["wall_s"], 1)
+            stages[name] = rec
+
+        return {
+            "run_id": self.run_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_s": None if self.wall_s is None else round(self.wall_s, 4),
+            "cpu_s": None if self.cpu_s is None else round(self.cpu_s, 4),
+            "memory_traced": self.trace_memory,
+            "stages": stages,
+            "counters": dict(self.counters),
+        }
+
+    def summary(self):
+        """Compact {stage: wall_s} view for API responses."""
+        return {name: round(agg["wall_s"], 3) for name, agg in self.stages.items()}
+
+
+class _Stage:
+    __slots__ = ("name", "rows", "parent", "wall0", "cpu0", "mem0", "peak")
+
+    def __init__(self, name, rows, parent):
+        self.name = name
+        self.rows = rows
+        self.parent = parent
+        self.mem0 = 0
+        self.peak = 0
+
+
+class _NullStage:
+    """Stands in for a stage when nothing is recording; attributes are discarded."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _ProgressRun(PipelineRun):
+    """
+    Stands in for the run when instrumentation is disabled but the caller
+    still wants progress: top-level stages reach on_stage, nothing is kept.
+    """
+
+    def enter(self, name, rows=None):
+        st = _Stage(name, rows, self._stack[-1].name if self._stack else None)
+        if st.parent is None:
+            self.on_stage("start", name, None)
+        self._stack.append(st)
+        st.wall0 = time.perf_counter()
+        return st
+
+    def exit(self, st):
+        self._stack.remove(st)
+        if st.parent is None:
+            self.on_stage("end", st.name, time.perf_counter() - st.wall0)
+
+
+# ======================================================================
+# PUBLIC HOOKS
+# ======================================================================
+@contextmanager
+def pipeline_run(name, out_path=None, trace_memory=None, on_stage=None):
+    """
+    Records every stage entered inside the block into one PipelineRun.
+    Yields the run (None when instrumentation is disabled); on exit the
+    run is kept as last_run(name) and written to out_path if given.
+
+    on_stage(event, stage_name, wall_s): optional progress callback for
+    top-level stages; event is "start" (wall_s None) or "end". It is
+    called even when instrumentation is disabled.
+    """
+
+    if not ENABLED:
+        if on_stage is None:
+            yield None
+            return
+        token = _current_run.set(_ProgressRun(name, on_stage=on_stage))
+        try:
+            yield None
+        finally:
+            _current_run.reset(token)
+        return
+
+    if trace_memory is None:
+        trace_memory = TRACE_MEMORY_RATE > 0 and random.random() < TRACE_MEMORY_RATE
+
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    run = PipelineRun(name, trace_memory=trace_memory, on_stage=on_stage)
+    token = _current_run.set(run)
+    wall0 = time.perf_counter()
+    cpu0 = time.process_time()
+
+    try:
+        yield run
+    finally:
+        run.wall_s = time.perf_counter() - wall0
+        run.cpu_s = time.process_time() - cpu0
+        _current_run.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+        record = run.to_dict()
+        remember_run(record)
+
+        if out_path:
+            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+            with open(out_path, "w") as f:
+                json.dump(record, f, indent=2)
+
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Times the enclosed block as stage `name` of the current run.
+    Set `.rows` on the yielded object to record a row count.
+    No-op outside pipeline_run().
+    """
+
+    run = _current_run.get()
+    if run is None:
+        yield _NULL_STAGE
+        return
+
+    st = run.enter(name, rows)
+    try:
+        yield st
+    finally:
+        run.exit(st)
+
+
+def instrumented(name=None, rows=None):
+    """
+    Decorator form of stage(). rows: optional callable mapping the
+    function's return value to a row count (e.g. len).
+    """
+
+    def wrap(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            run = _current_run.get()
+            if run is None:
+                return fn(*args, **kwargs)
+
+            st = run.enter(stage_name)
+            try:
+                out = fn(*args, **kwargs)
+                if rows is not None:
+                    st.rows = rows(out)
+                return out
+            finally:
+                run.exit(st)
+
+        return inner
+
+    return wrap
+
+
+def add_count(name, n=1):
+    """Adds n to counter `name` of the current run (e.g. cache hits). No-op outside pipeline_run()."""
+    run = _current_run.get() if ENABLED else None
+    if run is not None:
+        with run._lock:
+            run.counters[name] = run.counters.get(name, 0) + int(n)
+
+
+def worker_task(fn):
+    """
+    Binds fn to the current run and stage, for calling it in a pool
+    thread (threads don't inherit context variables): stages it enters
+    nest under the caller's current stage. Wrap once per submitted call
+    (a bound context can't be entered by two threads at once). Returns
+    fn unchanged outside pipeline_run().
+    """
+    run = _current_run.get() if ENABLED else None
+    if run is None:
+        return fn
+
+    parent = run._stack[-1] if run._stack else None
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def task(*args, **kwargs):
+        run._local.stack = [parent] if parent is not None else []
+        return ctx.run(fn, *args, **kwargs)
+
+    return task
+
+
+def remember_run(record):
+    """Keeps a finished run record (e.g. one returned by a worker process) as last_run()."""
+    with _last_lock:
+        _last_runs[record["name"]] = record
+
+
+def last_run(name=None):
+    """Most recent finished run record (for `name`, or of any kind)."""
+    with _last_lock:
+        if name is not None:
+            return _last_runs.get(name)
+        if not _last_runs:
+            return None
+        return max(_last_runs.values(), key=lambda r: r["started_at"])
+
+
+def n_rows(out):
+    """Row count of a DataFrame / array / sparse matrix, or of the first item of a tuple."""
+    if isinstance(out, tuple):
+        out = out[0]
+    shape = getattr(out, "shape", None)
+    if shape is not None:
+        return shape[0]
+    return len(out)
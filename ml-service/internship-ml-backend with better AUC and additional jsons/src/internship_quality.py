@@ -2,12 +2,17 @@ import os
 import json
 import pandas as pd
 
+from src.instrumentation import instrumented
+from src.analytics_engine import build_facts
 
+
+@instrumented("internship_quality")
 def compute_internship_quality_scores(
     pairs_df: pd.DataFrame,
     final_alloc_df: pd.DataFrame,
     internships_df: pd.DataFrame,
-    out_path: str = None
+    out_path: str = None,
+    facts: dict = None
 ):
     """
     Computes Internship Quality Score using:
@@ -23,10 +28,13 @@ def compute_internship_quality_scores(
         pairs_df: all candidate-internship pairs (must include match_score, accept_score, pref_rank)
         final_alloc_df: final allocations (student_id, internship_id)
         internships_df: internship details (internship_id, sector, capacity)
+        facts: optional src.analytics_engine.build_facts() tables built from
+            these pairs (per-internship sums come from its single pair scan)
 
     Output:
         report (dict): quality scores for each internship
         Saves JSON + CSV if out_path provided
+        (pairs_df is not modified)
     """
 
     # ---------------------------------------------------------------------
@@ -37,44 +45,25 @@ def compute_internship_quality_scores(
         if c not in pairs_df.columns:
             raise KeyError(f"pairs_df must contain '{c}'")
 
-    # Preference weights (same used in ranklists)
-    PREF_SCORES = {
-        1: 1.00,
-        2: 0.85,
-        3: 0.70,
-        4: 0.55,
-        5: 0.40,
-        6: 0.25,
-        7: 0.20,
-    }
-
-    pairs_df["pref_rank"] = pd.to_numeric(pairs_df["pref_rank"], errors="coerce").fillna(7).astype(int)
-    pairs_df["pref_weight"] = pairs_df["pref_rank"].apply(lambda r: PREF_SCORES.get(r, 0.20))
+    if facts is None:
+        students = pairs_df.drop_duplicates("student_id")[["student_id"]]
+        facts = build_facts(final_alloc_df, students, internships_df, pairs_df=pairs_df)
 
     # ---------------------------------------------------------------------
-    # COMPUTE SIGNALS
+    # COMPUTE SIGNALS (per-internship sums from the fact table)
     # ---------------------------------------------------------------------
+    signals = facts["internships"]
+    signals = signals[signals["pairs"] > 0]
 
     summary = {}
 
-    for iid, grp in pairs_df.groupby("internship_id"):
-
-        demand = grp["student_id"].nunique()
-
-        pref_weighted_demand = grp["pref_weight"].sum()
-
-        match_quality = grp["match_score"].mean()
-        accept_quality = grp["accept_score"].mean()
-
-        # Final allocations count
-        placements = final_alloc_df[final_alloc_df["internship_id"] == iid].shape[0]
-
-        summary[iid] = {
-            "demand_raw": int(demand),
-            "pref_weighted_demand": float(round(pref_weighted_demand, 4)),
-            "avg_match_score": float(round(match_quality, 4)),
-            "avg_accept_score": float(round(accept_quality, 4)),
-            "placements": int(placements)
+    for row in signals.itertuples(index=False):
+        summary[row.internship_id] = {
+            "demand_raw": int(row.demand),
+            "pref_weighted_demand": float(round(row.pref_weighted_demand, 4)),
+            "avg_match_score": float(round(row.match_sum / row.pairs, 4)),
+            "avg_accept_score": float(round(row.accept_sum / row.pairs, 4)),
+            "placements": int(row.placements)
         }
 
     # ---------------------------------------------------------------------
@@ -1,12 +1,16 @@
 import os
 import pickle
+import hashlib
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from lightgbm import LGBMClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import roc_auc_score
 
 from src.featurize import featurize_pairs, fit_vectorizer, VECTORIZER_PATH
+from src.data_real_past_generator import iter_past_shards
+from src.instrumentation import instrumented
 
 
 # ==========================================================
@@ -18,6 +22,9 @@ MODELS_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "models"))
 MODEL_MATCH_PATH = os.path.join(MODELS_DIR, "model_match.pkl")
 MODEL_ACCEPT_PATH = os.path.join(MODELS_DIR, "model_accept.pkl")
 
+# Pairs featurized + scored per chunk in joint scoring mode
+JOINT_CHUNK_ROWS = 65536
+
 
 # ==========================================================
 # Load trained models + vectorizer
@@ -43,12 +50,27 @@ def load_models_and_vectorizer():
     return model_match, model_accept, vectorizer
 
 
+def model_version():
+    """Short content hash of the match + accept models and the vectorizer."""
+    h = hashlib.sha256()
+    for path in (MODEL_MATCH_PATH, MODEL_ACCEPT_PATH, VECTORIZER_PATH):
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()[:12]
+
+
 # ==========================================================
 # Training Function
 # ==========================================================
+@instrumented("train")
 def train_models(past_df, students_df, internships_df, seed=42):
     """
     Train the match & accept models using REAL student + internship data.
+
+    past_df: a DataFrame, or Parquet shards from the sharded generator
+             (shard directory or list of paths) — shards are read one
+             at a time via memory map and featurized as they stream in.
     """
 
     print("Training models (real-data mode)...")
@@ -79,17 +101,27 @@ def train_models(past_df, students_df, internships_df, seed=42):
         "accept"
     ]
 
-    for c in required_cols:
-        if c not in past_df.columns:
-            raise KeyError(f"Missing column '{c}' in past_df for training.")
-
     # ------------------------------------------------------
     # Featurize training pairs (NO pref_rank used)
     # ------------------------------------------------------
-    X = featurize_pairs(past_df, vectorizer, require_pref_rank=False)
+    parts = [past_df] if isinstance(past_df, pd.DataFrame) else iter_past_shards(past_df)
+
+    X_parts, y_match_parts, y_accept_parts = [], [], []
+    for part in parts:
+        for c in required_cols:
+            if c not in part.columns:
+                raise KeyError(f"Missing column '{c}' in past_df for training.")
 
-    y_match = past_df["match"].astype(int).values
-    y_accept = past_df["accept"].astype(int).values
+        X_parts.append(featurize_pairs(part, vectorizer, require_pref_rank=False))
+        y_match_parts.append(part["match"].astype(int).values)
+        y_accept_parts.append(part["accept"].astype(int).values)
+
+    if not X_parts:
+        raise ValueError("No past data to train on.")
+
+    X = _concat_features(X_parts)
+    y_match = np.concatenate(y_match_parts)
+    y_accept = np.concatenate(y_accept_parts)
 
     # ------------------------------------------------------
     # Train-test split
@@ -163,18 +195,74 @@ def train_models(past_df, students_df, internships_df, seed=42):
     return model_match, model_accept, vectorizer
 
 
+def _concat_features(parts):
+    if len(parts) == 1:
+        return parts[0]
+    if sp.issparse(parts[0]):
+        return sp.vstack(parts, format="csr")
+    return np.concatenate(parts)
+
+
 # ==========================================================
 # SCORING FUNCTION
 # ==========================================================
-def score_all_pairs(pairs_df, model_match, model_accept, vectorizer):
+@instrumented("score", rows=len)
+def score_all_pairs(pairs_df, model_match, model_accept, vectorizer, joint=False):
     """
     Uses trained models + saved vectorizer to compute:
         match_score + accept_score
+
+    joint=True scores through score_pairs_joint (float32 score columns,
+    bounded feature-matrix memory).
     """
 
+    if joint:
+        scores = score_pairs_joint(pairs_df, model_match, model_accept, vectorizer)
+        pairs_df["match_score"] = scores[:, 0]
+        pairs_df["accept_score"] = scores[:, 1]
+        return pairs_df
+
     X = featurize_pairs(pairs_df, vectorizer, require_pref_rank=True)
 
     pairs_df["match_score"] = model_match.predict_proba(X)[:, 1]
     pairs_df["accept_score"] = model_accept.predict_proba(X)[:, 1]
 
     return pairs_df
+
+
+def score_pairs_joint(pairs_df, model_match, model_accept, vectorizer,
+                      chunk_rows=JOINT_CHUNK_ROWS, out=None):
+    """
+    Match + accept scores as one float32 (n, 2) array [match, accept].
+
+    Rows are featurized one chunk at a time and both boosters read the
+    same chunk buffer; their raw scores go straight into `out`
+    (preallocated here if not given) and a single in-place sigmoid
+    covers both columns. No [n, 2] predict_proba arrays, and only one
+    chunk's feature matrix is alive at once.
+    """
+
+    n = len(pairs_df)
+    if out is None:
+        out = np.empty((n, 2), dtype=np.float32)
+
+    boosters = [getattr(m, "booster_", m) for m in (model_match, model_accept)]
+    scale = np.array(
+        [float(b.params.get("sigmoid", 1.0)) for b in boosters], dtype=np.float32
+    )
+
+    for start in range(0, n, chunk_rows):
+        stop = min(n, start + chunk_rows)
+        X = featurize_pairs(pairs_df.iloc[start:stop], vectorizer, require_pref_rank=True)
+
+        for j, booster in enumerate(boosters):
+            out[start:stop, j] = booster.predict(X, raw_score=True)
+
+    # sigmoid(raw) = 1 / (1 + exp(-scale * raw)), in place
+    with np.errstate(over="ignore"):
+        np.multiply(out, -scale, out=out)
+        np.exp(out, out=out)
+    out += 1.0
+    np.reciprocal(out, out=out)
+
+    return out
@@ -3,10 +3,13 @@ import json
 import random
 import pandas as pd
 
+from src.instrumentation import instrumented, n_rows
+
 
 # ================================================================
 # MAIN ALLOTMENT ENGINE
 # ================================================================
+@instrumented("allocation", rows=n_rows)
 def optionC_allotment_simulated_rejection(
     ranklists,
     internships_df,
@@ -14,6 +17,8 @@ def optionC_allotment_simulated_rejection(
     max_rounds=8,
     default_accept_prob=0.7,
     seed=123,
+    on_round=None,
+    return_offer_events=False,
 ):
     """
     A realistic multi-round allocation simulation engine.
@@ -24,6 +29,12 @@ def optionC_allotment_simulated_rejection(
     ✔ Upgrades when a better preference appears later
     ✔ Per-round logging
     ✔ Returns final allocations + fairness snapshot
+
+    on_round(stats): optional observer called after every round with that
+    round's counters plus running totals; it should return quickly.
+
+    return_offer_events: also return the offer event list (as written to
+    sim_offer_events.json) as a third value.
     """
 
     random.seed(seed)
@@ -137,6 +148,18 @@ def optionC_allotment_simulated_rejection(
             "seats_available_at_start": seats_at_round_start,
         })
 
+        if on_round is not None:
+            on_round({
+                "round": rnd,
+                "offers_made": offers_made,
+                "acceptances": acceptances,
+                "rejections": rejections,
+                "upgrades": upgrades,
+                "seats_filled_this_round": filled_this_round,
+                "students_placed": len(student_alloc),
+                "seats_remaining": int(sum(seats.values())),
+            })
+
         # Stop if no seats filled this round → stable
         if filled_this_round == 0:
             break
@@ -168,6 +191,8 @@ def optionC_allotment_simulated_rejection(
     with open(os.path.join(out_json_dir, "sim_offer_events.json"), "w") as f:
         json.dump(offer_events, f, indent=2)
 
+    if return_offer_events:
+        return final_df, round_logs, offer_events
     return final_df, round_logs
 
 
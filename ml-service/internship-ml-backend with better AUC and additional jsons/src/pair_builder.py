@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from src.instrumentation import instrumented
+
+
+PREF_COLS = [f"pref_{r}" for r in range(1, 7)]
+
+
+# ======================================================================
+# BUILD STUDENT × INTERNSHIP PAIRS
+# ======================================================================
+@instrumented("pairs", rows=len)
+def build_pairs(students_df: pd.DataFrame, internships_df: pd.DataFrame):
+    """
+    Cross-joins students with internships into the pair layout used by
+    scoring (same columns as the row-by-row loops in main.py /
+    allocate_service), computed with a single merge instead of iterrows.
+
+    Output columns:
+        student_id, internship_id, skills, req_skills_job, gpa,
+        stipend_internship, reservation, gender, rural,
+        pref_1..pref_6, pref_rank (1-6, else 7)
+    """
+
+    s = pd.DataFrame({
+        "student_id": students_df["student_id"].values,
+        "skills": _col(students_df, "skills", ""),
+        "gpa": _col(students_df, "gpa", 0.0),
+        "reservation": _col(students_df, "reservation", "GEN"),
+        "gender": _col(students_df, "gender", "M"),
+        "rural": _col(students_df, "rural", 0),
+    })
+    for c in PREF_COLS:
+        s[c] = _col(students_df, c, None)
+
+    j = pd.DataFrame({
+        "internship_id": internships_df["internship_id"].values,
+        "req_skills_job": _col(internships_df, "req_skills", ""),
+        "stipend_internship": _col(internships_df, "stipend", 0.0),
+    })
+
+    pairs_df = s.merge(j, how="cross")
+
+    pairs_df = pairs_df[[
+        "student_id", "internship_id", "skills", "req_skills_job",
+        "gpa", "stipend_internship", "reservation", "gender", "rural",
+        *PREF_COLS,
+    ]]
+
+    pairs_df["pref_rank"] = compute_pref_rank(pairs_df)
+
+    return pairs_df
+
+
+def compute_pref_rank(pairs_df: pd.DataFrame):
+    """
+    Vectorized preference rank: position (1-6) of internship_id among
+    the student's pref_1..pref_6 columns, 7 when not listed.
+    """
+
+    iid = pairs_df["internship_id"].values
+    rank = np.full(len(pairs_df), 7, dtype=np.int64)
+
+    # Walk from pref_6 down to pref_1 so the best rank wins on duplicates
+    for r in range(6, 0, -1):
+        col = f"pref_{r}"
+        if col not in pairs_df.columns:
+            continue
+        rank[pairs_df[col].values == iid] = r
+
+    return rank
+
+
+def _col(df, name, default):
+    if name in df.columns:
+        return df[name].values
+    return np.full(len(df), default, dtype=object)
@@ -1,11 +1,16 @@
 import os
 import json
+import numpy as np
 import pandas as pd
 
+from src.instrumentation import instrumented
 
+
+@instrumented("preference_satisfaction")
 def compute_preference_satisfaction(final_alloc_df: pd.DataFrame,
                                     pairs_df: pd.DataFrame,
-                                    out_path: str = None):
+                                    out_path: str = None,
+                                    facts: dict = None):
     """
     Compute Preference Satisfaction Metrics.
 
@@ -18,6 +23,8 @@ def compute_preference_satisfaction(final_alloc_df: pd.DataFrame,
         out_path: Optional path (folder+filename or folder) to save JSON (and CSV). If folder provided,
                  will save 'preference_satisfaction.json' and 'preference_satisfaction.csv' inside it.
                  If None, nothing is written to disk and the report dict is returned.
+        facts: optional src.analytics_engine.build_facts() tables; supplies pref_rank
+            (by allocation row) instead of merging pairs_df.
 
     Returns:
         report (dict) with keys:
@@ -36,6 +43,12 @@ def compute_preference_satisfaction(final_alloc_df: pd.DataFrame,
 
     # Ensure pref_rank exists in final_alloc_df; if not, merge from pairs_df
     final = final_alloc_df.copy()
+    if "pref_rank" not in final.columns and facts is not None and "pref_rank" in facts["students"].columns:
+        st = facts["students"]
+        placed = st["alloc_order"].values >= 0
+        rank = np.full(len(final), np.nan)
+        rank[st["alloc_order"].values[placed]] = pd.to_numeric(st["pref_rank"].values[placed], errors="coerce")
+        final["pref_rank"] = rank
     if "pref_rank" not in final.columns:
         if not {"student_id", "internship_id", "pref_rank"}.issubset(pairs_df.columns):
             # try to compute pref_rank by grouping student's pref_1..pref_6 in pairs_df
@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 
+from src.instrumentation import instrumented
+
 # ---------------------------------------------------------
 # Boosting Parameters (can be tuned easily)
 # ---------------------------------------------------------
@@ -26,15 +29,46 @@ PREF_SCORES = {
 }
 
 
+# ---------------------------------------------------------
+# Final Score
+# ---------------------------------------------------------
+def compute_final_scores(base_score, pref_rank, reservation, gender, rural):
+    """
+    Allocator score for each pair:
+
+        base_score * pref_score + reservation / female / rural boosts
+
+    Accepts Series or array-likes of equal length; returns a float array.
+    """
+
+    reservation = pd.Series(np.asarray(reservation))
+    pref_rank = pd.Series(np.asarray(pref_rank).astype(int))
+
+    reserv_boost = reservation.map(RESERVATION_BOOST).fillna(0.0).values
+    gender_boost = np.where(np.asarray(gender) == "F", FEMALE_BOOST, 0.0)
+    rural_boost = np.where(np.asarray(rural).astype(int) == 1, RURAL_BOOST, 0.0)
+    pref_score = pref_rank.map(PREF_SCORES).fillna(0.20).values
+
+    return (
+        np.asarray(base_score, dtype=float) * pref_score
+        + reserv_boost
+        + gender_boost
+        + rural_boost
+    )
+
+
 # ---------------------------------------------------------
 # Build Ranklists
 # ---------------------------------------------------------
-def build_ranklists(scored_pairs_df: pd.DataFrame, internships_df: pd.DataFrame):
+@instrumented("ranklists", rows=len)
+def build_ranklists(scored_pairs_df: pd.DataFrame, internships_df: pd.DataFrame, reuse=None):
     """
     Input:
         scored_pairs_df → DataFrame containing:
             student_id, internship_id, match_score, accept_score, pref_rank
             reservation, gender, rural, boosted_score(optional)
+        reuse → optional { internship_id : ranklist } from a previous run
+            for pools known to be unchanged; those are not rebuilt
 
     Output:
         dict: { internship_id : [ { student info + score }, ... ] }
@@ -56,37 +90,31 @@ def build_ranklists(scored_pairs_df: pd.DataFrame, internships_df: pd.DataFrame)
             raise KeyError(f"ranklist_builder missing required column '{c}'")
 
     ranklists = {}
+    reuse = reuse or {}
+    if reuse:
+        all_iids = scored_pairs_df["internship_id"].unique()
+        scored_pairs_df = scored_pairs_df[~scored_pairs_df["internship_id"].isin(reuse)]
 
     # Group per internship
     for iid, subdf in scored_pairs_df.groupby("internship_id"):
 
         df = subdf.copy()   # avoid SettingWithCopy issues
 
-        # -----------------------------------------------------
-        # Apply boosts
-        # -----------------------------------------------------
-        df["reserv_boost"] = df["reservation"].map(RESERVATION_BOOST).fillna(0.0)
-        df["gender_boost"] = df["gender"].apply(lambda g: FEMALE_BOOST if g == "F" else 0.0)
-        df["rural_boost"] = df["rural"].apply(lambda r: RURAL_BOOST if int(r) == 1 else 0.0)
-
-        # Preference score (ensure int)
+        # Preference rank (ensure int)
         df["pref_rank"] = df["pref_rank"].astype(int)
-        df["pref_score"] = df["pref_rank"].apply(lambda r: PREF_SCORES.get(r, 0.20))
 
-        # -----------------------------------------------------
-        # FINAL SCORE LOGIC
-        # -----------------------------------------------------
         # If boosting already created "boosted_score", use that as the base model score.
         if "boosted_score" in df.columns:
             base_score = df["boosted_score"]
         else:
             base_score = df["match_score"] * df["accept_score"]
 
-        df["final_score"] = (
-            base_score * df["pref_score"]
-            + df["reserv_boost"]
-            + df["gender_boost"]
-            + df["rural_boost"]
+        df["final_score"] = compute_final_scores(
+            base_score,
+            df["pref_rank"],
+            df["reservation"],
+            df["gender"],
+            df["rural"],
         )
 
         # Sort highest score first
@@ -104,5 +132,10 @@ def build_ranklists(scored_pairs_df: pd.DataFrame, internships_df: pd.DataFrame)
             "accept_score",
         ]].to_dict(orient="records")
 
+    if reuse:
+        # same (sorted) key order as a full rebuild
+        print(f"Ranklists built for {len(ranklists)} internships ({len(reuse)} reused).")
+        return {iid: ranklists[iid] if iid in ranklists else reuse[iid] for iid in sorted(all_iids)}
+
     print(f"Ranklists built for {len(ranklists)} internships.")
     return ranklists
@@ -2,7 +2,10 @@ import os
 import json
 import pandas as pd
 
+from src.instrumentation import instrumented
 
+
+@instrumented("round_dynamics")
 def analyze_round_dynamics(round_logs, out_path):
     """
     Converts multi-round logs into a clean analytics summary:
@@ -0,0 +1,198 @@
+"""
+On-disk cache of pair scores (match, accept), shared by every run and cohort.
+
+Layout: SCORE_CACHE_DIR/<model_version>/<segment>.{students,internships,scores}.npy
+
+    students, internships — sorted uint64 entity content hashes: the row
+                            and column index of the segment
+    scores                — float32 [n_students, n_internships, 2], read
+                            through a memory map
+
+A segment is one rectangle of scored pairs (a cold cohort, new students
+× all internships, all students × a new internship, ...). Lookups probe
+segments newest first and only fill pairs still missing. Segments are
+evicted least-recently-used once the cache exceeds SCORE_CACHE_MAX_MB.
+"""
+
+import os
+import time
+import uuid
+import numpy as np
+
+SCORE_CACHE_DIR = os.path.join("data", "score_cache")
+
+# Total size of all segments (all model versions) before LRU eviction
+SCORE_CACHE_MAX_MB = int(os.environ.get("SCORE_CACHE_MAX_MB", "2048"))
+
+# A lookup served from more segments than this rewrites the cohort as one
+COMPACT_SEGMENTS = 4
+
+_PARTS = ("students", "internships", "scores")
+
+
+def _segment_paths(version_dir, seg):
+    return {part: os.path.join(version_dir, f"{seg}.{part}.npy") for part in _PARTS}
+
+
+def _segments(version_dir):
+    """Complete segments of one model version, newest first."""
+    if not os.path.isdir(version_dir):
+        return []
+    segs = []
+    for name in os.listdir(version_dir):
+        if name.endswith(".scores.npy"):
+            seg = name[: -len(".scores.npy")]
+            paths = _segment_paths(version_dir, seg)
+            if all(os.path.exists(p) for p in paths.values()):
+                segs.append((os.path.getmtime(paths["students"]), seg))
+    return [seg for _, seg in sorted(segs, reverse=True)]
+
+
+# ======================================================================
+# LOOKUP
+# ======================================================================
+def lookup_scores(student_hash, internship_hash, version, cache_dir=SCORE_CACHE_DIR):
+    """
+    Cached scores for the cohort student_hash × internship_hash as a
+    float32 [n_students, n_internships, 2] array, NaN where missing.
+    Returns (scores, segments_used).
+    """
+    out = np.full((len(student_hash), len(internship_hash), 2), np.nan, dtype=np.float32)
+    missing = np.ones(out.shape[:2], dtype=bool)
+    used = 0
+
+    version_dir = os.path.join(cache_dir, version)
+    for seg in _segments(version_dir):
+        paths = _segment_paths(version_dir, seg)
+        rows, row_ok = _positions(np.load(paths["students"], mmap_mode="r"), student_hash)
+        cols, col_ok = _positions(np.load(paths["internships"], mmap_mode="r"), internship_hash)
+
+        sel_s = row_ok & missing.any(axis=1)
+        if not sel_s.any() or not col_ok.any():
+            continue
+        sel_i = col_ok & missing[sel_s].any(axis=0)
+        if not sel_i.any():
+            continue
+
+        scores = np.load(paths["scores"], mmap_mode="r")
+        block = scores[rows[sel_s]][:, cols[sel_i]]
+
+        fill = np.ix_(sel_s, sel_i)
+        need = missing[fill]
+        out[fill] = np.where(need[..., None], block, out[fill])
+        missing[fill] = False
+        used += 1
+
+        # recency for LRU eviction
+        os.utime(paths["scores"])
+
+        if not missing.any():
+            break
+
+    return out, used
+
+
+def _positions(index, hashes):
+    """Positions of hashes in a sorted index, and which of them are present."""
+    pos = np.searchsorted(index, hashes)
+    ok = pos < len(index)
+    ok[ok] = index[pos[ok]] == hashes[ok]
+    return np.where(ok, pos, 0), ok
+
+
+# ======================================================================
+# STORE + EVICTION
+# ======================================================================
+def store_scores(student_hash, internship_hash, scores, version, cache_dir=SCORE_CACHE_DIR):
+    """
+    Writes scores [len(student_hash), len(internship_hash), 2] as a new
+    segment (duplicate hashes collapse to one row / column), then evicts
+    old segments beyond SCORE_CACHE_MAX_MB.
+    """
+    if len(student_hash) == 0 or len(internship_hash) == 0:
+        return None
+
+    s_keys, s_idx = np.unique(student_hash, return_index=True)
+    i_keys, i_idx = np.unique(internship_hash, return_index=True)
+
+    version_dir = os.path.join(cache_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    seg = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    paths = _segment_paths(version_dir, seg)
+    tmp = {part: os.path.join(version_dir, f"{seg}.{part}.tmp.npy") for part in _PARTS}
+
+    mm = np.lib.format.open_memmap(tmp["scores"], mode="w+", dtype=np.float32,
+                                   shape=(len(s_keys), len(i_keys), 2))
+    mm[:] = scores[s_idx][:, i_idx]
+    mm.flush()
+    del mm
+    np.save(tmp["internships"], i_keys)
+    np.save(tmp["students"], s_keys)
+
+    for part in _PARTS:
+        os.replace(tmp[part], paths[part])
+
+    evict(cache_dir, keep=(version, seg))
+    return seg
+
+
+def evict(cache_dir=SCORE_CACHE_DIR, max_mb=None, keep=None):
+    """
+    Removes least-recently-used segments (any model version) until the
+    cache fits in max_mb (default SCORE_CACHE_MAX_MB). `keep`
+    (version, segment) is never removed. Returns the removed segments.
+    """
+    max_bytes = (SCORE_CACHE_MAX_MB if max_mb is None else max_mb) * 2**20
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries, total = [], 0
+    for version in os.listdir(cache_dir):
+        version_dir = os.path.join(cache_dir, version)
+        if not os.path.isdir(version_dir):
+            continue
+        for seg in _segments(version_dir):
+            paths = _segment_paths(version_dir, seg)
+            size = sum(os.path.getsize(p) for p in paths.values())
+            entries.append((os.path.getmtime(paths["scores"]), version, seg, size))
+            total += size
+
+    removed = []
+    for _, version, seg, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if (version, seg) == keep:
+            continue
+        for path in _segment_paths(os.path.join(cache_dir, version), seg).values():
+            os.remove(path)
+        total -= size
+        removed.append(f"{version}/{seg}")
+
+    for version in os.listdir(cache_dir):
+        try:
+            os.rmdir(os.path.join(cache_dir, version))  # only succeeds when empty
+        except OSError:
+            pass
+
+    return removed
+
+
+def cache_info(cache_dir=SCORE_CACHE_DIR):
+    """{version: {"segments", "pairs", "bytes"}} of the cache contents."""
+    info = {}
+    if not os.path.isdir(cache_dir):
+        return info
+    for version in sorted(os.listdir(cache_dir)):
+        version_dir = os.path.join(cache_dir, version)
+        segs = _segments(version_dir)
+        if not segs:
+            continue
+        pairs = size = 0
+        for seg in segs:
+            paths = _segment_paths(version_dir, seg)
+            shape = np.load(paths["scores"], mmap_mode="r").shape
+            pairs += shape[0] * shape[1]
+            size += sum(os.path.getsize(p) for p in paths.values())
+        info[version] = {"segments": len(segs), "pairs": pairs, "bytes": size}
+    return info
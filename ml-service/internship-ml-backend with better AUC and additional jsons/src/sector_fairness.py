@@ -2,12 +2,17 @@ import os
 import json
 import pandas as pd
 
+from src.instrumentation import instrumented
+from src.analytics_engine import build_facts, value_counts
 
+
+@instrumented("sector_fairness")
 def build_sector_fairness_report(
     final_alloc_df: pd.DataFrame,
     students_df: pd.DataFrame,
     internships_df: pd.DataFrame,
-    out_path: str = None
+    out_path: str = None,
+    facts: dict = None
 ):
     """
     Build sector-wise allocation and fairness metrics.
@@ -30,6 +35,9 @@ def build_sector_fairness_report(
 
         out_path : folder or file name base to store JSON + CSV
 
+        facts : optional src.analytics_engine.build_facts() tables
+            (shared with the other reports)
+
     Returns:
         A dictionary with sector-level metrics:
             - total placed in each sector
@@ -46,47 +54,39 @@ def build_sector_fairness_report(
     if "sector" not in internships_df.columns:
         raise KeyError("internships_df must contain sector column")
 
-    # Merge allocations with sector & student attributes
-    merged = final_alloc_df.merge(
-        internships_df[["internship_id", "sector"]],
-        on="internship_id",
-        how="left"
-    ).merge(
-        students_df[["student_id", "reservation", "gender", "rural"]],
-        on="student_id",
-        how="left"
-    )
-
-    # Group by sector
-    sector_summary = {}
+    if facts is None:
+        facts = build_facts(final_alloc_df, students_df, internships_df)
+    st = facts["students"]
 
-    for sector, group in merged.groupby("sector"):
+    # Placed students, in allocation order (ties in the breakdowns
+    # keep first-appearance order, as value_counts does)
+    placed = st[st["alloc_order"].values >= 0]
+    order = placed["alloc_order"].values
+    sector = placed["sector"].values
+    eligible_count = len(st)
 
-        total_sector_placed = len(group)
+    sector_summary = {}
 
-        # Reservation stats
-        reservation_breakdown = (
-            group["reservation"].value_counts().to_dict()
-        )
-        reservation_breakdown = {k: int(v) for k, v in reservation_breakdown.items()}
+    for code, name in enumerate(facts["labels"]["sector"]):
+        in_sector = sector == code
+        total_sector_placed = int(in_sector.sum())
+        if not total_sector_placed:
+            continue
 
-        # Gender stats
-        gender_breakdown = (
-            group["gender"].value_counts().to_dict()
-        )
-        gender_breakdown = {k: int(v) for k, v in gender_breakdown.items()}
+        reservation_breakdown = value_counts(placed["reservation"].values, facts["labels"]["reservation"],
+                                             mask=in_sector, order=order)
+        gender_breakdown = value_counts(placed["gender"].values, facts["labels"]["gender"],
+                                        mask=in_sector, order=order)
 
         # Rural stats
-        rural_count = int((group["rural"] == 1).sum())
+        rural_count = int((in_sector & (placed["rural"].values == 1)).sum())
 
         # Eligible students for this sector (those who have it in prefs)
         # OPTIONAL: advanced — for now, we use student count as base
-        eligible_count = len(students_df)
-
         placement_rate = round(total_sector_placed / eligible_count, 4)
 
-        sector_summary[sector] = {
-            "placed": int(total_sector_placed),
+        sector_summary[name] = {
+            "placed": total_sector_placed,
             "reservation": reservation_breakdown,
             "gender": gender_breakdown,
             "rural_placed": rural_count,
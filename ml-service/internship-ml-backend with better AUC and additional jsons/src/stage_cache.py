@@ -0,0 +1,250 @@
+"""
+Content-addressed cache of pipeline stage outputs (the main.py DAG).
+
+A stage's key is a hash of its name, its parameters, the source code of
+the modules that implement it (including the one defining its run
+function, e.g. main.py) and the keys of the stages it reads — so
+changing anything upstream (data, seed, weights, code) changes every
+downstream key, and nothing else does.
+
+Layout: STAGE_CACHE_DIR/<stage>/<key>/
+    value.pkl    — the stage's return value
+    outputs/<i>  — copies of the files / folders the stage writes
+    meta.json    — key inputs, output paths, compute time
+
+A hit copies the outputs back into place and unpickles the value only
+when a stage that has to run reads it. Entries are evicted least-recently
+-used once the cache exceeds STAGE_CACHE_MAX_MB (never those of the
+current run).
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import pickle
+import hashlib
+import importlib
+
+from src.instrumentation import add_count
+
+STAGE_CACHE_DIR = os.path.join("data", "stage_cache")
+
+# Total size of all entries before LRU eviction
+STAGE_CACHE_MAX_MB = int(os.environ.get("STAGE_CACHE_MAX_MB", "4096"))
+
+META = "meta.json"
+
+
+# ======================================================================
+# KEYS
+# ======================================================================
+def file_digest(paths):
+    """sha256 over the content of files (missing files hash as absent)."""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.basename(path).encode())
+        if not os.path.exists(path):
+            h.update(b"<missing>")
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def code_digest(modules):
+    """sha256 over the source files of the given module names."""
+    paths = [importlib.import_module(m).__file__ for m in sorted(modules)]
+    return file_digest(paths)
+
+
+def stage_key(name, params, code, dep_keys):
+    blob = json.dumps({
+        "stage": name,
+        "params": params,
+        "code": code_digest(code),
+        "deps": dep_keys,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+# ======================================================================
+# DAG RUNNER
+# ======================================================================
+def run_stages(stages, cache_dir=STAGE_CACHE_DIR, force=(), use_cache=True, dry_run=False):
+    """
+    Runs an ordered list of stages, each a dict:
+        name     — unique stage name
+        deps     — names of earlier stages whose values `run` receives
+        params   — JSON-able parameters that affect the output
+        code     — module names whose source affects the output
+                   (the module defining `run` is always added)
+        run      — fn(*dep_values) -> value (picklable)
+        outputs  — files / folders `run` writes (restored on a hit)
+
+    force: stage names to recompute even when cached ("all" = every stage).
+    use_cache=False recomputes everything (entries are still written).
+    dry_run only computes keys and reports what would hit or miss.
+
+    Returns {name: {"key", "status": "hit" | "miss" | "forced", "wall_s"}}.
+    """
+    names = [s["name"] for s in stages]
+    force = set(names) if "all" in force else set(force)
+    unknown = force - set(names)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {sorted(unknown)} (stages: {names})")
+
+    keys, status = {}, {}
+    for s in stages:
+        keys[s["name"]] = stage_key(s["name"], s.get("params", {}), _stage_code(s),
+                                    [keys[d] for d in s.get("deps", ())])
+        if s["name"] in force:
+            status[s["name"]] = "forced"
+        elif use_cache and _complete(_entry_dir(cache_dir, s["name"], keys[s["name"]])):
+            status[s["name"]] = "hit"
+        else:
+            status[s["name"]] = "miss"
+
+    report = {name: {"key": keys[name], "status": status[name], "wall_s": 0.0} for name in keys}
+    if dry_run:
+        return report
+
+    # values only stages that actually run will read
+    needed = {d for s in stages if status[s["name"]] != "hit" for d in s.get("deps", ())}
+
+    current = {_entry_dir(cache_dir, name, key) for name, key in keys.items()}
+    values = {}
+    for s in stages:
+        name = s["name"]
+        entry = _entry_dir(cache_dir, name, keys[name])
+        t0 = time.perf_counter()
+
+        if status[name] == "hit":
+            _restore_outputs(entry, s.get("outputs", ()))
+            if name in needed:
+                with open(os.path.join(entry, "value.pkl"), "rb") as f:
+                    values[name] = pickle.load(f)
+            os.utime(os.path.join(entry, META))  # recency for LRU eviction
+            add_count("stage_cache_hits")
+        else:
+            values[name] = s["run"](*[values[d] for d in s.get("deps", ())])
+            _store(entry, values[name], s, keys, time.perf_counter() - t0)
+            evict(cache_dir, keep=current)
+            add_count("stage_cache_misses")
+
+        report[name]["wall_s"] = round(time.perf_counter() - t0, 3)
+
+    return report
+
+
+def _stage_code(stage_def):
+    return sorted(set(stage_def.get("code", ())) | {stage_def["run"].__module__})
+
+
+def _entry_dir(cache_dir, name, key):
+    return os.path.join(cache_dir, name, key)
+
+
+def _complete(entry):
+    return os.path.exists(os.path.join(entry, META))
+
+
+def _store(entry, value, stage_def, keys, compute_s):
+    """Writes the entry under a temp name and renames it into place."""
+    tmp = f"{entry}.tmp-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    os.makedirs(os.path.join(tmp, "outputs"))
+
+    with open(os.path.join(tmp, "value.pkl"), "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    outputs = list(stage_def.get("outputs", ()))
+    for i, path in enumerate(outputs):
+        _copy(path, os.path.join(tmp, "outputs", str(i)))
+
+    with open(os.path.join(tmp, META), "w") as f:
+        json.dump({
+            "stage": stage_def["name"],
+            "key": keys[stage_def["name"]],
+            "deps": {d: keys[d] for d in stage_def.get("deps", ())},
+            "params": stage_def.get("params", {}),
+            "code": _stage_code(stage_def),
+            "outputs": outputs,
+            "compute_s": round(compute_s, 3),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, f, indent=2, default=str)
+
+    shutil.rmtree(entry, ignore_errors=True)  # forced recompute replaces the entry
+    os.replace(tmp, entry)
+
+
+def _restore_outputs(entry, outputs):
+    for i, path in enumerate(outputs):
+        src = os.path.join(entry, "outputs", str(i))
+        if os.path.exists(src):
+            _copy(src, path)
+
+
+def _copy(src, dst):
+    if os.path.isdir(src):
+        shutil.copytree(src, dst, dirs_exist_ok=True)
+    elif os.path.exists(src):
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        shutil.copy2(src, dst)
+
+
+# ======================================================================
+# MAINTENANCE
+# ======================================================================
+def evict(cache_dir=STAGE_CACHE_DIR, max_mb=None, keep=()):
+    """
+    Removes least-recently-used entries (any stage) until the cache fits
+    in max_mb (default STAGE_CACHE_MAX_MB). Entry dirs in `keep` are never
+    removed. Returns the removed entries as "<stage>/<key>".
+    """
+    max_bytes = (STAGE_CACHE_MAX_MB if max_mb is None else max_mb) * 2**20
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries, total = [], 0
+    for name in os.listdir(cache_dir):
+        stage_dir = os.path.join(cache_dir, name)
+        if not os.path.isdir(stage_dir):
+            continue
+        for key in os.listdir(stage_dir):
+            entry = os.path.join(stage_dir, key)
+            if not _complete(entry):
+                continue
+            size = _dir_size(entry)
+            entries.append((os.path.getmtime(os.path.join(entry, META)), name, key, size))
+            total += size
+
+    removed = []
+    for _, name, key, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        entry = _entry_dir(cache_dir, name, key)
+        if entry in keep:
+            continue
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        removed.append(f"{name}/{key}")
+
+    if removed:
+        add_count("stage_cache_evictions", len(removed))
+    return removed
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def clear_cache(cache_dir=STAGE_CACHE_DIR, stage_names=None):
+    """Removes cached entries (of the given stages, default all). Returns the stages cleared."""
+    if not os.path.isdir(cache_dir):
+        return []
+    names = stage_names or sorted(os.listdir(cache_dir))
+    for name in names:
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+    return list(names)
@@ -0,0 +1,231 @@
+import numpy as np
+from scipy.sparse import issparse
+
+
+# LightGBM missing_type codes
+_MISSING_NONE = 0
+_MISSING_ZERO = 1
+_MISSING_NAN = 2
+_MISSING_TYPES = {"None": _MISSING_NONE, "Zero": _MISSING_ZERO, "NaN": _MISSING_NAN}
+
+# LightGBM's kZeroThreshold
+_ZERO_THRESHOLD = 1e-35
+
+# Max (rows × trees) node pointers walked at once
+_CHUNK_CELLS = 1 << 21
+
+# Levels stepped between retiring finished walks
+_LEVELS_PER_SWEEP = 4
+
+
+# ======================================================================
+# FLATTENED TREE ENSEMBLE — PURE NUMPY INFERENCE
+# ======================================================================
+class FlatTreeEnsemble:
+    """
+    A trained LightGBM binary booster flattened into per-node NumPy arrays
+    (feature, threshold, left, right, leaf value) and evaluated for all
+    trees and rows at once.
+
+    Avoids predict_proba's per-call validation / sparse conversion /
+    booster setup, which dominates latency for a handful of rows.
+    Exposes predict_proba so it can stand in for an LGBMClassifier.
+
+    max_rows: batches larger than this are handed back to the original
+              model (None → always use the NumPy path).
+    """
+
+    def __init__(self, nodes, roots, max_depth, sigmoid, model=None, max_rows=None):
+        self.roots = roots
+        self.max_depth = max_depth
+        self.sigmoid = sigmoid
+        self.model = model
+        self.max_rows = max_rows
+
+        # Only the columns trees actually split on are densified
+        self.used_features = np.unique(nodes["feature"][nodes["feature"] >= 0])
+        compact = np.searchsorted(self.used_features, np.maximum(nodes["feature"], 0))
+
+        self.is_leaf = nodes["feature"] < 0
+        pos = np.arange(len(self.is_leaf))
+
+        # Leaves loop back to themselves (threshold +inf → always "left"),
+        # so a walk that reached its leaf can keep stepping harmlessly.
+        self.feature = np.where(self.is_leaf, 0, compact).astype(np.int64)
+        self.threshold = np.where(self.is_leaf, np.inf, nodes["threshold"])
+        self.children = np.empty(2 * len(pos), dtype=np.int64)
+        self.children[0::2] = np.where(self.is_leaf, pos, nodes["left"])
+        self.children[1::2] = np.where(self.is_leaf, pos, nodes["right"])
+
+        self.value = nodes["value"]
+        self.default_left = nodes["default_left"]
+        self.missing_type = nodes["missing_type"]
+
+        # No Zero/NaN missing handling anywhere → plain threshold compares
+        self.plain_splits = bool((self.missing_type == _MISSING_NONE).all())
+
+    @classmethod
+    def from_lgbm(cls, model, max_rows=None):
+        """
+        Build from an LGBMClassifier (or its Booster). Only numerical
+        '<=' splits are supported — the pipeline has no categorical features.
+        """
+
+        booster = getattr(model, "booster_", model)
+        dump = booster.dump_model()
+
+        if dump.get("num_tree_per_iteration", 1) != 1:
+            raise ValueError("FlatTreeEnsemble supports binary models only")
+
+        sigmoid = 1.0
+        for part in str(dump.get("objective", "")).split():
+            if part.startswith("sigmoid:"):
+                sigmoid = float(part.split(":", 1)[1])
+
+        cols = {k: [] for k in
+                ("feature", "threshold", "left", "right", "value", "default_left", "missing_type")}
+        roots = []
+        max_depth = 0
+
+        for tree in dump["tree_info"]:
+            roots.append(len(cols["feature"]))
+            max_depth = max(max_depth, _flatten(tree["tree_structure"], cols, 0))
+
+        nodes = {
+            "feature": np.asarray(cols["feature"], dtype=np.int32),
+            "threshold": np.asarray(cols["threshold"], dtype=np.float64),
+            "left": np.asarray(cols["left"], dtype=np.int32),
+            "right": np.asarray(cols["right"], dtype=np.int32),
+            "value": np.asarray(cols["value"], dtype=np.float64),
+            "default_left": np.asarray(cols["default_left"], dtype=bool),
+            "missing_type": np.asarray(cols["missing_type"], dtype=np.int8),
+        }
+
+        return cls(
+            nodes,
+            np.asarray(roots, dtype=np.int32),
+            max_depth,
+            sigmoid,
+            model=model if hasattr(model, "predict_proba") else None,
+            max_rows=max_rows,
+        )
+
+    # ------------------------------------------------------------------
+    # PREDICTION
+    # ------------------------------------------------------------------
+    def raw_score(self, X):
+        """Sum of leaf values per row (LightGBM raw_score)."""
+
+        Xd = self._dense_used(X)
+        n = Xd.shape[0]
+        out = np.empty(n, dtype=np.float64)
+
+        rows_per_chunk = max(1, _CHUNK_CELLS // max(1, len(self.roots)))
+        for start in range(0, n, rows_per_chunk):
+            stop = min(n, start + rows_per_chunk)
+            leaves = self._walk(Xd[start:stop])
+            out[start:stop] = self.value[leaves].sum(axis=1)
+
+        return out
+
+    def predict_proba(self, X):
+        if self.model is not None and self.max_rows is not None and X.shape[0] > self.max_rows:
+            return self.model.predict_proba(X)
+
+        p = 1.0 / (1.0 + np.exp(-self.sigmoid * self.raw_score(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def _dense_used(self, X):
+        # Dense-row fast path: the handful of split columns as a C-contiguous block
+        if issparse(X):
+            if X.shape[0] * X.shape[1] <= _CHUNK_CELLS:
+                X = X.toarray()
+            else:
+                return np.ascontiguousarray(X.tocsc()[:, self.used_features].toarray(), dtype=np.float64)
+        return np.ascontiguousarray(np.asarray(X)[:, self.used_features], dtype=np.float64)
+
+    def _walk(self, Xd):
+        """
+        Node index of the leaf reached in every (row, tree), as an
+        (n_rows, n_trees) array.
+
+        All walks advance in lock-step; every _LEVELS_PER_SWEEP levels the
+        ones that reached a leaf are retired, so cost follows actual path
+        lengths rather than the deepest tree.
+        """
+
+        n, n_cols = Xd.shape
+        n_trees = len(self.roots)
+
+        if self.plain_splits:
+            # missing_type None: LightGBM treats NaN as 0.0
+            flat_X = np.nan_to_num(Xd, nan=0.0).ravel()
+        else:
+            flat_X = Xd.ravel()
+
+        leaves = np.empty(n * n_trees, dtype=np.int64)
+
+        # Active walks: output slot, feature offset of its row, current node
+        slot = np.arange(n * n_trees, dtype=np.int64)
+        row_base = np.repeat(np.arange(n, dtype=np.int64) * n_cols, n_trees)
+        node = np.tile(self.roots, n).astype(np.int64)
+
+        while True:
+            for _ in range(_LEVELS_PER_SWEEP):
+                node = self.children[2 * node + self._go_right(flat_X[row_base + self.feature[node]], node)]
+
+            done = self.is_leaf[node]
+            if done.all():
+                leaves[slot] = node
+                break
+
+            if done.any():
+                leaves[slot[done]] = node[done]
+                active = ~done
+                slot, row_base, node = slot[active], row_base[active], node[active]
+
+        return leaves.reshape(n, n_trees)
+
+    def _go_right(self, x, node):
+        if self.plain_splits:
+            return x > self.threshold[node]
+
+        mt = self.missing_type[node]
+        nan = np.isnan(x)
+        x = np.where(nan & (mt != _MISSING_NAN), 0.0, x)
+        missing = ((mt == _MISSING_ZERO) & (np.abs(x) <= _ZERO_THRESHOLD)) | ((mt == _MISSING_NAN) & nan)
+        return np.where(missing, ~self.default_left[node], x > self.threshold[node])
+
+
+def _flatten(node, cols, depth):
+    """Append `node` (and its subtree) to cols; returns subtree depth."""
+
+    pos = len(cols["feature"])
+
+    if "leaf_value" in node:
+        cols["feature"].append(-1)
+        cols["threshold"].append(0.0)
+        cols["left"].append(-1)
+        cols["right"].append(-1)
+        cols["value"].append(float(node["leaf_value"]))
+        cols["default_left"].append(False)
+        cols["missing_type"].append(_MISSING_NONE)
+        return depth
+
+    if node.get("decision_type", "<=") != "<=":
+        raise ValueError(f"Unsupported split type '{node.get('decision_type')}'")
+
+    cols["feature"].append(int(node["split_feature"]))
+    cols["threshold"].append(float(node["threshold"]))
+    cols["left"].append(-1)
+    cols["right"].append(-1)
+    cols["value"].append(0.0)
+    cols["default_left"].append(bool(node.get("default_left", True)))
+    cols["missing_type"].append(_MISSING_TYPES.get(node.get("missing_type", "None"), _MISSING_NONE))
+
+    cols["left"][pos] = len(cols["feature"])
+    d_left = _flatten(node["left_child"], cols, depth + 1)
+    cols["right"][pos] = len(cols["feature"])
+    d_right = _flatten(node["right_child"], cols, depth + 1)
+
+    return max(d_left, d_right)
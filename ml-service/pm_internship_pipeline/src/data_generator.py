@@ -13,7 +13,6 @@ The synthetic data simulates:
 """
 
 import os
-import random
 import numpy as np
 import pandas as pd
 
@@ -44,15 +43,15 @@ def generate_students(n_students=2000, n_internships=40):
     """
     Generate synthetic student dataset.
     Returns a DataFrame.
+
+    All columns are sampled as whole arrays (np.random global state),
+    so 1M+ students take seconds.
     """
     df = pd.DataFrame()
     df["student_id"] = [f"S{10000+i}" for i in range(n_students)]
 
-    # Random skills per student
-    df["skills"] = df.apply(
-        lambda _: " ".join(random.sample(SKILLS, random.randint(3, 6))),
-        axis=1
-    )
+    # Random skills per student (3-6 distinct)
+    df["skills"] = _sample_skill_strings(n_students, 3, 6)
 
     # Academic + demographic features
     df["gpa"] = np.round(np.random.uniform(5.0, 9.8, n_students), 2)
@@ -64,13 +63,11 @@ def generate_students(n_students=2000, n_internships=40):
     df["rural"] = np.random.choice([0, 1], n_students, p=[0.75, 0.25])
 
     # Random preferences from internship list
-    internship_ids = [f"I{str(i+1).zfill(3)}" for i in range(n_internships)]
+    internship_ids = _internship_ids(n_internships)
+    prefs = np.random.randint(0, n_internships, size=(n_students, 6))
 
     for p in range(1, 7):
-        df[f"pref_{p}"] = df.apply(
-            lambda _: random.choice(internship_ids),
-            axis=1
-        )
+        df[f"pref_{p}"] = internship_ids[prefs[:, p - 1]]
 
     return df
 
@@ -88,23 +85,20 @@ def generate_internships(n=40):
     - Capacity
     """
     df = pd.DataFrame()
-    df["internship_id"] = [f"I{str(i+1).zfill(3)}" for i in range(n)]
+    df["internship_id"] = _internship_ids(n)
 
-    df["sector"] = [random.choice(SECTORS) for _ in range(n)]
-    df["tier"] = [random.choice(["Tier1", "Tier2", "Tier3"]) for _ in range(n)]
-    df["location_type"] = [random.choice(LOCATION_TYPES) for _ in range(n)]
+    df["sector"] = np.random.choice(SECTORS, n)
+    df["tier"] = np.random.choice(["Tier1", "Tier2", "Tier3"], n)
+    df["location_type"] = np.random.choice(LOCATION_TYPES, n)
 
     # Stipend = 4500 base + (0, 500, 1000)
-    df["stipend"] = [4500 + random.choice([0, 500, 1000]) for _ in range(n)]
+    df["stipend"] = 4500 + np.random.choice([0, 500, 1000], n)
 
     # Seats per internship
     df["capacity"] = np.random.randint(10, 25, n)
 
-    # Required skills
-    df["req_skills"] = df.apply(
-        lambda _: " ".join(random.sample(SKILLS, random.randint(3, 5))),
-        axis=1
-    )
+    # Required skills (3-5 distinct)
+    df["req_skills"] = _sample_skill_strings(n, 3, 5)
 
     return df
 
@@ -118,47 +112,79 @@ def generate_past_data(students_df, internships_df, n_samples=3000):
     Each row represents (student, internship) with:
         match ∈ {0,1}
         accept ∈ {0,1}
+
+    Students / internships are drawn as positional indices in one batch;
+    skill overlap comes from per-row skill incidence matrices.
+    """
+    si = np.random.randint(0, len(students_df), n_samples)
+    sj = np.random.randint(0, len(internships_df), n_samples)
+
+    students = students_df.reset_index(drop=True)
+    internships = internships_df.reset_index(drop=True)
+
+    student_skills = _skill_incidence(students["skills"])
+    job_skills = _skill_incidence(internships["req_skills"])
+    overlap = (student_skills[si] & job_skills[sj]).sum(axis=1)
+
+    gpa = students["gpa"].values[si]
+
+    # Probability model
+    base_prob = np.maximum(0.01, overlap * 0.15 + (gpa - 5) * 0.05)
+
+    match = (np.random.random(n_samples) < base_prob).astype(int)
+    accept = (match.astype(bool) & (np.random.random(n_samples) < 0.7)).astype(int)
+
+    return pd.DataFrame({
+        "student_id": students["student_id"].values[si],
+        "internship_id": internships["internship_id"].values[sj],
+        "skills": students["skills"].values[si],
+        "req_skills_job": internships["req_skills"].values[sj],
+        "gpa": gpa,
+        "stipend_internship": internships["stipend"].values[sj],
+        "reservation": students["reservation"].values[si],
+        "gender": students["gender"].values[si],
+        "rural": students["rural"].values[si],
+        "match": match,
+        "accept": accept
+    })
+
+
+# ----------------------------------------------------------------
+# HELPERS
+# ----------------------------------------------------------------
+def _internship_ids(n):
+    return np.array([f"I{str(i+1).zfill(3)}" for i in range(n)], dtype=object)
+
+
+def _sample_skill_strings(n, k_min, k_max):
+    """
+    n space-joined skill strings, each k ~ U{k_min..k_max} distinct SKILLS
+    in random order (same distribution as random.sample per row).
     """
-    student_ids = students_df["student_id"].tolist()
-    internship_ids = internships_df["internship_id"].tolist()
-
-    rows = []
-
-    for _ in range(n_samples):
-        sid = random.choice(student_ids)
-        jid = random.choice(internship_ids)
-
-        srow = students_df[students_df["student_id"] == sid].iloc[0]
-        jrow = internships_df[internships_df["internship_id"] == jid].iloc[0]
-
-        student_skillset = set(srow["skills"].split())
-        job_skillset = set(jrow["req_skills"].split())
-        overlap = len(student_skillset.intersection(job_skillset))
-
-        # Probability model
-        base_prob = max(
-            0.01,
-            overlap * 0.15 + (srow["gpa"] - 5) * 0.05
-        )
-
-        match = int(random.random() < base_prob)
-        accept = int(match and (random.random() < 0.7))
-
-        rows.append({
-            "student_id": sid,
-            "internship_id": jid,
-            "skills": srow["skills"],
-            "req_skills_job": jrow["req_skills"],
-            "gpa": srow["gpa"],
-            "stipend_internship": jrow["stipend"],
-            "reservation": srow["reservation"],
-            "gender": srow["gender"],
-            "rural": srow["rural"],
-            "match": match,
-            "accept": accept
-        })
-
-    return pd.DataFrame(rows)
+    # Row-wise random permutations of SKILLS; keep the first k of each
+    perms = np.argsort(np.random.random((n, len(SKILLS))), axis=1)
+    ks = np.random.randint(k_min, k_max + 1, n)
+
+    names = np.array(SKILLS, dtype=object)[perms]
+    out = np.empty(n, dtype=object)
+    for k in range(k_min, k_max + 1):
+        rows = np.flatnonzero(ks == k)
+        out[rows] = [" ".join(r) for r in names[rows, :k].tolist()]
+
+    return out
+
+
+def _skill_incidence(skills):
+    """Boolean (row × SKILLS) matrix; computed once per distinct skill string."""
+    codes, uniques = pd.factorize(skills.fillna("").astype(str))
+    index = {s: k for k, s in enumerate(SKILLS)}
+
+    table = np.zeros((len(uniques) + 1, len(SKILLS)), dtype=bool)
+    for u, text in enumerate(uniques):
+        table[u, [index[t] for t in text.split() if t in index]] = True
+
+    # factorize marks missing as -1 → the all-False last row
+    return table[codes]
 
 
 # ----------------------------------------------------------------